@@ -1,6 +1,7 @@
 """
 博客后端包
 包含所有后端模块
+应用通过 create_app 创建，导入包和其中的模块不会创建应用
 """
 
-from .app import app 
\ No newline at end of file
+from .app import create_app 
\ No newline at end of file
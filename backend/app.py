@@ -1,60 +1,32 @@
 """
 博客后端API服务
 提供文章、评论、分类等功能的RESTful API接口
+
+应用由 create_app 创建，导入本模块没有副作用：
+1. 开发时 python backend/run.py 使用Flask自带的服务器
+2. 生产环境使用 gunicorn（配置见 backend/gunicorn.conf.py）：
+   应用在主进程中创建一次（preload），解析后的数据、搜索索引和编译好的正则表达式
+   在 fork 之后由工作进程以写时复制的方式共享，工作进程不再各自加载；
+   主进程不启动后台线程，每个工作进程 fork 之后调用 init_worker 重建本进程的连接并启动后台线程
 """
 
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify, current_app
 from flask_cors import CORS
-import os
-import logging
-from logging.handlers import RotatingFileHandler
-from backend.config import Config
-
-# 初始化Flask应用
-app = Flask(__name__)
-
-# 加载配置
-app.config.from_object(Config)
-
-# 配置日志系统
-if not os.path.exists(Config.LOG_DIR):
-    os.makedirs(Config.LOG_DIR)
-
-file_handler = RotatingFileHandler(
-    Config.LOG_FILE,
-    maxBytes=Config.LOG_MAX_BYTES,
-    backupCount=Config.LOG_BACKUP_COUNT
-)
-file_handler.setFormatter(logging.Formatter(Config.LOG_FORMAT))
-file_handler.setLevel(logging.INFO)
-app.logger.addHandler(file_handler)
-app.logger.setLevel(logging.INFO)
-
-# 在应用上下文中初始化配置
-with app.app_context():
-    Config.init_app(app)
-    app.logger.info('Blog startup')
-
-# 配置CORS跨域资源共享
-CORS(app, resources={r"/api/*": {
-    "origins": Config.CORS_ORIGINS,
-    "methods": Config.CORS_METHODS,
-    "allow_headers": Config.CORS_HEADERS,
-    "supports_credentials": Config.CORS_SUPPORTS_CREDENTIALS
-}})
-
-# 注册蓝图
-from backend.blueprints.auth import auth_bp
-from backend.blueprints.articles import articles_bp
-from backend.blueprints.comments import comments_bp
-from backend.blueprints.categories import categories_bp
-from backend.blueprints.uploads import uploads_bp
-
-app.register_blueprint(auth_bp)
-app.register_blueprint(articles_bp)
-app.register_blueprint(comments_bp)
-app.register_blueprint(categories_bp)
-app.register_blueprint(uploads_bp)
+from backend.config import Config, config as config_by_name
+from backend.log_pipeline import init_logging
+from backend.metrics import init_metrics
+from backend.storage import init_storage
+from backend.search import init_search
+from backend.http_cache import init_response_cache
+from backend.counters import init_counters
+from backend.rendering import init_renderer
+from backend.compression import init_compression
+from backend.assets import init_assets, send_asset
+from backend.images import init_images
+from backend.streams import init_streams
+from backend.tokens import init_tokens
+from backend.passwords import init_passwords
+
 
 # 自定义错误类
 class BlogError(Exception):
@@ -63,43 +35,153 @@ class BlogError(Exception):
         super().__init__(message)
         self.status_code = status_code
 
+
+def create_app(config=None, preload=False):
+    """
+    创建并初始化Flask应用
+
+    Args:
+        config: 配置类或 backend.config.config 中的名称（'development'/'production'），默认为 Config
+        preload: 应用是否在主进程中创建后 fork 出工作进程；为True时不启动后台线程，
+            由每个工作进程调用 init_worker 启动
+
+    Returns:
+        Flask: 应用对象
+    """
+    if config is None:
+        config = Config
+    elif isinstance(config, str):
+        config = config_by_name[config]
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config['PRELOAD_APP'] = preload
+    # 访问日志和指标的 after_request 钩子最先注册，在压缩等钩子之后执行
+    init_logging(app)
+    init_metrics(app)
+
+    # 在应用上下文中初始化配置
+    with app.app_context():
+        config.init_app(app)
+        init_extensions(app)
+        app.logger.info('Blog startup')
+
+    # 配置CORS跨域资源共享
+    CORS(app, resources={r"/api/*": {
+        "origins": app.config['CORS_ORIGINS'],
+        "methods": app.config['CORS_METHODS'],
+        "allow_headers": app.config['CORS_HEADERS'],
+        "supports_credentials": app.config['CORS_SUPPORTS_CREDENTIALS']
+    }})
+
+    register_blueprints(app)
+    register_error_handlers(app)
+
+    # 静态文件服务
+    app.add_url_rule('/', 'serve_frontend', serve_frontend)
+    app.add_url_rule('/<path:path>', 'serve_static', serve_static)
+    return app
+
+
+def init_extensions(app):
+    """创建应用级的长生命周期对象，保存在 app.extensions 中"""
+    init_search(app, init_storage(app))
+    init_response_cache(app)
+    init_counters(app)
+    init_renderer(app)
+    init_compression(app)
+    init_assets(app)
+    init_images(app)
+    init_streams(app)
+    init_tokens(app)
+    init_passwords(app)
+
+
+def init_worker(app):
+    """
+    在 fork 出的工作进程中调用（gunicorn 的 post_fork 钩子）
+    主进程中创建的数据库连接不能跨进程使用，各扩展在 after_fork 中丢弃继承的连接并启动本进程的后台线程
+    """
+    for extension in list(app.extensions.values()):
+        after_fork = getattr(extension, 'after_fork', None)
+        if after_fork is not None:
+            after_fork()
+
+
+def register_blueprints(app):
+    """注册蓝图"""
+    from backend.blueprints.auth import auth_bp
+    from backend.blueprints.articles import articles_bp
+    from backend.blueprints.comments import comments_bp
+    from backend.blueprints.categories import categories_bp
+    from backend.blueprints.uploads import uploads_bp
+    from backend.blueprints.search import search_bp
+    from backend.blueprints.cache import cache_bp
+    from backend.blueprints.metrics import metrics_bp
+
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(articles_bp)
+    app.register_blueprint(comments_bp)
+    app.register_blueprint(categories_bp)
+    app.register_blueprint(uploads_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(cache_bp)
+    app.register_blueprint(metrics_bp)
+
+
 # 错误处理器
-@app.errorhandler(BlogError)
 def handle_blog_error(error):
     """处理自定义博客错误"""
     response = jsonify({'error': str(error)})
     response.status_code = error.status_code
     return response
 
-@app.errorhandler(404)
+
 def not_found_error(error):
     """处理404未找到错误"""
     return jsonify({'error': 'Not found'}), 404
 
-@app.errorhandler(500)
+
 def internal_error(error):
     """处理500服务器内部错误"""
-    app.logger.error('Server Error: %s', str(error))
+    current_app.logger.error('Server Error: %s', str(error))
     return jsonify({'error': 'Internal server error'}), 500
 
+
+def register_error_handlers(app):
+    app.register_error_handler(BlogError, handle_blog_error)
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, internal_error)
+
+
 # 静态文件服务
-@app.route('/')
 def serve_frontend():
     """提供前端首页"""
-    response = send_from_directory('../frontend', 'index.html')
+    response = send_asset('index.html')
     response.headers['Access-Control-Allow-Origin'] = '*'
     return response
 
-@app.route('/<path:path>')
+
 def serve_static(path):
-    """提供前端静态资源"""
-    response = send_from_directory('../frontend', path)
+    """提供前端静态资源，带内容哈希的资源地址可以长期缓存"""
+    response = send_asset(path)
     response.headers['Access-Control-Allow-Origin'] = '*'
     return response
 
+
+def __getattr__(name):
+    """兼容 from backend.app import app：第一次访问时用默认配置创建应用"""
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 if __name__ == '__main__':
-    app.run(
-        debug=Config.DEBUG,
-        port=Config.PORT,
-        host=Config.HOST
-    )
\ No newline at end of file
+    application = create_app()
+    application.run(
+        debug=application.config['DEBUG'],
+        port=application.config['PORT'],
+        host=application.config['HOST']
+    )
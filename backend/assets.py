@@ -0,0 +1,235 @@
+"""
+静态资源指纹模块
+为前端页面引用的本地资源（assets/ 下的脚本、样式、图片等）生成带内容哈希的文件名，
+使这些资源可以被浏览器长期缓存：
+
+1. 页面中的 src/href 引用改写为带哈希的地址，例如 assets/css/common.css ->
+   assets/css/common.3f9a0c2b1d.css；改写后的页面保存在 STATIC_BUILD_DIR 中，原始页面不会被修改
+2. 带哈希的地址不对应实际文件，请求时去掉哈希找到原始文件，哈希与文件当前内容一致时
+   以 STATIC_IMMUTABLE_CACHE_CONTROL（immutable, max-age=1年）返回；
+   文件内容变化后哈希随之变化，页面引用新地址，旧地址不再被长期缓存
+3. 页面和其他资源每次都向服务器确认（no-cache），未变化时得到304
+4. 所有静态文件都支持条件请求和 Range 请求，客户端支持时发送预压缩的版本（见 backend.compression）
+
+哈希由文件内容计算，不依赖进程内的状态，多个工作进程对同一地址的判断一致。
+页面在启动时生成，页面或其引用的资源被修改后在下次请求该页面时重新生成；也可以在部署时预先生成：
+    python -m backend.assets
+"""
+
+import os
+import re
+import sys
+import hashlib
+import argparse
+import threading
+
+# 将项目根目录添加到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from flask import current_app, abort
+from werkzeug.security import safe_join
+from backend.models import atomic_write
+from backend.compression import send_static, precompress_file, precompress_directory
+
+# 参与指纹的资源目录（相对前端目录）
+ASSETS_DIR = 'assets'
+
+# 哈希长度（十六进制字符数）
+HASH_LENGTH = 10
+
+_REFERENCE_RE = re.compile(r'''(\b(?:src|href)\s*=\s*)(["'])([^"'#?]+)(\2)''', re.I)
+_HASHED_RE = re.compile(rf'^(.+)\.([0-9a-f]{{{HASH_LENGTH}}})(\.[A-Za-z0-9]+)$')
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def hashed_name(path, digest):
+    """在扩展名前插入哈希：a/b.css -> a/b.<hash>.css"""
+    base, ext = os.path.splitext(path)
+    return f'{base}.{digest}{ext}'
+
+
+class AssetManifest:
+    """
+    资源指纹清单
+    缓存每个资源文件的内容哈希（按修改时间和大小判断是否过期）和每个页面生成时依赖的文件状态
+    """
+
+    def __init__(self, root, build_dir):
+        self.root = root
+        self.build_dir = build_dir
+        self._digests = {}
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def digest(self, rel_path):
+        """资源文件当前内容的哈希，文件不存在时返回None"""
+        path = safe_join(self.root, rel_path)
+        if path is None:
+            return None
+        try:
+            key = _stat_key(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        cached = self._digests.get(rel_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()[:HASH_LENGTH]
+        self._digests[rel_path] = (key, digest)
+        return digest
+
+    def resolve(self, url_path):
+        """
+        把带哈希的地址解析为原始资源的相对路径
+        返回 (原始路径, 哈希是否与当前内容一致)，不是带哈希的资源地址时返回None
+        """
+        match = _HASHED_RE.match(url_path)
+        if (match is None or not url_path.startswith(f'{ASSETS_DIR}/')
+                or os.path.isfile(os.path.join(self.root, url_path))):
+            return None
+        rel_path = match.group(1) + match.group(3)
+        digest = self.digest(rel_path)
+        if digest is None:
+            return None
+        return rel_path, digest == match.group(2)
+
+    def _rewrite(self, page, html):
+        """改写页面中的本地资源引用，返回 (改写后的页面, 依赖的资源列表)"""
+        page_dir = os.path.dirname(page)
+        deps = []
+
+        def replace(match):
+            url = match.group(3)
+            if '://' in url or url.startswith(('/', 'data:', 'mailto:', 'javascript:')):
+                return match.group(0)
+            rel_path = os.path.normpath(os.path.join(page_dir, url)).replace(os.sep, '/')
+            if not rel_path.startswith(f'{ASSETS_DIR}/'):
+                return match.group(0)
+            digest = self.digest(rel_path)
+            if digest is None:
+                return match.group(0)
+            deps.append(rel_path)
+            return f'{match.group(1)}{match.group(2)}{hashed_name(url, digest)}{match.group(4)}'
+
+        return _REFERENCE_RE.sub(replace, html), deps
+
+    def _fresh(self, page):
+        built = self._pages.get(page)
+        if built is None:
+            return False
+        try:
+            return all(_stat_key(os.path.join(self.root, dep)) == key for dep, key in built.items())
+        except FileNotFoundError:
+            return False
+
+    def build_page(self, page):
+        """生成改写后的页面并预压缩，返回生成的文件路径"""
+        source = os.path.join(self.root, page)
+        source_key = _stat_key(source)
+        with open(source, encoding='utf-8') as f:
+            html, deps = self._rewrite(page, f.read())
+        target = os.path.join(self.build_dir, page)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        atomic_write(target, html.encode('utf-8'), fsync=False)
+        precompress_file(target)
+        built = {page: source_key}
+        for dep in deps:
+            built[dep] = self._digests[dep][0]
+        self._pages[page] = built
+        return target
+
+    def page(self, page):
+        """页面改写后的文件路径，页面或其引用的资源变化后重新生成"""
+        with self._lock:
+            if not self._fresh(page):
+                self.build_page(page)
+        return os.path.join(self.build_dir, page)
+
+    def build(self):
+        """生成前端目录下的所有页面，返回页面数量"""
+        pages = [name for name in os.listdir(self.root) if name.endswith('.html')]
+        for page in pages:
+            self.page(page)
+        return len(pages)
+
+
+def init_assets(app):
+    """
+    为应用创建资源指纹清单并生成页面
+    清单保存在 app.extensions 中，STATIC_FINGERPRINT 关闭时为None
+    """
+    manifest = None
+    if app.config.get('STATIC_FINGERPRINT', True):
+        manifest = AssetManifest(app.config['FRONTEND_DIR'], app.config['STATIC_BUILD_DIR'])
+        try:
+            manifest.build()
+        except Exception as e:
+            app.logger.error('Error building fingerprinted pages: %s', str(e))
+    app.extensions['asset_manifest'] = manifest
+    return manifest
+
+
+def get_asset_manifest():
+    """获取当前应用的资源指纹清单，未初始化时自动创建，关闭指纹时返回None"""
+    if 'asset_manifest' not in current_app.extensions:
+        return init_assets(current_app._get_current_object())
+    return current_app.extensions['asset_manifest']
+
+
+def send_asset(path):
+    """按地址类型发送前端文件：改写后的页面、带哈希的资源或普通静态文件"""
+    config = current_app.config
+    root = config['FRONTEND_DIR']
+    manifest = get_asset_manifest()
+    revalidate = config.get('STATIC_CACHE_CONTROL', 'no-cache')
+
+    if manifest is not None:
+        if path.endswith('.html') and '/' not in path:
+            if safe_join(root, path) is None or not os.path.isfile(os.path.join(root, path)):
+                abort(404)
+            manifest.page(path)
+            response = send_static(manifest.build_dir, path)
+            response.headers['Cache-Control'] = revalidate
+            return response
+
+        resolved = manifest.resolve(path)
+        if resolved is not None:
+            rel_path, current = resolved
+            response = send_static(root, rel_path)
+            # 旧的地址（文件已被修改）仍然返回当前内容，但不允许长期缓存
+            response.headers['Cache-Control'] = (
+                config.get('STATIC_IMMUTABLE_CACHE_CONTROL', 'public, max-age=31536000, immutable')
+                if current else revalidate)
+            return response
+
+    response = send_static(root, path)
+    response.headers['Cache-Control'] = revalidate
+    return response
+
+
+def main(argv=None):
+    from backend.config import Config
+
+    parser = argparse.ArgumentParser(
+        description='Rewrite frontend pages to fingerprinted asset URLs and precompress static files')
+    parser.add_argument('--root', default=Config.FRONTEND_DIR, help='frontend directory')
+    parser.add_argument('--build-dir', default=Config.STATIC_BUILD_DIR, help='directory for rewritten pages')
+    args = parser.parse_args(argv)
+
+    pages = AssetManifest(args.root, args.build_dir).build()
+    created = precompress_directory(args.root)
+    print(f'Built {pages} pages into {args.build_dir}, created {created} compressed files')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""
+性能测试脚本
+每个脚本在临时目录中运行，不会改动 backend/data 下的数据
+"""
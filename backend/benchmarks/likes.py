@@ -0,0 +1,108 @@
+"""
+点赞吞吐量测试
+分别在关闭和开启计数缓冲的情况下，用多个线程并发调用点赞接口，
+比较每秒处理的点赞数，并确认缓冲合并后存储中的点赞数没有丢失
+
+用法：
+    python -m backend.benchmarks.likes
+    python -m backend.benchmarks.likes --backend sqlite --requests 2000 --threads 8
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+# 将项目根目录添加到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+
+def bench_config(directory, backend, buffered):
+    """
+    生成测试使用的配置：数据、日志、指标和缓存目录都在临时目录中，
+    创建应用时不会读写 backend/data 和 backend/logs
+    """
+    from backend.config import Config
+
+    data_dir = os.path.join(directory, 'data')
+    log_dir = os.path.join(directory, 'logs')
+    return type('LikesBenchConfig', (Config,), {
+        'TESTING': True,
+        'DATA_DIR': data_dir,
+        'LOG_DIR': log_dir,
+        'LOG_FILE': os.path.join(log_dir, 'blog.log'),
+        'ACCESS_LOG_FILE': os.path.join(log_dir, 'access.log'),
+        'METRICS_DIR': os.path.join(directory, 'metrics'),
+        'STORAGE_BACKEND': backend,
+        'DATA_FILE': os.path.join(data_dir, 'blog.json'),
+        'DATA_JOURNAL_FILE': os.path.join(data_dir, 'blog.journal'),
+        'SQLITE_DATABASE': os.path.join(data_dir, 'blog.db'),
+        'SHARDED_DATA_DIR': os.path.join(data_dir, 'sharded'),
+        'SEARCH_INDEX_FILE': os.path.join(data_dir, 'search_index.json'),
+        'COUNTER_BUFFER_FILE': os.path.join(data_dir, 'counters.db'),
+        'COUNTER_BUFFER_ENABLED': buffered,
+        'STATIC_BUILD_DIR': os.path.join(data_dir, 'static'),
+        'RENDER_CACHE_DIR': os.path.join(data_dir, 'rendered'),
+        'UPLOAD_FOLDER': os.path.join(directory, 'uploads'),
+        'STATIC_PRECOMPRESS': False,
+    })
+
+
+def run(app, requests, threads):
+    """并发发送点赞请求，返回耗时（秒）"""
+    per_thread = requests // threads
+
+    def worker():
+        client = app.test_client()
+        for _ in range(per_thread):
+            response = client.post('/api/articles/1/like')
+            assert response.status_code == 200, response.data
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure like throughput with and without the counter buffer')
+    parser.add_argument('--backend', default='json', choices=('json', 'sqlite', 'sharded'))
+    parser.add_argument('--requests', type=int, default=1000, help='number of likes per run')
+    parser.add_argument('--threads', type=int, default=4, help='number of concurrent clients')
+    args = parser.parse_args(argv)
+
+    from backend.app import create_app
+    from backend.storage import get_repository
+    from backend.counters import get_counter_buffer
+
+    total = args.requests // args.threads * args.threads
+    # 日志和指标在同一进程中只初始化一次，所有运行共用一个临时目录
+    directory = tempfile.mkdtemp(prefix='blog-bench-')
+    try:
+        for buffered in (False, True):
+            label = 'buffered' if buffered else 'direct'
+            app = create_app(bench_config(os.path.join(directory, label), args.backend, buffered))
+            with app.app_context():
+                repository = get_repository()
+                before = repository.get_article(1)['likes']
+                elapsed = run(app, total, args.threads)
+                buffer = get_counter_buffer()
+                if buffer is not None:
+                    buffer.close()
+                counted = repository.get_article(1)['likes'] - before
+            print(f'{label:>8}: {total / elapsed:8.0f} likes/s  ({total} likes in {elapsed:.2f}s, stored {counted})')
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
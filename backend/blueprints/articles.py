@@ -5,82 +5,163 @@
 
 from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
-from backend.utils import sanitize_html, format_datetime, generate_id, truncate_text, login_required
-from backend.models import load_data, save_data
+from backend.utils import (sanitize_html, login_required, get_page_args, paginate,
+                           derive_article_fields, derive_comment_fields)
+from backend.storage import get_repository, NotFoundError
+from backend.search import get_search_index
+from backend.http_cache import conditional, global_validator, entity_validator, invalidate_responses
+from backend.counters import get_counter_buffer, increment_counter, pending_counters, apply_counters
+from backend.rendering import render_article, prerender_article, discard_rendered
+from backend.blueprints.categories import category_summaries
 from backend.validators import validate_article
 
 articles_bp = Blueprint('articles', __name__)
 
+def update_search_index(update):
+    """
+    同步更新搜索索引
+    文章已经保存成功，索引更新失败只记录日志，下次启动时会重新同步
+    """
+    try:
+        update(get_search_index())
+    except Exception as e:
+        current_app.logger.error('Error updating search index: %s', str(e))
+
+def article_validator(article_id):
+    """
+    单篇文章的校验值，增加阅读量的请求会修改文章，不做条件判断
+    format=html 的响应内容不同，使用不同的 ETag
+    """
+    if request.args.get('increment_views') == 'true':
+        return None
+    prefix = 'article-html' if request.args.get('format') == 'html' else 'article'
+    return entity_validator('articles', article_id, prefix)
+
+def invalidate_article_responses(article_id=None):
+    """
+    文章修改后移除相关的缓存响应
+    文章列表、分类列表（文章数量）和分类详情（文章列表视图）都包含文章数据
+    """
+    tags = ['articles', 'categories', 'category']
+    if article_id is not None:
+        tags.append(f'article:{article_id}')
+    invalidate_responses(*tags)
+
+def invalidate_counter_responses(article_id):
+    """
+    阅读量或点赞数增加后只移除该文章详情的缓存响应
+    列表和分类接口使用存储中的计数，由计数合并带来的版本变化使其失效
+    """
+    invalidate_responses(f'article:{article_id}')
+
+def comment_page(repository, article_id, limit, after=None):
+    """
+    读取一页评论（按ID升序），补上尚未回填的派生字段
+    多取一条用于判断是否还有下一页，返回 (评论列表, 下一页游标)，没有下一页时游标为 None
+    """
+    comments = repository.list_comments(article_id, limit=limit + 1, after=after)
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_cursor = str(comments[-1]['id'])
+    comments = [
+        comment if 'formatted_date' in comment else {**comment, **derive_comment_fields(comment)}
+        for comment in comments
+    ]
+    return comments, next_cursor
+
 @articles_bp.route('/api/articles', methods=['GET'])
+@conditional(lambda: global_validator('articles'), cache_tags=lambda: ['articles'])
 def get_articles():
-    """获取所有文章列表，并为每篇文章生成摘要"""
+    """
+    获取文章列表
+    默认只返回摘要和评论数，不读取文章正文；include_body=true 时返回完整的正文和评论
+    支持 limit 和 cursor 分页，next_cursor 为下一页的游标，没有下一页时为 null
+    阅读量和点赞数为存储中的值，计数缓冲合并后更新，响应在两次合并之间可以一直命中缓存
+    """
     try:
-        data = load_data()
-        articles = data['articles']
-        
-        # 按日期降序排序
-        articles.sort(key=lambda x: x['date'], reverse=True)
+        limit, before = get_page_args(current_app.config.get('ARTICLES_PAGE_SIZE_MAX', 100))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        repository = get_repository()
+        include_body = request.args.get('include_body') == 'true'
+
+        # 按日期降序排列的文章（仓储返回的数据可能是共享的，附加字段都作用在副本上）
+        # 多取一篇用于判断是否还有下一页
+        articles, next_cursor = paginate(repository.list_articles(
+            include_body=include_body,
+            limit=limit + 1 if limit else None,
+            before=before
+        ), limit)
         
         # 获取所有分类
-        categories = data['categories']
+        categories = repository.list_categories()
         categories_dict = {c['id']: c for c in categories}
         
-        # 统计每个分类下的文章数量
-        category_counts = {}
+        article_list = []
         for article in articles:
             category_id = article['categoryId']
-            category_counts[category_id] = category_counts.get(category_id, 0) + 1
+            article = dict(article)
             
-            # 添加分���信息到文章
+            # 添加分类信息到文章
             if category_id in categories_dict:
                 article['category'] = categories_dict[category_id]
             
-            # 生成摘要和格式化日期
-            article['summary'] = truncate_text(article['content'])
-            article['formatted_date'] = format_datetime(article['date'])
-        
-        # 按文章数量降序排序分类
-        sorted_categories = sorted(
-            [
-                {
-                    **cat,
-                    'article_count': category_counts.get(cat['id'], 0)
-                }
-                for cat in categories
-            ],
-            key=lambda x: x['article_count'],
-            reverse=True
-        )
+            # 摘要和格式化日期在写入时生成
+            if 'formatted_date' not in article:
+                article.update(derive_article_fields(article))
+            article_list.append(article)
         
         return jsonify({
-            'articles': articles,
-            'categories': sorted_categories
+            'articles': article_list,
+            'categories': category_summaries(repository),
+            'next_cursor': next_cursor
         })
     except Exception as e:
         current_app.logger.error('Error getting articles: %s', str(e))
         return jsonify({'error': 'Failed to get articles'}), 500
 
 @articles_bp.route('/api/articles/<int:article_id>', methods=['GET'])
+@conditional(article_validator, cache_tags=lambda article_id: ['article', f'article:{article_id}'])
 def get_article(article_id):
-    """获取单篇文章详情"""
+    """
+    获取单篇文章详情
+    附带评论数（comment_count）和第一页评论，comments_cursor 为下一页评论的游标（见评论列表接口）
+    format=html 时正文以服务端渲染并清理后的HTML返回（html 字段），不返回markdown原文
+    """
+    output_format = request.args.get('format', 'markdown')
+    if output_format not in ('markdown', 'html'):
+        return jsonify({'error': 'Invalid format'}), 400
+
     try:
-        data = load_data()
-        article = next((a for a in data['articles'] if a['id'] == article_id), None)
+        repository = get_repository()
+
+        # 增加阅读量（先计入计数缓冲，由后台定期合并到存储）
+        if request.args.get('increment_views') == 'true':
+            try:
+                increment_counter(article_id, 'views')
+                invalidate_counter_responses(article_id)
+            except NotFoundError:
+                pass
+
+        pending = pending_counters()
+        article = repository.get_article(article_id)
         if article:
-            # 增加阅读量
-            if request.args.get('increment_views') == 'true':
-                article['views'] = article.get('views', 0) + 1
-                save_data(data)
-            
-            # 添加分类信息
-            categories = data['categories']
-            category = next((c for c in categories if c['id'] == article['categoryId']), None)
-            article['category'] = category
+            # 添加分类信息（在副本上附加展示字段，避免写入共享数据）
+            article = apply_counters(dict(article), pending)
+            article['category'] = repository.get_category(article['categoryId'])
             
-            # 格式化日期
-            article['formatted_date'] = format_datetime(article['date'])
-            for comment in article.get('comments', []):
-                comment['formatted_date'] = format_datetime(comment['date'])
+            # 格式化日期等派生字段在写入时生成，尚未回填的旧数据在这里补上
+            if 'formatted_date' not in article:
+                article.update(derive_article_fields(article))
+            article['comments'], article['comments_cursor'] = comment_page(
+                repository, article_id, current_app.config.get('COMMENTS_PAGE_SIZE', 20))
+
+            if output_format == 'html':
+                article['html'] = render_article(article)
+                del article['content']
             
             return jsonify(article)
         return jsonify({'error': 'Article not found'}), 404
@@ -95,27 +176,21 @@ def create_article():
     """创建新文章"""
     try:
         data = request.get_json()
-        blog_data = load_data()
-
-        # 清理HTML内容
-        title = sanitize_html(data['title'])
-        content = sanitize_html(data['content'])
 
-        # 创建新文章
-        article = {
-            'id': generate_id(blog_data['articles']),
-            'title': title,
-            'content': content,
+        # 创建新文章，ID由存储分配；摘要、字数等派生字段随文章一起保存
+        fields = {
+            'title': sanitize_html(data['title']),
+            'content': sanitize_html(data['content']),
             'categoryId': data['categoryId'],
             'date': datetime.now().isoformat(),
             'views': 0,
-            'likes': 0,
-            'comments': []
+            'likes': 0
         }
-
-        # 保存文章
-        blog_data['articles'].append(article)
-        save_data(blog_data)
+        fields.update(derive_article_fields(fields))
+        article = get_repository().create_article(fields)
+        invalidate_article_responses()
+        update_search_index(lambda index: index.add_article(article))
+        prerender_article(article)
 
         return jsonify(article), 201
     except Exception as e:
@@ -129,19 +204,30 @@ def update_article(article_id):
     """更新文章"""
     try:
         data = request.get_json()
-        blog_data = load_data()
-        article = next((a for a in blog_data['articles'] if a['id'] == article_id), None)
 
-        if not article:
-            return jsonify({'error': 'Article not found'}), 404
-
-        # 更新文章字段
-        article['title'] = sanitize_html(data['title'])
-        article['content'] = sanitize_html(data['content'])
-        article['categoryId'] = data['categoryId']
+        # 更新文章字段，正文变化后重新生成派生字段
+        fields = {
+            'title': sanitize_html(data['title']),
+            'content': sanitize_html(data['content']),
+            'categoryId': data['categoryId']
+        }
+        fields.update(derive_article_fields(fields))
+        # 记录修改前的正文（仓储返回的文章可能会被原地修改），正文变化后移除旧正文的渲染结果
+        repository = get_repository()
+        previous = repository.get_article(article_id)
+        previous_content = previous.get('content') if previous is not None else None
+        pending = pending_counters()
+        article = repository.update_article(article_id, fields)
+        invalidate_article_responses(article_id)
+        update_search_index(lambda index: index.add_article(article))
+        prerender_article(article)
+        if previous_content is not None and previous_content != article.get('content'):
+            discard_rendered(previous_content)
 
-        save_data(blog_data)
-        return jsonify(article)
+        # 与读取接口一致，返回的阅读量和点赞数包括缓冲中尚未合并的增量
+        return jsonify(apply_counters(dict(article), pending))
+    except NotFoundError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         current_app.logger.error('Error updating article: %s', str(e))
         return jsonify({'error': 'Failed to update article'}), 500
@@ -151,16 +237,21 @@ def update_article(article_id):
 def delete_article(article_id):
     """删除文章"""
     try:
-        blog_data = load_data()
-        article = next((a for a in blog_data['articles'] if a['id'] == article_id), None)
-
-        if not article:
-            return jsonify({'error': 'Article not found'}), 404
-
-        blog_data['articles'].remove(article)
-        save_data(blog_data)
+        repository = get_repository()
+        previous = repository.get_article(article_id)
+        previous_content = previous.get('content') if previous is not None else None
+        repository.delete_article(article_id)
+        buffer = get_counter_buffer()
+        if buffer is not None:
+            buffer.discard(article_id)
+        invalidate_article_responses(article_id)
+        update_search_index(lambda index: index.remove_article(article_id))
+        if previous_content is not None:
+            discard_rendered(previous_content)
 
         return '', 204
+    except NotFoundError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         current_app.logger.error('Error deleting article: %s', str(e))
         return jsonify({'error': 'Failed to delete article'}), 500
@@ -169,16 +260,12 @@ def delete_article(article_id):
 def like_article(article_id):
     """为文章点赞"""
     try:
-        blog_data = load_data()
-        article = next((a for a in blog_data['articles'] if a['id'] == article_id), None)
-
-        if not article:
-            return jsonify({'error': 'Article not found'}), 404
-
-        article['likes'] = article.get('likes', 0) + 1
-        save_data(blog_data)
+        likes = increment_counter(article_id, 'likes')
+        invalidate_counter_responses(article_id)
 
-        return jsonify({'likes': article['likes']})
+        return jsonify({'likes': likes})
+    except NotFoundError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         current_app.logger.error('Error liking article: %s', str(e))
         return jsonify({'error': 'Failed to like article'}), 500
\ No newline at end of file
@@ -1,23 +1,35 @@
 """
 认证蓝图
 处理用户登录、注册、登出和密码修改等认证相关功能
+
+登录和注册返回短期有效的访问令牌（token）和长期有效的刷新令牌（refresh_token）；
+访问令牌过期后用 /api/auth/refresh 换取新的访问令牌，不需要再次验证密码。
+密码的哈希和校验在专用线程池中进行，登录请求按IP和用户名限流（见 backend.passwords）
 """
 
+import math
 from flask import Blueprint, request, jsonify, current_app
-from backend.utils import check_password, hash_password, generate_token, login_required
-from backend.models import load_data, save_data
+from backend.utils import generate_token, login_required
+from backend.utils import verify_token as verify_jwt
+from backend.tokens import password_fingerprint
+from backend.passwords import get_password_hasher, get_login_limiter, PasswordHasherBusy
+from backend.storage import get_repository, ConflictError
 
 auth_bp = Blueprint('auth', __name__)
 
+def too_many_requests(message, retry_after=1):
+    """429响应，Retry-After 为建议的重试间隔（秒）"""
+    response = jsonify({'error': message})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, 429
+
 @auth_bp.route('/api/auth/register', methods=['POST'])
 def register():
     """处理管理员注册请求"""
     try:
-        # 加载数据
-        data = load_data()
-        
         # 检查是否已有管理员
-        if data.get('admin'):
+        repository = get_repository()
+        if repository.get_admin():
             return jsonify({'error': 'Administrator already exists'}), 400
             
         # 获取注册信息
@@ -29,13 +41,16 @@ def register():
             return jsonify({'error': 'Missing username or password'}), 400
             
         # 创建管理员账号
-        data['admin'] = {
+        admin = {
             'username': username,
-            'password': hash_password(password)
+            'password': get_password_hasher().hash(password)
         }
         
-        # 保存数据
-        save_data(data)
+        # 存储在写入时会再次检查，避免并发注册覆盖已有管理员
+        try:
+            repository.create_admin(admin)
+        except ConflictError as e:
+            return jsonify({'error': str(e)}), e.status_code
         
         # 生成token
         token = generate_token(username)
@@ -44,8 +59,11 @@ def register():
         return jsonify({
             'success': True,
             'token': token,
+            'refresh_token': generate_token(username, 'refresh', admin['password']),
             'username': username
         })
+    except PasswordHasherBusy:
+        return too_many_requests('Server is busy, please try again later')
     except Exception as e:
         current_app.logger.error('Registration error: %s', str(e))
         return jsonify({'error': 'Registration failed'}), 500
@@ -54,8 +72,7 @@ def register():
 def check_admin():
     """检查是否已有管理员账号"""
     try:
-        data = load_data()
-        has_admin = bool(data.get('admin'))
+        has_admin = bool(get_repository().get_admin())
         return jsonify({
             'hasAdmin': has_admin
         })
@@ -74,15 +91,20 @@ def login():
         if not username or not password:
             return jsonify({'error': 'Missing username or password'}), 400
             
+        # 准入控制：同一IP或同一用户名的尝试过于频繁时不计算密码哈希
+        retry_after = get_login_limiter().acquire(request.remote_addr, username)
+        if retry_after:
+            current_app.logger.warning('Login throttled: %s from %s', username, request.remote_addr)
+            return too_many_requests('Too many login attempts, please try again later', retry_after)
+            
         # 加载管理员信息
-        blog_data = load_data()
-        admin = blog_data.get('admin')
+        admin = get_repository().get_admin()
         
         if not admin:
             return jsonify({'error': 'No administrator account exists'}), 401
             
         # 验证用户名和密码
-        if username != admin['username'] or not check_password(password, admin['password']):
+        if username != admin['username'] or not get_password_hasher().check(password, admin['password']):
             current_app.logger.warning('Login failed: invalid credentials for user - %s', username)
             return jsonify({'error': 'Invalid username or password'}), 401
             
@@ -92,12 +114,44 @@ def login():
         return jsonify({
             'success': True,
             'token': token,
+            'refresh_token': generate_token(username, 'refresh', admin['password']),
             'username': username
         })
+    except PasswordHasherBusy:
+        return too_many_requests('Server is busy, please try again later')
     except Exception as e:
         current_app.logger.error('Login error: %s', str(e))
         return jsonify({'error': 'Login failed'}), 500
 
+@auth_bp.route('/api/auth/refresh', methods=['POST'])
+def refresh():
+    """用刷新令牌换取新的访问令牌，只验证令牌签名和密码指纹，不计算密码哈希"""
+    try:
+        data = request.get_json(silent=True) or {}
+        refresh_token = data.get('refresh_token')
+        
+        if not refresh_token:
+            return jsonify({'error': 'No refresh token provided'}), 400
+            
+        payload = verify_jwt(refresh_token, 'refresh')
+        if payload is None:
+            return jsonify({'error': 'Invalid or expired refresh token'}), 401
+            
+        # 管理员被替换或修改过密码后，之前签发的刷新令牌不再有效
+        admin = get_repository().get_admin()
+        if (not admin or payload.get('username') != admin['username']
+                or payload.get('pwd') != password_fingerprint(admin['password'])):
+            return jsonify({'error': 'Invalid or expired refresh token'}), 401
+            
+        return jsonify({
+            'success': True,
+            'token': generate_token(admin['username']),
+            'username': admin['username']
+        })
+    except Exception as e:
+        current_app.logger.error('Token refresh error: %s', str(e))
+        return jsonify({'error': 'Token refresh failed'}), 500
+
 @auth_bp.route('/api/auth/logout', methods=['POST'])
 @login_required
 def logout():
@@ -123,22 +177,31 @@ def change_password():
             return jsonify({'error': 'Missing old or new password'}), 400
             
         # 加载管理员信息
-        blog_data = load_data()
-        admin = blog_data.get('admin')
+        repository = get_repository()
+        admin = repository.get_admin()
         
         if not admin:
             return jsonify({'error': 'No administrator account exists'}), 401
             
         # 验证旧密码
-        if not check_password(old_password, admin['password']):
+        hasher = get_password_hasher()
+        if not hasher.check(old_password, admin['password']):
             return jsonify({'error': 'Invalid old password'}), 401
             
         # 更新密码
-        admin['password'] = hash_password(new_password)
-        save_data(blog_data)
+        password = hasher.hash(new_password)
+        repository.update_admin({'password': password})
+        # 已签发的刷新令牌随密码指纹失效，返回新的令牌使当前客户端保持登录
         
         current_app.logger.info('Password changed successfully for user: %s', admin['username'])
-        return jsonify({'success': True, 'message': 'Password updated successfully'})
+        return jsonify({
+            'success': True,
+            'message': 'Password updated successfully',
+            'token': generate_token(admin['username']),
+            'refresh_token': generate_token(admin['username'], 'refresh', password)
+        })
+    except PasswordHasherBusy:
+        return too_many_requests('Server is busy, please try again later')
     except Exception as e:
         current_app.logger.error('Error changing password: %s', str(e))
         return jsonify({'error': 'Failed to change password'}), 500 
\ No newline at end of file
@@ -0,0 +1,19 @@
+"""
+缓存蓝图
+提供响应缓存的统计信息
+"""
+
+from flask import Blueprint, jsonify
+from backend.utils import login_required
+from backend.http_cache import get_response_cache
+
+cache_bp = Blueprint('cache', __name__)
+
+@cache_bp.route('/api/cache/stats', methods=['GET'])
+@login_required
+def cache_stats():
+    """获取响应缓存的命中、未命中、淘汰和失效次数以及占用的内存"""
+    cache = get_response_cache()
+    if cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **cache.stats()})
@@ -4,61 +4,94 @@
 """
 
 from flask import Blueprint, request, jsonify, current_app
-from backend.utils import sanitize_html, generate_id, login_required, truncate_text, format_datetime
-from backend.models import load_data, save_data
+from backend.utils import sanitize_html, login_required, format_datetime, get_page_args, paginate
+from backend.storage import get_repository, StorageError
+from backend.http_cache import conditional, global_validator, invalidate_responses
 
 categories_bp = Blueprint('categories', __name__)
 
+# 没有文章的分类的聚合数据
+EMPTY_CATEGORY_STATS = {'article_count': 0, 'total_views': 0, 'total_likes': 0, 'latest_date': None}
+
+def get_category_stats(repository):
+    """
+    获取各分类的聚合数据（文章数、总阅读量、总点赞数、最新文章日期）
+    总阅读量和总点赞数不包括计数缓冲中尚未合并的增量，合并后由存储更新，
+    这样响应只随存储版本变化，每次浏览和点赞不会使分类接口的缓存失效
+    """
+    return repository.category_stats()
+
+def category_summaries(repository):
+    """所有分类及其聚合数据（使用副本，不改动共享的缓存数据），按文章数量降序排列"""
+    stats = get_category_stats(repository)
+    categories = [
+        {**category, **stats.get(category['id'], EMPTY_CATEGORY_STATS)}
+        for category in repository.list_categories()
+    ]
+    categories.sort(key=lambda x: x['article_count'], reverse=True)
+    return categories
+
 @categories_bp.route('/api/categories', methods=['GET'])
+@conditional(lambda: global_validator('categories'), cache_tags=lambda: ['categories'])
 def get_categories():
-    """获取所有文章分类，包含每个分类的文章数量"""
+    """
+    获取所有文章分类，包含每个分类的文章数量、总阅读量、总点赞数和最新文章日期
+    聚合数据由存储增量维护，不需要遍历文章
+    """
     try:
-        data = load_data()
-        categories = data['categories']
-        articles = data['articles']
-        
-        # 统计每个分类下的文章数量
-        category_counts = {}
-        for article in articles:
-            category_id = article['categoryId']
-            category_counts[category_id] = category_counts.get(category_id, 0) + 1
-        
-        # 添加文章数量到分类信息中
-        for category in categories:
-            category['article_count'] = category_counts.get(category['id'], 0)
-        
-        # 按文章数量降序排序
-        categories.sort(key=lambda x: x['article_count'], reverse=True)
-        
-        return jsonify(categories)
+        return jsonify(category_summaries(get_repository()))
     except Exception as e:
         current_app.logger.error('Error getting categories: %s', str(e))
         return jsonify({'error': 'Failed to get categories'}), 500
 
+def invalidate_category_responses(category_id=None):
+    """
+    分类修改后移除相关的缓存响应
+    文章列表和文章详情中附带了分类信息，同样需要失效
+    """
+    tags = ['categories', 'articles', 'article']
+    if category_id is not None:
+        tags.append(f'category:{category_id}')
+    invalidate_responses(*tags)
+
 @categories_bp.route('/api/categories/<int:category_id>', methods=['GET'])
+@conditional(lambda category_id: global_validator(f'category-{category_id}'),
+             cache_tags=lambda category_id: ['category', f'category:{category_id}'])
 def get_category(category_id):
-    """获取单个分类的详细���息，包含该分类下的所有文章"""
+    """
+    获取单个分类的详细信息，包含该分类下的文章列表
+    与文章列表接口一样支持 limit 和 cursor 分页
+    """
+    try:
+        limit, before = get_page_args(current_app.config.get('ARTICLES_PAGE_SIZE_MAX', 100))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
-        data = load_data()
-        category = next((c for c in data['categories'] if c['id'] == category_id), None)
+        repository = get_repository()
+        category = repository.get_category(category_id)
         
         if not category:
             return jsonify({'error': 'Category not found'}), 404
             
-        # 获取该分类下的所有文章
-        articles = [a for a in data['articles'] if a['categoryId'] == category_id]
-        
-        # 按日期降序排序文章
-        articles.sort(key=lambda x: x['date'], reverse=True)
-        
-        # 为文章添加摘要和格式化日期
-        for article in articles:
-            article['summary'] = truncate_text(article['content'])
-            article['formatted_date'] = format_datetime(article['date'])
-        
-        # 添加文章数量到分类信息中
-        category['article_count'] = len(articles)
+        # 获取该分类下按日期降序排列的文章列表视图（含摘要，不含正文），多取一篇用于判断是否还有下一页
+        articles, next_cursor = paginate(repository.list_articles(
+            category_id,
+            limit=limit + 1 if limit else None,
+            before=before
+        ), limit)
+        
+        # 格式化日期在写入时生成，尚未回填的旧数据在这里补上（在副本上，不改动共享的数据）；
+        # 与文章列表一样，阅读量和点赞数在计数缓冲合并后更新
+        articles = [
+            {**article, 'formatted_date': article.get('formatted_date') or format_datetime(article['date'])}
+            for article in articles
+        ]
+        
+        # 添加聚合数据到分类信息中
+        category = {**category, **get_category_stats(repository).get(category_id, EMPTY_CATEGORY_STATS)}
         category['articles'] = articles
+        category['next_cursor'] = next_cursor
         
         return jsonify(category)
     except Exception as e:
@@ -82,25 +115,13 @@ def create_category():
         # 清理分类名称
         name = sanitize_html(name)
         
-        # 检查分类名称是否已存在
-        blog_data = load_data()
-        categories = blog_data.get('categories', [])
-        if any(c['name'] == name for c in categories):
-            return jsonify({'error': 'Category already exists'}), 400
-            
-        # 创建新分类
-        category = {
-            'id': generate_id(categories),
-            'name': name,
-            'description': sanitize_html(data.get('description', '')),
-            'article_count': 0
-        }
+        # 创建新分类，名称已存在时由存储抛出冲突错误
+        category = get_repository().create_category(name, sanitize_html(data.get('description', '')))
+        invalidate_category_responses()
         
-        categories.append(category)
-        blog_data['categories'] = categories
-        save_data(blog_data)
-        
-        return jsonify(category), 201
+        return jsonify({**category, **EMPTY_CATEGORY_STATS}), 201
+    except StorageError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         current_app.logger.error('Error creating category: %s', str(e))
         return jsonify({'error': 'Failed to create category'}), 500
@@ -122,27 +143,20 @@ def update_category(category_id):
         # 清理分类名称
         name = sanitize_html(name)
         
-        # 查找并更新分类
-        blog_data = load_data()
-        categories = blog_data.get('categories', [])
-        category = next((c for c in categories if c['id'] == category_id), None)
-        
-        if not category:
-            return jsonify({'error': 'Category not found'}), 404
-            
-        # 检查名称是否与其他分类重复
-        if any(c['name'] == name and c['id'] != category_id for c in categories):
-            return jsonify({'error': 'Category name already exists'}), 400
-            
-        category['name'] = name
-        category['description'] = sanitize_html(data.get('description', category.get('description', '')))
-        
-        # 统计该分类下的文章数量
-        category['article_count'] = len([a for a in blog_data['articles'] if a['categoryId'] == category_id])
+        # 查找并更新分类，分类不存在或名称与其他分类重复时由存储抛出错误
+        fields = {'name': name}
+        if 'description' in data:
+            fields['description'] = sanitize_html(data['description'])
+        repository = get_repository()
+        category = repository.update_category(category_id, fields)
+        invalidate_category_responses(category_id)
         
-        save_data(blog_data)
+        # 附加该分类的聚合数据
+        stats = get_category_stats(repository).get(category_id, EMPTY_CATEGORY_STATS)
         
-        return jsonify(category)
+        return jsonify({**category, **stats})
+    except StorageError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         current_app.logger.error('Error updating category: %s', str(e))
         return jsonify({'error': 'Failed to update category'}), 500
@@ -152,25 +166,13 @@ def update_category(category_id):
 def delete_category(category_id):
     """删除分类"""
     try:
-        blog_data = load_data()
-        categories = blog_data.get('categories', [])
-        articles = blog_data.get('articles', [])
-        
-        # 检查是否有文章使用此分类
-        if any(a['categoryId'] == category_id for a in articles):
-            return jsonify({
-                'error': 'Cannot delete category that has articles'
-            }), 400
-            
-        # 查找并删除分类
-        category = next((c for c in categories if c['id'] == category_id), None)
-        if not category:
-            return jsonify({'error': 'Category not found'}), 404
-            
-        categories.remove(category)
-        save_data(blog_data)
+        # 分类下仍有文章或分类不存在时由存储抛出错误
+        get_repository().delete_category(category_id)
+        invalidate_category_responses(category_id)
         
         return '', 204
+    except StorageError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         current_app.logger.error('Error deleting category: %s', str(e))
         return jsonify({'error': 'Failed to delete category'}), 500 
\ No newline at end of file
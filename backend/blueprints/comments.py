@@ -1,38 +1,132 @@
 """
 评论蓝图
-处理文章评论的添加和删除功能
+处理文章评论的分页读取、实时推送、添加和删除功能
 """
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from datetime import datetime
-from backend.utils import sanitize_html, format_datetime, generate_id, login_required
-from backend.models import load_data, save_data
+from backend.utils import sanitize_html, login_required, derive_comment_fields, get_comment_page_args
+from backend.storage import get_repository, NotFoundError
 from backend.validators import validate_comment
+from backend.http_cache import conditional, entity_validator
+from backend.streams import (get_comment_broker, publish_comment_event, CommentFeed,
+                             event_stream, long_poll)
+from backend.blueprints.articles import invalidate_article_responses, comment_page
 
 comments_bp = Blueprint('comments', __name__)
 
+@comments_bp.route('/api/articles/<int:article_id>/comments', methods=['GET'])
+@conditional(lambda article_id: entity_validator('articles', article_id, 'comments'),
+             cache_tags=lambda article_id: ['article', f'article:{article_id}'])
+def get_comments(article_id):
+    """
+    分页获取文章的评论，按评论ID升序排列
+    limit 为每页数量（默认 COMMENTS_PAGE_SIZE），cursor 为上一页返回的 next_cursor，
+    没有下一页时 next_cursor 为 null
+    """
+    config = current_app.config
+    try:
+        limit, after = get_comment_page_args(config.get('COMMENTS_PAGE_SIZE', 20),
+                                             config.get('COMMENTS_PAGE_SIZE_MAX', 100))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        repository = get_repository()
+        # 评论数从列表视图读取，不需要加载文章正文
+        listing = repository.list_articles_by_ids([article_id])
+        if not listing:
+            return jsonify({'error': 'Article not found'}), 404
+        comments, next_cursor = comment_page(repository, article_id, limit, after)
+        return jsonify({
+            'comments': comments,
+            'comment_count': listing[0]['comment_count'],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        current_app.logger.error('Error getting comments: %s', str(e))
+        return jsonify({'error': 'Failed to get comments'}), 500
+
+def accepts_event_stream():
+    """客户端是否明确请求 Server-Sent Events（EventSource 发送 Accept: text/event-stream）"""
+    return any(value == 'text/event-stream' and quality > 0 for value, quality in request.accept_mimetypes)
+
+@comments_bp.route('/api/articles/<int:article_id>/comments/stream', methods=['GET'])
+def stream_comments(article_id):
+    """
+    推送文章的新增和删除评论（见 backend.streams）
+    请求 text/event-stream 时以 Server-Sent Events 推送，从 Last-Event-ID 或 since 之后开始，
+    都没有时从当前最新的评论之后开始；其他请求为长轮询，必须提供 since（上次响应的 next_since）
+    """
+    config = current_app.config
+    sse = accepts_event_stream()
+    since = request.headers.get('Last-Event-ID') if sse else None
+    since = since or request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'Invalid since'}), 400
+        if since < 0:
+            return jsonify({'error': 'Invalid since'}), 400
+    elif not sse:
+        return jsonify({'error': 'since is required'}), 400
+
+    try:
+        repository = get_repository()
+        seq = repository.get_comment_seq(article_id)
+        if seq is None:
+            return jsonify({'error': 'Article not found'}), 404
+        subscription = get_comment_broker().subscribe(article_id)
+        if subscription is None:
+            response = jsonify({'error': 'Too many comment streams'})
+            response.headers['Retry-After'] = str(config.get('COMMENT_STREAM_SYNC_INTERVAL', 5))
+            return response, 503
+        feed = CommentFeed(repository, subscription, seq if since is None else since,
+                           config.get('COMMENTS_PAGE_SIZE_MAX', 100))
+    except Exception as e:
+        current_app.logger.error('Error opening comment stream: %s', str(e))
+        return jsonify({'error': 'Failed to open comment stream'}), 500
+
+    if not sse:
+        try:
+            events, next_since = long_poll(feed, config.get('COMMENT_STREAM_LONGPOLL_TIMEOUT', 25),
+                                           config.get('COMMENT_STREAM_SYNC_INTERVAL', 5))
+        except Exception as e:
+            current_app.logger.error('Error polling comments: %s', str(e))
+            return jsonify({'error': 'Failed to poll comments'}), 500
+        response = jsonify({'events': events, 'comment_count': feed.count, 'next_since': next_since})
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    stream = event_stream(feed,
+                          heartbeat=config.get('COMMENT_STREAM_HEARTBEAT', 15),
+                          sync_interval=config.get('COMMENT_STREAM_SYNC_INTERVAL', 5),
+                          max_age=config.get('COMMENT_STREAM_MAX_AGE', 300))
+    response = Response(stream_with_context(stream), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-store'
+    # 关闭反向代理（nginx）的响应缓冲，事件立即送达客户端
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @comments_bp.route('/api/articles/<int:article_id>/comments', methods=['POST'])
 @validate_comment
 def add_comment(article_id):
     """为指定文章添加评论"""
     try:
-        data = load_data()
-        article = next((a for a in data['articles'] if a['id'] == article_id), None)
-        if not article:
-            return jsonify({'error': 'Article not found'}), 404
-
         comment = request.json
-        if 'comments' not in article:
-            article['comments'] = []
-        
-        comment['id'] = generate_id(article['comments'])
         comment['date'] = datetime.now().isoformat()
         comment['content'] = sanitize_html(comment['content'])
-        
-        article['comments'].append(comment)
-        save_data(data)
-        comment['formatted_date'] = format_datetime(comment['date'])
+        comment.pop('id', None)
+        comment.update(derive_comment_fields(comment))
+
+        # 评论ID由存储分配
+        comment = get_repository().add_comment(article_id, comment)
+        invalidate_article_responses(article_id)
+        publish_comment_event(article_id, {'type': 'comment', 'comment': comment})
         return jsonify(comment), 201
+    except NotFoundError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         current_app.logger.error('Error adding comment: %s', str(e))
         return jsonify({'error': 'Failed to add comment'}), 500
@@ -42,19 +136,13 @@ def add_comment(article_id):
 def delete_comment(article_id, comment_id):
     """删除指定文章的评论"""
     try:
-        data = load_data()
-        article = next((a for a in data['articles'] if a['id'] == article_id), None)
-        if not article:
-            return jsonify({'error': 'Article not found'}), 404
-            
-        comment = next((c for c in article['comments'] if c['id'] == comment_id), None)
-        if not comment:
-            return jsonify({'error': 'Comment not found'}), 404
-            
-        article['comments'].remove(comment)
-        save_data(data)
+        get_repository().delete_comment(article_id, comment_id)
+        invalidate_article_responses(article_id)
+        publish_comment_event(article_id, {'type': 'delete', 'id': comment_id})
         
         return '', 204
+    except NotFoundError as e:
+        return jsonify({'error': str(e)}), e.status_code
     except Exception as e:
         current_app.logger.error('Error deleting comment: %s', str(e))
-        return jsonify({'error': 'Failed to delete comment'}), 500 
\ No newline at end of file
+        return jsonify({'error': 'Failed to delete comment'}), 500
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+指标蓝图
+以 Prometheus 文本格式输出所有工作进程汇总后的指标（见 backend.metrics）
+"""
+
+import hmac
+from flask import Blueprint, Response, jsonify, current_app, request
+from backend.metrics import get_metrics_collector
+
+metrics_bp = Blueprint('metrics', __name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+@metrics_bp.route('/api/metrics', methods=['GET'])
+def metrics():
+    """
+    获取指标
+    配置了 METRICS_TOKEN 时需要在 Authorization 头中携带 Bearer <METRICS_TOKEN>
+    """
+    collector = get_metrics_collector()
+    if collector is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+
+    expected = current_app.config.get('METRICS_TOKEN')
+    if expected:
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme != 'Bearer' or not hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8')):
+            return jsonify({'error': 'Invalid metrics token'}), 401
+
+    response = Response(collector.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
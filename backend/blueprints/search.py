@@ -0,0 +1,59 @@
+"""
+搜索蓝图
+提供文章全文搜索接口
+"""
+
+from flask import Blueprint, request, jsonify, current_app
+from backend.utils import format_datetime
+from backend.storage import get_repository
+from backend.search import get_search_index
+from backend.counters import pending_counters, apply_counters
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('/api/search', methods=['GET'])
+def search_articles():
+    """
+    搜索文章标题和正文
+    参数：q 查询文本，category 分类ID，limit 每页数量（默认10），offset 跳过的结果数量
+    结果按相关度降序排列，next_offset 为下一页的 offset，没有下一页时为 null
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Search query is required'}), 400
+    try:
+        category_id = request.args.get('category', type=int)
+        limit = int(request.args.get('limit', 10))
+        offset = int(request.args.get('offset', 0))
+        if limit < 1 or offset < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'Invalid search parameters'}), 400
+    limit = min(limit, current_app.config.get('ARTICLES_PAGE_SIZE_MAX', 100))
+
+    try:
+        hits, total = get_search_index().search(query, category_id, limit, offset)
+        scores = dict(hits)
+
+        repository = get_repository()
+        pending = pending_counters()
+        categories = {c['id']: c for c in repository.list_categories()}
+        results = []
+        for article in repository.list_articles_by_ids([article_id for article_id, _ in hits]):
+            results.append(apply_counters({
+                **article,
+                'category': categories.get(article['categoryId']),
+                'formatted_date': article.get('formatted_date') or format_datetime(article['date']),
+                'score': round(scores[article['id']], 4)
+            }, pending))
+
+        next_offset = offset + limit if offset + limit < total else None
+        return jsonify({
+            'query': query,
+            'total': total,
+            'results': results,
+            'next_offset': next_offset
+        })
+    except Exception as e:
+        current_app.logger.error('Error searching articles: %s', str(e))
+        return jsonify({'error': 'Failed to search articles'}), 500
@@ -4,13 +4,20 @@
 """
 
 import os
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
+import re
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, abort
 from werkzeug.utils import secure_filename
 from backend.utils import login_required
-import uuid
+from backend.images import store_upload, UploadTooLargeError, get_image_pipeline, choose_variant
 
 uploads_bp = Blueprint('uploads', __name__)
 
+# 按内容哈希命名的图片，内容不会变化
+_CONTENT_FILENAME_RE = re.compile(r'^[0-9a-f]{64}\.[a-z]+$')
+
+# multipart 表单中除文件内容以外的部分（分隔符、字段头等）允许的大小
+MULTIPART_OVERHEAD = 16 * 1024
+
 def allowed_file(filename, allowed_extensions):
     """检查文件扩展名是否允许"""
     return '.' in filename and \
@@ -19,8 +26,17 @@ def allowed_file(filename, allowed_extensions):
 @uploads_bp.route('/api/upload/image', methods=['POST'])
 @login_required
 def upload_image():
-    """处理图片上传"""
+    """
+    处理图片上传
+    图片分块保存并按内容哈希命名，重复上传同一张图片时返回已有的文件（duplicate 为 true）
+    """
     try:
+        max_bytes = current_app.config['UPLOAD_MAX_BYTES']
+
+        # 请求体明显超过上限时不解析表单，直接拒绝
+        if request.content_length and request.content_length > max_bytes + MULTIPART_OVERHEAD:
+            return jsonify({'error': 'File too large'}), 400
+
         if 'image' not in request.files:
             return jsonify({'error': 'No image file provided'}), 400
 
@@ -29,40 +45,67 @@ def upload_image():
             return jsonify({'error': 'No image file provided'}), 400
 
         # 检查文件类型
-        allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-        if not allowed_file(file.filename, allowed_extensions):
+        if not allowed_file(file.filename, current_app.config['UPLOAD_ALLOWED_EXTENSIONS']):
             return jsonify({'error': 'Invalid file type'}), 400
 
-        # 检查文件大小（5MB���制）
-        if len(file.read()) > 5 * 1024 * 1024:  # 5MB
+        # 分块保存，同时检查文件大小并计算哈希
+        extension = secure_filename(file.filename).rsplit('.', 1)[1].lower()
+        try:
+            filename, created = store_upload(
+                file.stream, extension, current_app.config['UPLOAD_FOLDER'], max_bytes,
+                chunk_size=current_app.config.get('UPLOAD_CHUNK_SIZE', 64 * 1024)
+            )
+        except UploadTooLargeError:
             return jsonify({'error': 'File too large'}), 400
-        file.seek(0)  # 重置文件指针
 
-        # 生成安全的文件名
-        original_filename = secure_filename(file.filename)
-        extension = original_filename.rsplit('.', 1)[1].lower()
-        filename = f"{uuid.uuid4().hex}.{extension}"
-
-        # 确保上传目录存在
-        upload_folder = os.path.join(current_app.root_path, '..', 'uploads')
-        if not os.path.exists(upload_folder):
-            os.makedirs(upload_folder)
-
-        # 保存文件
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
+        # 在后台进程中生成缩放版本和 WebP 版本
+        pipeline = get_image_pipeline()
+        if pipeline is not None and pipeline.manifest(filename) is None:
+            pipeline.submit(filename)
 
         return jsonify({
             'filename': filename,
-            'url': f'/uploads/{filename}'
+            'url': f'/uploads/{filename}',
+            'duplicate': not created
         })
 
     except Exception as e:
         current_app.logger.error('Error uploading image: %s', str(e))
         return jsonify({'error': 'Failed to upload image'}), 500
 
+def accepts_webp():
+    """客户端是否明确声明接受 WebP（只有 */* 的客户端不一定支持）"""
+    return any(value == 'image/webp' and quality > 0 for value, quality in request.accept_mimetypes)
+
 @uploads_bp.route('/uploads/<path:filename>')
 def serve_image(filename):
-    """提供图片访问服务"""
-    upload_folder = os.path.join(current_app.root_path, '..', 'uploads')
-    return send_from_directory(upload_folder, filename) 
\ No newline at end of file
+    """
+    提供图片访问服务
+    参数 w 为需要的显示宽度（像素），按宽度和 Accept 头选择合适的派生版本；
+    按内容哈希命名的图片可以长期缓存，派生版本尚未生成时返回原图并要求客户端重新确认
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    width = request.args.get('w', type=int)
+    webp = accepts_webp()
+    pipeline = get_image_pipeline()
+    # 只有按内容哈希命名的图片才有派生版本，其他路径不查找清单（清单路径由文件名拼接而成）
+    content_named = _CONTENT_FILENAME_RE.fullmatch(filename) is not None
+    # 不存在的图片直接返回404，不为任意的文件名提交生成任务
+    if content_named and not os.path.isfile(os.path.join(upload_folder, filename)):
+        abort(404)
+    manifest = pipeline.manifest(filename) if pipeline is not None and content_named else None
+
+    path = filename
+    if manifest is not None:
+        path = choose_variant(manifest, width, webp)
+    elif pipeline is not None and (width or webp) and content_named:
+        pipeline.submit(filename)
+
+    response = send_from_directory(upload_folder, path)
+    if pipeline is not None:
+        response.vary.add('Accept')
+    if content_named:
+        pending = pipeline is not None and manifest is None and (width or webp)
+        response.headers['Cache-Control'] = (
+            'no-cache' if pending else current_app.config['STATIC_IMMUTABLE_CACHE_CONTROL'])
+    return response
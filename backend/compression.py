@@ -0,0 +1,227 @@
+"""
+响应压缩模块
+按请求的 Accept-Encoding 协商响应的压缩方式（br 优先，其次 gzip）：
+
+1. 前端静态资源预先压缩为同目录下的 .gz 文件（安装了 brotli 时另外生成 .br 文件），
+   请求时直接发送压缩好的文件（send_file，由服务器使用 sendfile 发送），不在请求中压缩；
+   预压缩文件的修改时间与源文件相同，源文件更新后重新生成
+2. 超过 COMPRESS_MIN_SIZE 的 JSON 响应在返回前压缩；响应缓存中的响应压缩后的字节
+   与缓存项一起保存（见 backend.http_cache），命中缓存时不再重复压缩
+3. 压缩后的响应带有 Vary: Accept-Encoding，强 ETag 加上编码后缀（例如 "article-1-3-gzip"），
+   不同编码的响应不会共用同一个 ETag
+
+预压缩在启动时于后台线程中进行（gunicorn 预加载应用时在主进程中同步完成），也可以在部署时预先执行：
+    python -m backend.compression
+"""
+
+import os
+import sys
+import gzip
+import argparse
+import mimetypes
+import threading
+
+# 将项目根目录添加到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from flask import request, current_app, send_file, abort
+from werkzeug.security import safe_join
+from backend.models import atomic_write, exclusive_file_lock
+
+# brotli 是可选依赖，未安装时只使用 gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 服务端支持的编码，按优先级排列
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# 编码对应的预压缩文件后缀
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# 值得压缩的静态文件类型，图片和 woff 字体本身已经压缩过
+STATIC_EXTENSIONS = {'.html', '.js', '.css', '.json', '.svg', '.map', '.md', '.txt', '.xml',
+                     '.ttf', '.otf', '.eot', '.ico'}
+
+# 小于该大小的静态文件不预压缩
+STATIC_MIN_SIZE = 256
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=5):
+    """压缩数据，gzip_level 为 gzip 的压缩级别（1-9），brotli_quality 为 brotli 的质量参数（0-11）"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def choose_encoding(encodings=ENCODINGS):
+    """从可用的编码中选出客户端接受且优先级最高的编码，都不接受时返回None"""
+    if not encodings:
+        return None
+    return request.accept_encodings.best_match(encodings)
+
+
+def should_compress(response):
+    """判断动态响应是否需要压缩"""
+    config = current_app.config
+    return (config.get('COMPRESS_ENABLED', True)
+            and response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and 'Content-Encoding' not in response.headers
+            and response.mimetype in config.get('COMPRESS_MIMETYPES', ('application/json',))
+            and (response.content_length or 0) >= config.get('COMPRESS_MIN_SIZE', 1024))
+
+
+def set_encoding(response, encoding, data):
+    """把响应体替换为压缩后的数据，并设置相应的响应头和 ETag"""
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def etag_variants(etag):
+    """ETag 及其各个编码版本，用于条件请求的比较"""
+    return [etag] + [f'{etag}-{encoding}' for encoding in ENCODINGS]
+
+
+def compress_response(response):
+    """after_request 钩子：压缩尚未压缩的动态响应"""
+    if should_compress(response):
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding()
+        if encoding is not None:
+            set_encoding(response, encoding, compress_body(response.get_data(), encoding))
+    return response
+
+
+def compress_body(data, encoding):
+    """按配置的压缩级别压缩动态响应，在请求中进行，使用较快的压缩级别"""
+    config = current_app.config
+    return compress(data, encoding, config.get('COMPRESS_LEVEL', 6), config.get('COMPRESS_BROTLI_QUALITY', 5))
+
+
+# 静态资源
+
+def _sidecar(path, encoding):
+    return path + SUFFIXES[encoding]
+
+
+def _sidecar_fresh(path, sidecar):
+    """预压缩文件存在且与源文件的修改时间一致"""
+    try:
+        return os.stat(sidecar).st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def precompress_file(path, encodings=ENCODINGS):
+    """
+    为单个文件生成预压缩文件，返回新生成的文件数
+    压缩后不比源文件小时不生成，并删除已有的过期文件
+    """
+    created = 0
+    data = None
+    for encoding in encodings:
+        sidecar = _sidecar(path, encoding)
+        if _sidecar_fresh(path, sidecar):
+            continue
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            stat = os.stat(path)
+        # 预压缩只进行一次，使用最高压缩级别
+        compressed = compress(data, encoding, gzip_level=9, brotli_quality=11)
+        if len(compressed) >= len(data):
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+            continue
+        atomic_write(sidecar, compressed, fsync=False)
+        os.utime(sidecar, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        created += 1
+    return created
+
+
+def precompress_directory(root, encodings=ENCODINGS, min_size=STATIC_MIN_SIZE):
+    """为目录下所有值得压缩的静态文件生成预压缩文件，返回新生成的文件数"""
+    created = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            if (os.path.splitext(name)[1].lower() in STATIC_EXTENSIONS
+                    and os.path.getsize(path) >= min_size):
+                created += precompress_file(path, encodings)
+    return created
+
+
+def send_static(directory, path, **kwargs):
+    """
+    发送静态文件，客户端接受且存在最新的预压缩文件时发送压缩后的文件
+    其他参数传给 send_file（例如 max_age）
+    """
+    file_path = safe_join(directory, path)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+    available = [encoding for encoding in ENCODINGS
+                 if _sidecar_fresh(file_path, _sidecar(file_path, encoding))]
+    encoding = choose_encoding(available)
+    if encoding is None:
+        response = send_file(file_path, mimetype=mimetype, **kwargs)
+    else:
+        response = send_file(_sidecar(file_path, encoding), mimetype=mimetype, **kwargs)
+        response.headers['Content-Encoding'] = encoding
+    if available:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_compression(app):
+    """注册动态响应压缩，并预压缩前端静态资源（一般在后台线程中进行）"""
+    app.after_request(compress_response)
+    if not app.config.get('STATIC_PRECOMPRESS', True):
+        return
+    if app.config.get('PRELOAD_APP'):
+        # 预加载的主进程在 fork 之前压缩完，工作进程不会继承正在运行的线程和持有的文件锁
+        _precompress_static(app)
+    else:
+        thread = threading.Thread(target=_precompress_static, args=(app,),
+                                  name='blog-precompress', daemon=True)
+        thread.start()
+
+
+def _precompress_static(app):
+    root = app.config['FRONTEND_DIR']
+    try:
+        # 多个工作进程同时启动时只有一个进程压缩，其余进程等待后发现文件都已是最新
+        with exclusive_file_lock(os.path.join(app.config['DATA_DIR'], 'precompress.lock')):
+            created = precompress_directory(root)
+        if created:
+            app.logger.info('Precompressed %d static files', created)
+    except Exception as e:
+        app.logger.error('Error precompressing static files: %s', str(e))
+
+
+def main(argv=None):
+    from backend.config import Config
+
+    parser = argparse.ArgumentParser(
+        description='Precompress frontend static files into .gz (and .br when brotli is installed) sidecars')
+    parser.add_argument('--root', default=Config.FRONTEND_DIR, help='static files directory')
+    args = parser.parse_args(argv)
+
+    created = precompress_directory(args.root)
+    print(f"Created {created} compressed files ({', '.join(ENCODINGS)}) under {args.root}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
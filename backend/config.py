@@ -43,6 +43,7 @@ class Config:
 	DEBUG = get_bool_env('FLASK_DEBUG', True)  # 是否开启调试模式
 	PORT = int(os.environ.get('FLASK_PORT', 5050))  # 应用运行端口
 	HOST = os.environ.get('FLASK_HOST', '0.0.0.0')  # 应用监听地址
+	PRELOAD_APP = False  # 应用是否在主进程中创建后 fork 出工作进程，由 create_app(preload=True) 设置
 
 	# 安全相关配置
 	SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-123'  # Flask会话密钥
@@ -61,6 +62,7 @@ class Config:
 
 	# 数据存储相关配置
 	DATA_DIR = os.path.join(basedir, 'data')  # 数据存储目录
+	FRONTEND_DIR = os.path.join(os.path.dirname(basedir), 'frontend')  # 前端静态文件目录
 	LOG_DIR = os.path.join(basedir, 'logs')  # 日志存储目录
 	MAX_CONTENT_LENGTH = int(os.environ.get(  # 最大请求内容大小
 		'MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 默认16MB
@@ -68,16 +70,140 @@ class Config:
 	# 日志配置
 	LOG_FORMAT = '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'  # 日志格式
 	LOG_FILE = os.path.join(LOG_DIR, 'blog.log')  # 日志文件路径
-	LOG_MAX_BYTES = 10240  # 单个日志文件最大字节数
+	LOG_MAX_BYTES = int(os.environ.get(  # 单个日志文件最大字节数，超过后轮转，0表示不轮转
+		'LOG_MAX_BYTES', 10 * 1024 * 1024))  # 默认10MB
 	LOG_BACKUP_COUNT = 10  # 保留的日志文件数量
+	LOG_QUEUE_SIZE = 10000  # 等待写入的日志记录数上限，超出时丢弃
+	ACCESS_LOG_ENABLED = get_bool_env('ACCESS_LOG_ENABLED', True)  # 是否记录访问日志（每个请求一行JSON）
+	ACCESS_LOG_FILE = os.path.join(LOG_DIR, 'access.log')  # 访问日志文件路径
+
+	# 指标配置（/api/metrics）
+	METRICS_ENABLED = get_bool_env('METRICS_ENABLED', True)  # 是否统计指标
+	METRICS_DIR = os.environ.get(  # 汇总各工作进程指标的目录，同一台机器上的工作进程共享
+		'METRICS_DIR', os.path.join(DATA_DIR, 'metrics'))
+	METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5.0))  # 每个进程写入指标文件的间隔（秒）
+	METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # 设置后访问 /api/metrics 需要携带 Bearer <METRICS_TOKEN>
 
 	# 数据文件配置
 	DATA_FILE = os.path.join(DATA_DIR, 'blog.json')
+	DATA_JOURNAL_ENABLED = get_bool_env('DATA_JOURNAL_ENABLED', True)  # 是否以追加日志的方式记录写入
+	DATA_JOURNAL_FILE = os.path.join(DATA_DIR, 'blog.journal')  # 变更日志文件路径
+	DATA_JOURNAL_COMPACT_BYTES = int(os.environ.get(  # 日志超过该大小后合并进快照
+		'DATA_JOURNAL_COMPACT_BYTES', 1024 * 1024))  # 默认1MB
+	DATA_FSYNC = get_bool_env('DATA_FSYNC', True)  # 提交时是否fsync，同一批次的写入只fsync一次
+	DATA_COMMIT_WINDOW = float(os.environ.get(  # 组提交的等待窗口（秒），窗口内到达的写入合并提交
+		'DATA_COMMIT_WINDOW', 0.002))
+	DATA_COMMIT_MAX_BATCH = int(os.environ.get('DATA_COMMIT_MAX_BATCH', 64))  # 每批最多合并的写入数
+
+	# 存储后端配置
+	STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')  # 存储后端：json/sqlite/sharded
+	SQLITE_DATABASE = os.environ.get(  # SQLite数据库文件路径
+		'SQLITE_DATABASE', os.path.join(DATA_DIR, 'blog.db'))
+	SHARDED_DATA_DIR = os.environ.get(  # 分片存储目录（索引文件 + 每篇文章一个文件）
+		'SHARDED_DATA_DIR', os.path.join(DATA_DIR, 'sharded'))
+	SHARDED_BODY_CACHE_SIZE = int(os.environ.get(  # 内存中缓存的文章正文数量上限
+		'SHARDED_BODY_CACHE_SIZE', 256))
+	SHARDED_JOURNAL_COMPACT_BYTES = int(os.environ.get(  # 索引变更日志超过该大小且超过索引文件大小时合并
+		'SHARDED_JOURNAL_COMPACT_BYTES', 256 * 1024))  # 默认256KB
+
+	# 计数缓冲配置
+	COUNTER_BUFFER_ENABLED = get_bool_env('COUNTER_BUFFER_ENABLED', True)  # 阅读量和点赞数是否先写入缓冲
+	COUNTER_BUFFER_FILE = os.environ.get(  # 缓冲文件路径，同一台机器上的工作进程共享
+		'COUNTER_BUFFER_FILE', os.path.join(DATA_DIR, 'counters.db'))
+	COUNTER_FLUSH_INTERVAL = float(os.environ.get('COUNTER_FLUSH_INTERVAL', 5.0))  # 合并到存储的间隔（秒）
+	COUNTER_FLUSH_THRESHOLD = int(os.environ.get(  # 本进程累积的增量次数达到该值时立即合并
+		'COUNTER_FLUSH_THRESHOLD', 200))
+
+	# 搜索配置
+	SEARCH_INDEX_FILE = os.environ.get(  # 搜索索引文件路径
+		'SEARCH_INDEX_FILE', os.path.join(DATA_DIR, 'search_index.json'))
+	SEARCH_JOURNAL_COMPACT_BYTES = int(os.environ.get(  # 索引变更日志超过该大小且超过索引文件大小时合并
+		'SEARCH_JOURNAL_COMPACT_BYTES', 256 * 1024))  # 默认256KB
+
+	# 压缩配置
+	COMPRESS_ENABLED = get_bool_env('COMPRESS_ENABLED', True)  # 是否按 Accept-Encoding 压缩动态响应
+	COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # 小于该字节数的响应不压缩
+	COMPRESS_MIMETYPES = ['application/json']  # 需要压缩的动态响应类型
+	COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # 动态响应的 gzip 压缩级别（1-9）
+	COMPRESS_BROTLI_QUALITY = int(os.environ.get(  # 动态响应的 brotli 质量参数（0-11），需要安装 brotli
+		'COMPRESS_BROTLI_QUALITY', 5))
+	STATIC_PRECOMPRESS = get_bool_env(  # 启动时是否在后台预压缩前端静态资源（生成 .gz/.br 文件）
+		'STATIC_PRECOMPRESS', True)
+
+	# 图片上传配置
+	UPLOAD_FOLDER = os.environ.get(  # 上传图片保存目录，图片按内容哈希命名
+		'UPLOAD_FOLDER', os.path.join(os.path.dirname(basedir), 'uploads'))
+	UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 5 * 1024 * 1024))  # 单张图片大小上限，默认5MB
+	UPLOAD_CHUNK_SIZE = 64 * 1024  # 保存上传内容时每次读取的字节数
+	UPLOAD_ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}  # 允许上传的图片类型
+
+	# 图片派生版本配置
+	IMAGE_VARIANTS_ENABLED = get_bool_env(  # 上传后是否生成缩放版本和 WebP 版本
+		'IMAGE_VARIANTS_ENABLED', True)
+	IMAGE_VARIANT_WIDTHS = (320, 800, 1600)  # 缩放版本的宽度（像素），不放大
+	IMAGE_WORKERS = int(os.environ.get(  # 生成派生版本的进程数
+		'IMAGE_WORKERS', min(2, os.cpu_count() or 1)))
+	IMAGE_QUEUE_MAX = int(os.environ.get('IMAGE_QUEUE_MAX', 32))  # 排队等待生成的图片数上限，超出时放弃
+	IMAGE_WEBP_QUALITY = 80  # WebP 质量（0-100）
+	IMAGE_JPEG_QUALITY = 85  # JPEG 质量（0-100）
+
+	# 静态资源缓存配置
+	STATIC_FINGERPRINT = get_bool_env(  # 是否把页面中的资源引用改写为带内容哈希的地址
+		'STATIC_FINGERPRINT', True)
+	STATIC_BUILD_DIR = os.environ.get(  # 改写后的页面保存目录
+		'STATIC_BUILD_DIR', os.path.join(DATA_DIR, 'static'))
+	STATIC_IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'  # 带哈希的资源，缓存一年
+	STATIC_CACHE_CONTROL = 'no-cache'  # 页面和其他静态文件，每次向服务器确认
+
+	# Markdown渲染配置
+	RENDER_CACHE_DIR = os.environ.get(  # 渲染后的文章HTML缓存目录，按正文内容的哈希保存
+		'RENDER_CACHE_DIR', os.path.join(DATA_DIR, 'rendered'))
+
+	# 分页配置
+	ARTICLES_PAGE_SIZE_MAX = 100  # 文章列表每页数量上限（limit 参数）
+	COMMENTS_PAGE_SIZE = 20  # 评论每页默认数量，文章详情中附带第一页评论
+	COMMENTS_PAGE_SIZE_MAX = 100  # 评论每页数量上限（limit 参数）
+
+	# 评论推送配置（Server-Sent Events 和长轮询）
+	COMMENT_STREAM_HEARTBEAT = 15  # 没有事件时发送心跳的间隔（秒）
+	COMMENT_STREAM_SYNC_INTERVAL = 5  # 从存储同步其他工作进程的评论修改的间隔（秒）
+	COMMENT_STREAM_MAX_AGE = 300  # 推送连接的最长保持时间（秒），之后由浏览器自动重连
+	COMMENT_STREAM_LONGPOLL_TIMEOUT = 25  # 长轮询没有变化时的最长等待时间（秒）
+	COMMENT_STREAM_BUFFER = 64  # 每个订阅者缓冲的事件数上限，溢出后客户端重新同步
+	COMMENT_STREAM_MAX_SUBSCRIBERS = int(os.environ.get(  # 每个工作进程同时订阅的连接数上限
+		'COMMENT_STREAM_MAX_SUBSCRIBERS', 256))
+
+	# HTTP缓存配置
+	# 只读接口的响应带有 ETag 和 Last-Modified，客户端可以用条件请求得到304；
+	# 各接口的 Cache-Control 按端点名称（蓝图名.视图函数名）配置，未列出的接口使用默认策略
+	CACHE_CONTROL_DEFAULT = 'no-cache'
+	CACHE_CONTROL = {
+		'articles.get_articles': 'public, no-cache',  # 列表每次都向服务器确认，未变化时得到304
+		'articles.get_article': 'public, no-cache',
+		'comments.get_comments': 'public, no-cache',
+		'categories.get_categories': 'public, no-cache',
+		'categories.get_category': 'public, no-cache',
+	}
+	RESPONSE_CACHE_ENABLED = get_bool_env('RESPONSE_CACHE_ENABLED', True)  # 是否缓存编码后的响应
+	RESPONSE_CACHE_MAX_BYTES = int(os.environ.get(  # 每个工作进程缓存的响应体总大小上限
+		'RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))  # 默认32MB
 
 	# JWT配置
 	JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
 	JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)  # token有效期1小时
 	JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)  # 刷新token有效期30天
+	JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', 1024))  # 每个工作进程缓存的已验证token数
+	JWT_CACHE_TTL = int(os.environ.get('JWT_CACHE_TTL', 300))  # 缓存项最长保留时间（秒），不超过token的exp
+
+	# 密码哈希和登录限流配置
+	PASSWORD_WORKERS = int(os.environ.get(  # 计算bcrypt的线程数
+		'PASSWORD_WORKERS', min(2, os.cpu_count() or 1)))
+	PASSWORD_QUEUE_MAX = int(os.environ.get('PASSWORD_QUEUE_MAX', 8))  # 执行和排队的bcrypt任务数上限，超出时返回429
+	LOGIN_RATE_IP_BURST = 10  # 每个IP可以连续尝试登录的次数
+	LOGIN_RATE_IP_PER_MINUTE = 5  # 之后每个IP每分钟恢复的尝试次数
+	LOGIN_RATE_USER_BURST = 20  # 每个用户名可以连续尝试登录的次数
+	LOGIN_RATE_USER_PER_MINUTE = 10  # 之后每个用户名每分钟恢复的尝试次数
+	LOGIN_RATE_MAX_KEYS = 10000  # 每个工作进程记录的IP和用户名数上限
 
 	@classmethod
 	def init_app(cls, app):
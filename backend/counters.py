@@ -0,0 +1,273 @@
+"""
+计数缓冲模块
+阅读量和点赞数的增量先累积在一个本地SQLite文件中，由后台线程定期合并写入存储，
+避免每次浏览和点赞都提交一次存储写事务
+
+1. 同一台机器上的所有工作进程共享同一个缓冲文件，任何进程都能读到其他进程尚未合并的增量
+2. 接口返回的计数为存储中的值加上缓冲中的增量，自己的点赞立即可见
+3. 达到时间间隔（COUNTER_FLUSH_INTERVAL）或本进程累积的增量次数达到阈值
+   （COUNTER_FLUSH_THRESHOLD）时合并一次，所有增量在一个存储事务中提交
+4. 进程正常退出前合并剩余的增量
+
+合并分三步：把待合并的增量移到 inflight 表，提交到存储，再删除 inflight 表中的记录。
+读取时把两张表的增量都加上，并且先读缓冲再读存储，
+合并进行的瞬间可能多算一次增量，但不会少算。合并期间计数请求不需要等待存储写入；
+合并由跨进程文件锁串行化，存储写入失败时 inflight 中的增量留到下次合并重试
+（进程恰好在存储提交之后、删除 inflight 之前崩溃时，这部分增量会被重复计入一次）
+"""
+
+import os
+import atexit
+import sqlite3
+import threading
+from flask import current_app
+from backend.models import exclusive_file_lock
+from backend.storage import get_repository, NotFoundError
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pending (
+    article_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (article_id, field)
+);
+
+CREATE TABLE IF NOT EXISTS inflight (
+    article_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    seq INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO meta (key, value) VALUES ('seq', 0);
+'''
+
+
+class CounterBuffer:
+    """
+    计数缓冲
+    每次增量把全局序号加一，并记录到对应的缓冲行上；
+    序号只增不减，与存储版本一起组成接口的 ETag（见 backend.http_cache）
+    """
+
+    def __init__(self, path, flush_interval=5.0, flush_threshold=200, timeout=5.0):
+        self.path = path
+        self.lock_file = f'{path}.lock'
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.timeout = timeout
+        self._local = threading.local()
+        self._count_lock = threading.Lock()
+        self._since_flush = 0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._app = None
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # 计数
+
+    def increment(self, article_id, field, amount=1):
+        """累加计数，返回缓冲中该计数尚未合并的增量"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'seq'")
+            seq = conn.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()[0]
+            conn.execute(
+                'INSERT INTO pending (article_id, field, delta, seq) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (article_id, field) DO UPDATE SET delta = delta + excluded.delta, seq = excluded.seq',
+                (article_id, field, amount, seq))
+            delta = conn.execute(
+                'SELECT (SELECT delta FROM pending WHERE article_id = ?1 AND field = ?2) + '
+                '(SELECT COALESCE(SUM(delta), 0) FROM inflight WHERE article_id = ?1 AND field = ?2)',
+                (article_id, field)).fetchone()[0]
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+        with self._count_lock:
+            self._since_flush += 1
+            if self._since_flush >= self.flush_threshold:
+                self._wake.set()
+        return delta
+
+    def pending(self):
+        """尚未合并的增量，返回 {文章ID: {字段: 增量}}"""
+        result = {}
+        rows = self._connect().execute(
+            'SELECT article_id, field, SUM(delta) FROM '
+            '(SELECT article_id, field, delta FROM pending UNION ALL SELECT article_id, field, delta FROM inflight) '
+            'GROUP BY article_id, field')
+        for article_id, field, delta in rows:
+            result.setdefault(article_id, {})[field] = delta
+        return result
+
+    def seq(self, article_id=None):
+        """全局序号，或者文章尚未合并的增量中最新的序号（没有时为0）"""
+        conn = self._connect()
+        if article_id is None:
+            return conn.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()[0]
+        row = conn.execute(
+            'SELECT MAX(seq) FROM (SELECT seq FROM pending WHERE article_id = ?1 '
+            'UNION ALL SELECT seq FROM inflight WHERE article_id = ?1)', (article_id,)).fetchone()
+        return row[0] or 0
+
+    def discard(self, article_id):
+        """丢弃已删除文章的增量"""
+        self._connect().execute('DELETE FROM pending WHERE article_id = ?', (article_id,))
+
+    # 合并
+
+    def flush(self, repository):
+        """
+        把缓冲中的增量合并到存储，返回合并的缓冲行数
+        存储写入失败时增量留在 inflight 表中，下次合并时先重试这些增量
+        """
+        with self._count_lock:
+            self._since_flush = 0
+        conn = self._connect()
+        with exclusive_file_lock(self.lock_file):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if not conn.execute('SELECT 1 FROM inflight LIMIT 1').fetchone():
+                    conn.execute('INSERT INTO inflight SELECT article_id, field, delta, seq FROM pending '
+                                 'WHERE delta != 0')
+                    conn.execute('DELETE FROM pending')
+                rows = conn.execute('SELECT article_id, field, SUM(delta) FROM inflight '
+                                    'GROUP BY article_id, field').fetchall()
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+            if rows:
+                repository.increment_articles(rows)
+                conn.execute('DELETE FROM inflight')
+        return len(rows)
+
+    def after_fork(self):
+        """
+        在 fork 出的工作进程中调用：丢弃从主进程继承的连接，启动本进程的合并线程
+        预加载的主进程不启动合并线程，线程和连接都不会跨进程继承
+        """
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._thread = None
+        if self._app is not None:
+            self.start(self._app)
+
+    def start(self, app):
+        """启动后台合并线程"""
+        self._app = app
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='blog-counter-flush', daemon=True)
+            self._thread.start()
+
+    def _flush_in_app(self):
+        with self._app.app_context():
+            try:
+                count = self.flush(get_repository())
+                if count:
+                    self._app.logger.info('Flushed %d buffered counters', count)
+            except Exception as e:
+                self._app.logger.error('Error flushing buffered counters: %s', str(e))
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self._stopping:
+                self._flush_in_app()
+
+    def close(self, timeout=5):
+        """停止后台线程并合并剩余的增量"""
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join(timeout)
+        if self._app is not None:
+            self._flush_in_app()
+
+
+def init_counters(app):
+    """
+    为应用创建计数缓冲并启动后台合并线程
+    缓冲对象保存在 app.extensions 中，COUNTER_BUFFER_ENABLED 关闭时为None
+    """
+    buffer = None
+    if app.config.get('COUNTER_BUFFER_ENABLED', True):
+        buffer = CounterBuffer(
+            app.config['COUNTER_BUFFER_FILE'],
+            flush_interval=app.config.get('COUNTER_FLUSH_INTERVAL', 5.0),
+            flush_threshold=app.config.get('COUNTER_FLUSH_THRESHOLD', 200)
+        )
+        if app.config.get('PRELOAD_APP'):
+            # 主进程只创建缓冲，合并线程在每个工作进程 fork 之后启动（见 after_fork）
+            buffer._app = app
+        else:
+            buffer.start(app)
+        # 进程退出前合并剩余的增量；在存储对象之后注册，先于存储关闭执行
+        atexit.register(buffer.close)
+    app.extensions['counter_buffer'] = buffer
+    return buffer
+
+
+def get_counter_buffer():
+    """获取当前应用的计数缓冲，未初始化时自动创建，关闭缓冲时返回None"""
+    if 'counter_buffer' not in current_app.extensions:
+        return init_counters(current_app._get_current_object())
+    return current_app.extensions['counter_buffer']
+
+
+def increment_counter(article_id, field):
+    """
+    为文章的计数字段加一，返回最新的值
+    开启缓冲时只写入缓冲，否则直接提交到存储；文章不存在时抛出 NotFoundError
+    """
+    repository = get_repository()
+    buffer = get_counter_buffer()
+    if buffer is None:
+        return repository.increment_article(article_id, field)
+
+    if repository.get_entity_version('articles', article_id) is None:
+        raise NotFoundError('Article not found')
+    delta = buffer.increment(article_id, field)
+    # 先累加再读取存储中的值，与合并同时发生时只会多算不会少算
+    articles = repository.list_articles_by_ids([article_id])
+    if not articles:
+        raise NotFoundError('Article not found')
+    return articles[0].get(field, 0) + delta
+
+
+def pending_counters():
+    """
+    尚未合并的计数增量，关闭缓冲时为空
+    需要在读取文章之前调用，保证合并进行时不会漏掉增量
+    """
+    buffer = get_counter_buffer()
+    return buffer.pending() if buffer is not None else {}
+
+
+def apply_counters(article, pending):
+    """把缓冲中的增量加到文章（必须是副本）的计数字段上，返回该文章"""
+    for field, delta in pending.get(article['id'], {}).items():
+        article[field] = article.get(field, 0) + delta
+    return article
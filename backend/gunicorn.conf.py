@@ -0,0 +1,49 @@
+"""
+生产环境的 gunicorn 配置
+在项目根目录下启动：
+    gunicorn -c backend/gunicorn.conf.py
+
+1. 应用在主进程中创建一次（preload_app），数据、索引和编译好的正则表达式在 fork 之后由工作进程
+   以写时复制的方式共享；fork 之前冻结垃圾回收跟踪的对象（gc.freeze），
+   工作进程的垃圾回收不会扫描并改写这些对象所在的内存页
+2. 工作进程数默认等于CPU核数，每个进程使用 gthread 线程池处理请求（默认每核4个线程，至少8个）；
+   评论推送的长连接在等待期间占用一个线程，同时订阅的连接数默认不超过线程数的一半，其余线程留给普通请求
+3. 可以通过环境变量调整：FLASK_HOST/FLASK_PORT（监听地址）、WEB_CONCURRENCY（工作进程数）、
+   WEB_THREADS（每个进程的线程数）、COMMENT_STREAM_MAX_SUBSCRIBERS
+"""
+
+import gc
+import os
+
+cpu_count = os.cpu_count() or 1
+
+wsgi_app = 'backend.app:create_app("production", preload=True)'
+bind = f"{os.environ.get('FLASK_HOST', '0.0.0.0')}:{os.environ.get('FLASK_PORT', '5050')}"
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count))
+threads = int(os.environ.get('WEB_THREADS', max(8, cpu_count * 4)))
+preload_app = True
+
+# 推送连接每 COMMENT_STREAM_MAX_AGE 秒由服务端关闭，不受 timeout 限制（gthread 的心跳由主线程发送）
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# 配置在应用导入之前加载，这里设置的默认值对 backend.config 生效
+os.environ.setdefault('COMMENT_STREAM_MAX_SUBSCRIBERS', str(max(1, threads // 2)))
+
+# 访问日志由应用在后台线程中写入 ACCESS_LOG_FILE（见 backend.log_pipeline），gunicorn 不再同步写一份
+accesslog = None
+errorlog = '-'
+
+
+def when_ready(server):
+    """主进程加载完应用、开始创建工作进程之前调用"""
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """在工作进程中重建本进程的连接，启动后台线程"""
+    from backend.app import init_worker
+    init_worker(server.app.wsgi())
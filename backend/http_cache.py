@@ -0,0 +1,317 @@
+"""
+HTTP缓存模块
+为只读接口提供基于存储版本的条件请求支持：
+
+1. 响应带有强 ETag 和 Last-Modified，ETag 由存储的全局版本或对象版本生成
+2. 请求的 If-None-Match / If-Modified-Since 与当前版本一致时直接返回304，
+   只查询版本号，不读取文章内容也不序列化响应
+3. 每个接口的 Cache-Control 策略在 Config.CACHE_CONTROL 中按端点名称配置
+4. 响应缓存（ResponseCache）按路径和查询参数保存已经编码好的响应字节，
+   命中时不再构建数据和调用 jsonify；缓存项记录生成时的 ETag，
+   版本变化后自动失效，写接口另外通过 invalidate_responses 按标签及时释放过期的缓存项
+5. 需要压缩的响应（见 backend.compression）压缩后的字节按编码保存在缓存项中，
+   命中缓存时直接返回客户端接受的编码版本
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, current_app
+from backend.storage import get_repository
+from backend.counters import get_counter_buffer
+from backend.metrics import REGISTRY as metrics
+from backend.compression import (should_compress, choose_encoding, compress_body, set_encoding,
+                                 etag_variants)
+
+
+def cache_control_for(endpoint):
+    """获取端点的 Cache-Control 策略，未单独配置时使用默认策略"""
+    policies = current_app.config.get('CACHE_CONTROL', {})
+    return policies.get(endpoint, current_app.config.get('CACHE_CONTROL_DEFAULT', 'no-cache'))
+
+
+def _http_date(timestamp):
+    return datetime.fromtimestamp(int(timestamp), timezone.utc)
+
+
+def _not_modified(etag, modified):
+    """
+    判断客户端缓存的版本是否仍然有效，有效时返回客户端持有的 ETag（可能带有编码后缀），否则返回None
+    同时带有两个条件头时以 If-None-Match 为准（RFC 7232）
+    """
+    if request.if_none_match:
+        for variant in etag_variants(etag):
+            if request.if_none_match.contains_weak(variant):
+                return variant
+        return None
+    if request.if_modified_since and modified is not None:
+        if _http_date(modified) <= request.if_modified_since:
+            return etag
+    return None
+
+
+def _set_validators(response, etag, modified):
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = _http_date(modified)
+    response.headers['Cache-Control'] = cache_control_for(request.endpoint)
+    return response
+
+
+class CachedResponse:
+    """缓存的响应：编码后的响应体、按需生成的压缩版本（{编码: 字节}）和生成时的校验值"""
+    __slots__ = ('body', 'mimetype', 'etag', 'modified', 'tags', 'encoded')
+
+    def __init__(self, body, mimetype, etag, modified, tags):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.modified = modified
+        self.tags = tags
+        self.encoded = {}
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(data) for data in self.encoded.values())
+
+
+class ResponseCache:
+    """
+    响应缓存
+    按响应体字节数限制总大小，超出时淘汰最久未使用的缓存项（LRU）；
+    每个缓存项带有若干标签，例如 'article:1'，写接口按标签使缓存失效。
+    多个工作进程各自维护缓存，其他进程的写入通过 ETag 比较发现
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, etag):
+        """获取与当前 ETag 一致的缓存项，不存在或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.etag != etag:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        metrics.inc('blog_response_cache_total', result='miss' if entry is None else 'hit')
+        return entry
+
+    def put(self, key, entry):
+        """保存缓存项，超过总大小上限的响应不缓存"""
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self.size += entry.size
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._evict()
+
+    def add_encoding(self, key, entry, encoding, data):
+        """为缓存项保存压缩后的响应体，缓存项已被移除或替换时只更新该对象"""
+        with self._lock:
+            if encoding in entry.encoded:
+                return
+            entry.encoded[encoding] = data
+            if self._entries.get(key) is entry:
+                self.size += len(data)
+                self._entries.move_to_end(key)
+                self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *tags):
+        """移除带有任一标签的缓存项"""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self.size = 0
+
+    def stats(self):
+        """命中率等统计数据"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+def init_response_cache(app):
+    """
+    为应用创建响应缓存
+    缓存对象保存在 app.extensions 中，RESPONSE_CACHE_ENABLED 关闭时为None
+    """
+    cache = None
+    if app.config.get('RESPONSE_CACHE_ENABLED', True):
+        cache = ResponseCache(app.config.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.extensions['response_cache'] = cache
+    return cache
+
+
+def get_response_cache():
+    """获取当前应用的响应缓存，未初始化时自动创建，关闭缓存时返回None"""
+    if 'response_cache' not in current_app.extensions:
+        return init_response_cache(current_app)
+    return current_app.extensions['response_cache']
+
+
+def invalidate_responses(*tags):
+    """
+    写接口修改数据后调用，移除依赖这些数据的缓存响应
+    常用标签：'articles'（文章列表）、'categories'（分类列表）、
+    'article:<id>' / 'category:<id>'（单篇文章、单个分类），
+    'article' / 'category'（所有文章详情、所有分类详情）
+    """
+    cache = get_response_cache()
+    if cache is not None:
+        cache.invalidate(*tags)
+
+
+def _cache_key():
+    """缓存键：路径加排序后的查询参数"""
+    return (request.path, tuple(sorted(request.args.items(multi=True))))
+
+
+def _encode_cached(response, cache, key, entry):
+    """返回缓存项中客户端接受的压缩版本，尚未生成时压缩一次并保存到缓存项中"""
+    if not should_compress(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+    data = entry.encoded.get(encoding)
+    if data is None:
+        data = compress_body(entry.body, encoding)
+        cache.add_encoding(key, entry, encoding, data)
+    return set_encoding(response, encoding, data)
+
+
+def conditional(validator, cache_tags=None):
+    """
+    条件请求装饰器
+
+    validator 接收与视图函数相同的参数，返回 (etag, 最后修改时间) ，
+    最后修改时间为Unix时间戳，可以为None；返回None表示本次请求不做条件判断。
+    版本在执行视图之前获取：期间发生的写入只会让 ETag 比响应内容旧，
+    客户端下次请求时得到新的响应，不会错误地命中缓存
+
+    提供 cache_tags 时成功的响应保存到响应缓存中，ETag 未变化的后续请求直接返回缓存的字节；
+    cache_tags 接收与视图函数相同的参数，返回缓存项的标签列表
+
+    Example:
+        @articles_bp.route('/api/articles', methods=['GET'])
+        @conditional(lambda: global_validator('articles'), cache_tags=lambda: ['articles'])
+        def get_articles():
+            ...
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                validators = validator(*args, **kwargs)
+            except Exception as e:
+                current_app.logger.error('Error getting cache validators: %s', str(e))
+                validators = None
+            if validators is None:
+                return view(*args, **kwargs)
+
+            etag, modified = validators
+            matched = _not_modified(etag, modified)
+            if matched is not None:
+                response = _set_validators(current_app.response_class(status=304), matched, modified)
+                if matched != etag:
+                    response.vary.add('Accept-Encoding')
+                return response
+
+            cache = get_response_cache() if cache_tags is not None else None
+            if cache is not None:
+                key = _cache_key()
+                entry = cache.get(key, etag)
+                if entry is not None:
+                    response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+                    return _encode_cached(_set_validators(response, etag, modified), cache, key, entry)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, modified)
+                if cache is not None and not response.direct_passthrough:
+                    entry = CachedResponse(response.get_data(), response.mimetype, etag, modified,
+                                           tuple(cache_tags(*args, **kwargs)))
+                    cache.put(key, entry)
+                    response = _encode_cached(response, cache, key, entry)
+            return response
+        return wrapper
+    return decorator
+
+
+def _counter_suffix(article_id):
+    """
+    文章详情包含计数缓冲中尚未合并的增量，该文章最新增量的序号附加在 ETag 后面
+    序号在增量合并后归零，但存储版本随合并递增，ETag 不会与之前的重复
+    """
+    buffer = get_counter_buffer()
+    seq = buffer.seq(article_id) if buffer is not None else 0
+    return f'.{seq}' if seq else ''
+
+
+def global_validator(prefix):
+    """
+    由存储的全局版本生成校验值，用于依赖多个对象的接口（列表、分类详情等）
+    这些接口使用存储中的计数，浏览和点赞只在合并到存储后改变校验值
+    """
+    version, modified = get_repository().get_version()
+    return f'{prefix}-{version}', modified
+
+
+def entity_validator(coll, entity_id, prefix):
+    """由单个对象的版本生成校验值，对象不存在时不做条件判断"""
+    version = get_repository().get_entity_version(coll, entity_id)
+    if version is None:
+        return None
+    suffix = _counter_suffix(entity_id) if coll == 'articles' else ''
+    return f'{prefix}-{entity_id}-{version[0]}{suffix}', version[1]
@@ -0,0 +1,352 @@
+"""
+图片存储模块
+上传的图片按内容的SHA-256保存（<哈希>.<扩展名>），同一张图片只保存一份：
+
+1. 上传内容分块写入上传目录中的临时文件，写入的同时计算哈希和累计大小，
+   超过大小上限时立即停止并删除临时文件，内存占用与图片大小无关
+2. 写完后把临时文件重命名为按哈希命名的文件；文件已经存在时删除临时文件，直接返回已有的文件名
+3. 多个请求同时上传同一张图片时各自写临时文件，重命名是原子的，结果相同
+
+上传后在进程池中生成图片的派生版本（ImagePipeline）：
+1. 按 IMAGE_VARIANT_WIDTHS 缩放（只缩小不放大），每个宽度生成原格式和 WebP 两个版本，
+   原始尺寸另外生成一个 WebP 版本；动图只保留原图
+2. 派生版本保存在上传目录的 variants/ 子目录中，全部生成后写入清单文件 variants/<原文件名>.json，
+   访问图片时按清单选择版本，清单不存在说明尚未生成
+3. 进程池的大小（IMAGE_WORKERS）和排队的任务数（IMAGE_QUEUE_MAX）都有上限，
+   队列已满时放弃本次生成，不阻塞请求线程；访问尚未生成派生版本的图片时会再次提交
+
+为已有的图片生成派生版本：
+    python -m backend.images
+"""
+
+import os
+import io
+import sys
+import json
+import hashlib
+import atexit
+import argparse
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# 将项目根目录添加到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from PIL import Image, ImageOps
+from flask import current_app
+from backend.models import atomic_write
+
+# 扩展名的规范写法，同一种格式只使用一个扩展名
+CANONICAL_EXTENSIONS = {'jpeg': 'jpg'}
+
+
+class UploadTooLargeError(Exception):
+    """上传的文件超过大小上限"""
+
+
+def content_filename(digest, extension):
+    """按内容哈希生成的文件名"""
+    extension = extension.lower()
+    return f'{digest}.{CANONICAL_EXTENSIONS.get(extension, extension)}'
+
+
+def store_upload(stream, extension, upload_folder, max_bytes, chunk_size=64 * 1024):
+    """
+    把上传内容分块保存到上传目录
+
+    Args:
+        stream: 可读的文件对象（上传文件的流）
+        extension (str): 文件扩展名
+        upload_folder (str): 上传目录
+        max_bytes (int): 大小上限（字节）
+        chunk_size (int): 每次读取的字节数
+
+    Returns:
+        tuple: (文件名, 是否为新保存的文件)
+
+    Raises:
+        UploadTooLargeError: 内容超过大小上限
+    """
+    os.makedirs(upload_folder, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_file = tempfile.mkstemp(prefix='upload.', suffix='.tmp', dir=upload_folder)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError('File too large')
+                hasher.update(chunk)
+                f.write(chunk)
+
+        filename = content_filename(hasher.hexdigest(), extension)
+        path = os.path.join(upload_folder, filename)
+        if os.path.exists(path):
+            os.remove(tmp_file)
+            return filename, False
+        os.chmod(tmp_file, 0o644)
+        os.replace(tmp_file, path)
+        return filename, True
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+# 派生版本
+
+# 派生版本所在的子目录（相对上传目录）
+VARIANTS_DIR = 'variants'
+
+# 扩展名对应的 Pillow 格式
+PIL_FORMATS = {'jpg': 'JPEG', 'png': 'PNG', 'gif': 'GIF', 'webp': 'WEBP'}
+
+
+def manifest_path(upload_folder, filename):
+    """图片派生版本清单的路径"""
+    return os.path.join(upload_folder, VARIANTS_DIR, f'{filename}.json')
+
+
+def _encode(image, extension, webp_quality, jpeg_quality):
+    """把图片编码为指定格式的字节"""
+    buffer = io.BytesIO()
+    if extension == 'jpg':
+        image.convert('RGB').save(buffer, 'JPEG', quality=jpeg_quality, optimize=True, progressive=True)
+    elif extension == 'webp':
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        image.save(buffer, 'WEBP', quality=webp_quality, method=4)
+    elif extension == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, PIL_FORMATS[extension])
+    return buffer.getvalue()
+
+
+def generate_variants(upload_folder, filename, widths, webp_quality=80, jpeg_quality=85):
+    """
+    生成图片的派生版本并写入清单，返回清单
+    在进程池的工作进程中执行，只访问文件，不使用应用对象
+
+    清单格式：{'width', 'height', 'format', 'variants': [{'width', 'format', 'file'}]}，
+    file 为相对上传目录的路径，原图本身也作为一个版本列出
+    """
+    stem, extension = os.path.splitext(filename)
+    extension = CANONICAL_EXTENSIONS.get(extension[1:].lower(), extension[1:].lower())
+    variants_folder = os.path.join(upload_folder, VARIANTS_DIR)
+    os.makedirs(variants_folder, exist_ok=True)
+
+    with Image.open(os.path.join(upload_folder, filename)) as source:
+        animated = getattr(source, 'is_animated', False)
+        image = source if animated else ImageOps.exif_transpose(source)
+        width, height = image.size
+        variants = [{'width': width, 'format': extension, 'file': filename}]
+
+        if not animated:
+            for target in sorted({w for w in widths if w < width} | {width}):
+                resized = image if target == width else image.resize(
+                    (target, max(1, round(height * target / width))), Image.LANCZOS)
+                for variant_format in (extension, 'webp'):
+                    if target == width and variant_format == extension:
+                        continue  # 原图
+                    if variant_format not in PIL_FORMATS:
+                        continue
+                    variant = f'{VARIANTS_DIR}/{stem}-{target}.{variant_format}'
+                    data = _encode(resized, variant_format, webp_quality, jpeg_quality)
+                    atomic_write(os.path.join(upload_folder, variant), data, fsync=False)
+                    variants.append({'width': target, 'format': variant_format, 'file': variant})
+
+    manifest = {'width': width, 'height': height, 'format': extension, 'variants': variants}
+    atomic_write(manifest_path(upload_folder, filename),
+                 json.dumps(manifest, separators=(',', ':')).encode('utf-8'), fsync=False)
+    return manifest
+
+
+def choose_variant(manifest, width=None, accept_webp=False):
+    """
+    按请求的宽度和客户端是否接受 WebP 选择版本，返回版本的文件路径（相对上传目录）
+    选择宽度不小于请求宽度的最小版本，没有时选择最大的版本；未指定宽度时使用原始尺寸；
+    同一宽度优先选择 WebP
+    """
+    formats = ('webp', manifest['format']) if accept_webp else (manifest['format'],)
+    for variant_format in formats:
+        candidates = [v for v in manifest['variants'] if v['format'] == variant_format]
+        if not candidates:
+            continue
+        if width is None:
+            width = manifest['width']
+        larger = [v for v in candidates if v['width'] >= width]
+        if larger:
+            return min(larger, key=lambda v: v['width'])['file']
+        return max(candidates, key=lambda v: v['width'])['file']
+    return manifest['variants'][0]['file']
+
+
+class ImagePipeline:
+    """
+    图片派生版本的生成和查询
+    进程池在第一次提交任务时创建；清单生成后不再变化，读取过的清单缓存在内存中；
+    生成失败的图片同样只记录最近的 manifest_cache_size 个，内存占用不随请求增长
+    """
+
+    def __init__(self, upload_folder, widths=(320, 800, 1600), workers=2, queue_max=32,
+                 webp_quality=80, jpeg_quality=85, manifest_cache_size=1024, logger=None):
+        self.upload_folder = upload_folder
+        self.widths = tuple(widths)
+        self.workers = workers
+        self.webp_quality = webp_quality
+        self.jpeg_quality = jpeg_quality
+        self.manifest_cache_size = manifest_cache_size
+        self.logger = logger
+        self._slots = threading.BoundedSemaphore(queue_max)
+        self._pending = set()
+        self._failed = OrderedDict()
+        self._manifests = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, filename):
+        """
+        提交生成任务，返回是否已提交
+        同一张图片同时只提交一次，生成失败过的图片（例如文件已损坏）不再提交；队列已满时直接返回False
+        """
+        with self._lock:
+            if filename in self._pending or filename in self._failed:
+                return False
+            if not self._slots.acquire(blocking=False):
+                return False
+            self._pending.add(filename)
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            executor = self._executor
+        try:
+            future = executor.submit(generate_variants, self.upload_folder, filename, self.widths,
+                                     self.webp_quality, self.jpeg_quality)
+        except BaseException:
+            self._done(filename)
+            raise
+        future.add_done_callback(lambda f: self._finished(filename, f))
+        return True
+
+    def _done(self, filename):
+        with self._lock:
+            self._pending.discard(filename)
+        self._slots.release()
+
+    def _finished(self, filename, future):
+        self._done(filename)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            return
+        with self._lock:
+            self._failed[filename] = True
+            while len(self._failed) > self.manifest_cache_size:
+                self._failed.popitem(last=False)
+        if self.logger is not None:
+            self.logger.error('Error generating image variants for %s: %s', filename, str(error))
+
+    def manifest(self, filename):
+        """读取图片的派生版本清单，尚未生成时返回None"""
+        with self._lock:
+            manifest = self._manifests.get(filename)
+            if manifest is not None:
+                self._manifests.move_to_end(filename)
+                return manifest
+        try:
+            with open(manifest_path(self.upload_folder, filename), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._manifests[filename] = manifest
+            while len(self._manifests) > self.manifest_cache_size:
+                self._manifests.popitem(last=False)
+        return manifest
+
+    def close(self):
+        """关闭进程池，放弃尚未开始的任务"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def init_images(app):
+    """
+    为应用创建图片派生版本的处理管线
+    管线保存在 app.extensions 中，IMAGE_VARIANTS_ENABLED 关闭时为None
+    """
+    pipeline = None
+    if app.config.get('IMAGE_VARIANTS_ENABLED', True):
+        pipeline = ImagePipeline(
+            app.config['UPLOAD_FOLDER'],
+            widths=app.config.get('IMAGE_VARIANT_WIDTHS', (320, 800, 1600)),
+            workers=app.config.get('IMAGE_WORKERS', 2),
+            queue_max=app.config.get('IMAGE_QUEUE_MAX', 32),
+            webp_quality=app.config.get('IMAGE_WEBP_QUALITY', 80),
+            jpeg_quality=app.config.get('IMAGE_JPEG_QUALITY', 85),
+            logger=app.logger
+        )
+        atexit.register(pipeline.close)
+    app.extensions['image_pipeline'] = pipeline
+    return pipeline
+
+
+def get_image_pipeline():
+    """获取当前应用的图片处理管线，未初始化时自动创建，关闭时返回None"""
+    if 'image_pipeline' not in current_app.extensions:
+        return init_images(current_app._get_current_object())
+    return current_app.extensions['image_pipeline']
+
+
+def backfill(upload_folder, widths, workers=None, force=False, webp_quality=80, jpeg_quality=85):
+    """为上传目录中尚未生成派生版本的图片生成派生版本，返回 (处理的图片数, 失败的图片数)"""
+    filenames = [
+        name for name in sorted(os.listdir(upload_folder))
+        if os.path.isfile(os.path.join(upload_folder, name))
+        and name.rsplit('.', 1)[-1].lower() in PIL_FORMATS.keys() | CANONICAL_EXTENSIONS.keys()
+        and (force or not os.path.exists(manifest_path(upload_folder, name)))
+    ]
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            name: executor.submit(generate_variants, upload_folder, name, widths, webp_quality, jpeg_quality)
+            for name in filenames
+        }
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f'{name}: {e}', file=sys.stderr)
+    return len(filenames), failed
+
+
+def main(argv=None):
+    from backend.config import Config
+
+    parser = argparse.ArgumentParser(
+        description='Generate resized and WebP variants for uploaded images that do not have them yet')
+    parser.add_argument('--upload-folder', default=Config.UPLOAD_FOLDER, help='upload directory')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='regenerate variants for all images')
+    args = parser.parse_args(argv)
+
+    processed, failed = backfill(args.upload_folder, Config.IMAGE_VARIANT_WIDTHS, args.workers, args.force,
+                                 Config.IMAGE_WEBP_QUALITY, Config.IMAGE_JPEG_QUALITY)
+    print(f'Processed {processed} images, {failed} failed')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
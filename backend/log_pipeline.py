@@ -0,0 +1,235 @@
+"""
+日志模块
+请求线程不直接写日志文件，日志先放入队列，由后台线程写入：
+
+1. 应用日志（app.logger）和访问日志通过 QueueHandler 放入有上限的队列（LOG_QUEUE_SIZE），
+   后台的 QueueListener 线程负责格式化和写文件；队列已满时丢弃新的记录并计数，不阻塞请求线程
+2. 应用日志写入 LOG_FILE 并输出到标准错误，按 LOG_MAX_BYTES 轮转，保留 LOG_BACKUP_COUNT 个文件
+3. 每个请求结束后向 ACCESS_LOG_FILE 写入一行JSON：
+   {"time", "remote", "method", "path", "route", "endpoint", "status", "bytes", "duration_ms",
+    "store_load_ms", "store_loads", "store_save_ms", "store_saves"}
+   route 为匹配的路由规则（例如 /api/articles/<int:article_id>），store_* 为请求在存储读写中花费的时间和次数
+   （见 backend.timing）；bytes 为响应体的字节数（压缩后），评论推送等流式响应在连接结束时记录，
+   bytes 为null
+4. 访问日志的JSON在写入线程中序列化，请求线程只收集字段
+
+多个工作进程各自轮转同一个日志文件，轮转的时机可能不一致；
+需要严格按大小切分时可以把 LOG_MAX_BYTES 设为0关闭轮转，由 logrotate 等外部工具处理
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import request, g, current_app
+from flask.logging import default_handler
+from backend.timing import request_timings
+
+# 访问日志使用的日志对象名称
+ACCESS_LOGGER = 'blog.access'
+
+# 与 Flask 默认的标准错误输出格式一致
+CONSOLE_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    放入队列时不等待，队列已满时丢弃记录
+    direct 不为None时不放入队列，在当前线程中直接交给 direct 写入
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.direct = None
+
+    def prepare(self, record):
+        # 结构化的访问日志保留原始字段，在写入线程中序列化
+        if isinstance(record.msg, dict):
+            return copy.copy(record)
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        if self.direct is not None:
+            self.direct(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonLineFormatter(logging.Formatter):
+    """把访问日志的字段序列化为一行JSON"""
+
+    def format(self, record):
+        return json.dumps(record.msg, ensure_ascii=False, separators=(',', ':'))
+
+
+def _is_access(record):
+    return record.name == ACCESS_LOGGER
+
+
+def _not_access(record):
+    return record.name != ACCESS_LOGGER
+
+
+class LogPipeline:
+    """日志队列和后台写入线程"""
+
+    def __init__(self, handlers, queue_size=10000):
+        self.handlers = handlers
+        self.queue_size = queue_size
+        self.queue_handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        self.listener = None
+
+    def start(self, background=True):
+        """
+        启动后台写入线程
+        background 为False时（预加载的主进程）不启动线程，日志在调用线程中直接写入，fork 之后由 after_fork 启动
+        """
+        if not background:
+            self.queue_handler.direct = self._handle
+            return
+        self.queue_handler.direct = None
+        self.listener = QueueListener(self.queue_handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def _handle(self, record):
+        """与 QueueListener 相同的方式在当前线程中写入一条记录"""
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def stop(self):
+        """写完队列中剩余的记录后停止写入线程"""
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+
+    def after_fork(self):
+        """在 fork 出的工作进程中调用：主进程的写入线程不会被复制，换用新的队列并启动本进程的写入线程"""
+        self.queue_handler.queue = queue.Queue(self.queue_size)
+        self.start()
+
+    def stats(self):
+        return {'queued': self.queue_handler.queue.qsize(), 'dropped': self.queue_handler.dropped}
+
+
+def _file_handler(path, config):
+    return RotatingFileHandler(
+        path,
+        maxBytes=config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+        backupCount=config.get('LOG_BACKUP_COUNT', 10),
+        encoding='utf-8',
+        delay=True
+    )
+
+
+def _create_pipeline(app):
+    config = app.config
+    file_handler = _file_handler(config['LOG_FILE'], config)
+    file_handler.setFormatter(logging.Formatter(config['LOG_FORMAT']))
+    file_handler.setLevel(logging.INFO)
+    file_handler.addFilter(_not_access)
+
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    console_handler.addFilter(_not_access)
+    handlers = [file_handler, console_handler]
+
+    if config.get('ACCESS_LOG_ENABLED', True):
+        access_handler = _file_handler(config['ACCESS_LOG_FILE'], config)
+        access_handler.setFormatter(JsonLineFormatter())
+        access_handler.addFilter(_is_access)
+        handlers.append(access_handler)
+
+    pipeline = LogPipeline(handlers, config.get('LOG_QUEUE_SIZE', 10000))
+    pipeline.start(background=not config.get('PRELOAD_APP'))
+    atexit.register(pipeline.stop)
+    return pipeline
+
+
+def init_logging(app):
+    """
+    把应用日志和访问日志接入日志队列，并注册访问日志的请求钩子
+    同一进程中多次创建应用时共用同一个日志对象和队列
+    """
+    for key in ('LOG_FILE', 'ACCESS_LOG_FILE'):
+        os.makedirs(os.path.dirname(app.config[key]), exist_ok=True)
+
+    pipeline = next((handler.pipeline for handler in app.logger.handlers
+                     if isinstance(handler, NonBlockingQueueHandler)), None)
+    if pipeline is None:
+        pipeline = _create_pipeline(app)
+        pipeline.queue_handler.pipeline = pipeline
+        app.logger.removeHandler(default_handler)
+        app.logger.addHandler(pipeline.queue_handler)
+        app.logger.setLevel(logging.INFO)
+
+        access_logger = logging.getLogger(ACCESS_LOGGER)
+        access_logger.addHandler(pipeline.queue_handler)
+        access_logger.setLevel(logging.INFO)
+        access_logger.propagate = False
+    app.extensions['log_pipeline'] = pipeline
+
+    if app.config.get('ACCESS_LOG_ENABLED', True):
+        app.before_request(_start_timer)
+        app.after_request(_log_access)
+    return pipeline
+
+
+# 访问日志
+
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+def _access_record(response):
+    timings = request_timings()
+    load_time, loads = timings.get('store_load', (0.0, 0))
+    save_time, saves = timings.get('store_save', (0.0, 0))
+    return {
+        'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'remote': request.remote_addr,
+        'method': request.method,
+        'path': request.path,
+        'route': request.url_rule.rule if request.url_rule is not None else None,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'bytes': response.content_length,
+        'duration_ms': None,
+        'store_load_ms': round(load_time * 1000, 3),
+        'store_loads': loads,
+        'store_save_ms': round(save_time * 1000, 3),
+        'store_saves': saves,
+    }
+
+
+def _emit(record, start):
+    record['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    logging.getLogger(ACCESS_LOGGER).info(record)
+
+
+def _log_access(response):
+    """after_request 钩子：在所有其他钩子（包括压缩）之后执行，记录的字节数为实际发送的大小"""
+    start = g.get('request_start')
+    if start is None:
+        return response
+    try:
+        record = _access_record(response)
+        if response.is_streamed and not response.direct_passthrough:
+            # 流式响应（评论推送）在连接结束时记录，耗时包括整个推送过程；
+            # 文件响应（direct_passthrough）交给服务器发送，长度已知，直接记录
+            response.call_on_close(lambda: _emit(record, start))
+        else:
+            _emit(record, start)
+    except Exception as e:
+        current_app.logger.error('Error writing access log: %s', str(e))
+    return response
@@ -0,0 +1,404 @@
+"""
+指标模块
+统计请求数、错误数、接口耗时、存储读写和JSON序列化耗时、响应缓存命中率、写入数据文件的字节数，
+以 Prometheus 文本格式通过 /api/metrics 输出：
+
+1. 每个进程在内存中累计计数器和直方图（桶的边界固定为 DEFAULT_BUCKETS），记录时只加一次锁
+2. 存储读写、JSON序列化和 bcrypt 的耗时来自 backend.timing 的计时（存储接口的方法、load_data/save_data、
+   应用的JSON序列化、hash_password/check_password），接口耗时由请求钩子记录，
+   评论推送等流式响应在连接结束时记录
+3. 多个工作进程的指标通过同一台机器上的共享目录（METRICS_DIR）汇总：每个进程的后台线程每隔
+   METRICS_FLUSH_INTERVAL 秒把本进程的累计值原子地写入自己的文件（进程号-随机后缀.json），
+   /api/metrics 先写入本进程的最新值，再读取目录中所有文件相加；其他进程的值最多滞后一个间隔
+4. 已退出进程的文件在应用启动时和每次汇总时合并到归档文件（archived.json）后删除，
+   其计数继续计入总数：计数器不会因为工作进程重启而减小，目录中的文件数也不会随重启次数增长
+
+指标：
+    blog_requests_total{route, method, status}          请求数，route 为匹配的路由规则，未匹配时为 unmatched
+    blog_request_errors_total{route, method}            返回5xx的请求数
+    blog_request_duration_seconds{route}                请求耗时
+    blog_response_bytes_total{route}                    响应体的字节数（压缩后），流式响应不计入
+    blog_operation_duration_seconds{operation}          store_load/store_save/json_dumps/bcrypt_hash/bcrypt_check 的耗时
+    blog_response_cache_total{result}                   响应缓存的命中（hit）和未命中（miss）次数
+    blog_store_bytes_written_total{file}                JSON存储写入变更日志（journal）和快照（snapshot）的字节数
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import bisect
+import threading
+from flask import request, g, current_app
+from flask.json.provider import DefaultJSONProvider
+from backend.timing import timed, add_observer
+
+# 直方图的桶上限（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 指标的类型和说明
+METRICS = {
+    'blog_requests_total': ('counter', 'Total HTTP requests.'),
+    'blog_request_errors_total': ('counter', 'HTTP requests that returned a 5xx status.'),
+    'blog_request_duration_seconds': ('histogram', 'HTTP request duration in seconds.'),
+    'blog_response_bytes_total': ('counter', 'Response body bytes sent, after compression.'),
+    'blog_operation_duration_seconds': ('histogram', 'Duration of storage, serialization and password operations in seconds.'),
+    'blog_response_cache_total': ('counter', 'Response cache lookups by result.'),
+    'blog_store_bytes_written_total': ('counter', 'Bytes written to the JSON data files.'),
+}
+
+# backend.timing 的计时名称中作为 blog_operation_duration_seconds 记录的部分
+OPERATIONS = frozenset(('store_load', 'store_save', 'json_dumps', 'bcrypt_hash', 'bcrypt_check'))
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """本进程的计数器和直方图，线程安全"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        """计数器加上 amount"""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """向直方图记录一个值"""
+        key = _key(name, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # 各个桶的次数（最后一个为超出所有上限的次数）和总和
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][index] += 1
+            histogram[1] += value
+
+    def snapshot(self):
+        """可以序列化为JSON的累计值"""
+        with self._lock:
+            return {
+                'buckets': list(self.buckets),
+                'counters': [[name, list(labels), value]
+                             for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(counts), total]
+                               for (name, labels), (counts, total) in self._histograms.items()],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# 进程内唯一的指标对象，请求钩子、存储和缓存直接记录到这里
+REGISTRY = MetricsRegistry()
+
+# 本进程的收集器，同一进程中多次创建应用时共用，同一份累计值只写入一个文件
+_collector = None
+
+# 已退出进程的累计值合并后保存的文件名
+ARCHIVE_FILE = 'archived.json'
+
+
+def merge_snapshots(snapshots):
+    """
+    把多个进程的累计值相加
+    返回 (计数器 {(名称, 标签): 值}, 直方图 {(名称, 标签): [各桶次数, 总和]}, 桶上限)
+    桶上限与本进程不一致的文件（例如升级前的进程留下的）跳过
+    """
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        if tuple(snapshot.get('buckets', ())) != REGISTRY.buckets:
+            continue
+        for name, labels, value in snapshot.get('counters', ()):
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total in snapshot.get('histograms', ()):
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = [list(counts), total]
+            else:
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+    return counters, histograms, REGISTRY.buckets
+
+
+def to_snapshot(counters, histograms, buckets):
+    """把 merge_snapshots 的结果转换回可以序列化为JSON的累计值（与 MetricsRegistry.snapshot 的格式相同）"""
+    return {
+        'buckets': list(buckets),
+        'counters': [[name, [list(label) for label in labels], value]
+                     for (name, labels), value in counters.items()],
+        'histograms': [[name, [list(label) for label in labels], counts, total]
+                       for (name, labels), (counts, total) in histograms.items()],
+    }
+
+
+# Prometheus 文本格式
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+
+def render_prometheus(counters, histograms, buckets):
+    """输出 Prometheus 文本格式（version 0.0.4）"""
+    series = {}
+    for (name, labels), value in counters.items():
+        series.setdefault(name, []).append((labels, value))
+    for (name, labels), histogram in histograms.items():
+        series.setdefault(name, []).append((labels, histogram))
+
+    lines = []
+    for name in sorted(series):
+        kind, help_text = METRICS.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(series[name], key=lambda item: item[0]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(buckets + (float('inf'),), counts):
+                cumulative += count
+                bucket_labels = labels + (('le', _format_value(float(bound))),)
+                lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(float(total))}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsCollector:
+    """
+    把本进程的指标写入共享目录，并汇总目录中所有进程的指标
+    预加载的主进程不启动写入线程，也不写文件，每个工作进程 fork 之后启动（见 after_fork）；
+    合并归档和汇总在目录的文件锁内进行，汇总不会同时读到归档和已经合并进去的文件
+    """
+
+    def __init__(self, directory, flush_interval=5.0, registry=REGISTRY):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.registry = registry
+        self.path = None
+        self.archive_path = os.path.join(directory, ARCHIVE_FILE)
+        self.lock_file = os.path.join(directory, 'archive.lock')
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _process_files(self):
+        """各进程的指标文件名（进程号-随机后缀.json）"""
+        return [name for name in os.listdir(self.directory)
+                if name.endswith('.json') and name != ARCHIVE_FILE]
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # 文件在读取前被删除，或者是其他进程正在写入的临时文件
+            return None
+
+    def archive(self):
+        """把已退出进程的指标文件合并到归档文件中，然后删除这些文件"""
+        from backend.models import exclusive_file_lock
+        with exclusive_file_lock(self.lock_file):
+            self._archive()
+
+    def _archive(self):
+        """
+        调用方需持有目录的文件锁
+        归档文件记录合并了哪些文件，写入归档之后、删除文件之前中断时，下次只删除这些文件，不会重复计入
+        """
+        from backend.models import atomic_write
+        archived = self._read(ARCHIVE_FILE) or {}
+        merged = set(archived.get('merged', ()))
+        dead = [name for name in self._process_files() if not _process_alive(name.split('-', 1)[0])]
+        pending = [name for name in dead if name not in merged]
+        if pending:
+            snapshots = [archived] + [self._read(name) or {} for name in pending]
+            content = {**to_snapshot(*merge_snapshots(snapshots)), 'merged': dead}
+            atomic_write(self.archive_path, json.dumps(content, separators=(',', ':')).encode('utf-8'),
+                         fsync=False)
+        for name in dead:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def start(self):
+        """开始写入本进程的指标文件，并启动后台写入线程"""
+        self.path = os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='blog-metrics-flush', daemon=True)
+            self._thread.start()
+
+    def after_fork(self):
+        """在 fork 出的工作进程中调用：不计入主进程在 fork 之前的指标，写入本进程自己的文件"""
+        self.registry.reset()
+        self._wake = threading.Event()
+        self._thread = None
+        self.start()
+
+    def flush(self):
+        """把本进程的累计值写入自己的文件"""
+        if self.path is None:
+            return
+        from backend.models import atomic_write
+        content = json.dumps(self.registry.snapshot(), separators=(',', ':')).encode('utf-8')
+        atomic_write(self.path, content, fsync=False)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # 写入失败时保留上一次的文件，下次重试
+                pass
+
+    def close(self, timeout=5):
+        """停止后台线程并写入最后的累计值"""
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join(timeout)
+        self.flush()
+
+    def collect(self):
+        """汇总所有进程（包括已归档的）的指标，返回 (计数器, 直方图, 桶上限)，参见 merge_snapshots"""
+        from backend.models import exclusive_file_lock
+        self.flush()
+        snapshots = []
+        if self.path is None:
+            snapshots.append(self.registry.snapshot())
+        with exclusive_file_lock(self.lock_file):
+            self._archive()
+            for name in self._process_files() + [ARCHIVE_FILE]:
+                snapshot = self._read(name)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+        return merge_snapshots(snapshots)
+
+    def render(self):
+        return render_prometheus(*self.collect())
+
+
+def _process_alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _record_operation(name, seconds):
+    """backend.timing 的观察者"""
+    if name in OPERATIONS:
+        REGISTRY.observe('blog_operation_duration_seconds', seconds, operation=name)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """记录应用JSON序列化（jsonify 等）耗时的 JSON provider"""
+
+    @timed('json_dumps')
+    def dumps(self, obj, **kwargs):
+        return super().dumps(obj, **kwargs)
+
+
+# 请求钩子
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _observe_duration(route, start):
+    REGISTRY.observe('blog_request_duration_seconds', time.perf_counter() - start, route=route)
+
+
+def _record_request(response):
+    """after_request 钩子：在压缩之后执行，记录的字节数为实际发送的大小"""
+    start = g.get('metrics_start')
+    if start is None:
+        return response
+    route = _route()
+    status = response.status_code
+    REGISTRY.inc('blog_requests_total', route=route, method=request.method, status=str(status))
+    if status >= 500:
+        REGISTRY.inc('blog_request_errors_total', route=route, method=request.method)
+    if response.is_streamed and not response.direct_passthrough:
+        # 与访问日志相同，流式响应在连接结束时记录耗时，不记录字节数
+        response.call_on_close(lambda: _observe_duration(route, start))
+        return response
+    if response.content_length is not None:
+        REGISTRY.inc('blog_response_bytes_total', response.content_length, route=route)
+    _observe_duration(route, start)
+    return response
+
+
+def init_metrics(app):
+    """
+    注册指标的请求钩子、JSON序列化计时和存储等操作的计时观察者
+    应在 init_logging 之后、其他扩展之前调用，钩子在压缩之后执行；
+    收集器保存在 app.extensions 中，METRICS_ENABLED 关闭时为None
+    """
+    global _collector
+    collector = None
+    if app.config.get('METRICS_ENABLED', True):
+        collector = _collector
+        if collector is None or collector.directory != app.config['METRICS_DIR']:
+            collector = _collector = MetricsCollector(
+                app.config['METRICS_DIR'],
+                flush_interval=app.config.get('METRICS_FLUSH_INTERVAL', 5.0)
+            )
+            # 上一次运行留下的文件合并到归档文件中；预加载时工作进程在 fork 之后才开始写入
+            collector.archive()
+            if not app.config.get('PRELOAD_APP'):
+                collector.start()
+            atexit.register(collector.close)
+
+        app.json = TimedJSONProvider(app)
+        add_observer(_record_operation)
+        app.before_request(_start_timer)
+        app.after_request(_record_request)
+    app.extensions['metrics'] = collector
+    return collector
+
+
+def get_metrics_collector():
+    """获取当前应用的指标收集器，未启用时返回None"""
+    return current_app.extensions.get('metrics')
@@ -5,8 +5,25 @@
 
 import os
 import json
+import time
+import atexit
+import copy
+import bisect
+import queue
+import tempfile
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
 from flask import current_app
+from backend.storage.indexes import ArticleIndex
+from backend.timing import timed
+from backend.metrics import REGISTRY as metrics
+
+try:
+	import fcntl
+except ImportError:  # Windows 不支持 fcntl
+	fcntl = None
 
 def get_default_data():
 	"""
@@ -62,34 +79,823 @@ def get_default_data():
 		]
 	}
 
+def _find(items, item_id):
+	"""按ID在列表中查找对象"""
+	return next((item for item in items if item['id'] == item_id), None)
+
+def _find_article(data, article_id, index=None):
+	"""按ID查找文章，提供了索引时直接通过索引查找"""
+	if index is not None:
+		return index.get(article_id)
+	return _find(data['articles'], article_id)
+
+def _comment_id(comment):
+	return comment['id']
+
+def _find_comment(comments, comment_id):
+	"""在按ID升序排列的评论列表中二分查找评论"""
+	i = bisect.bisect_left(comments, comment_id, key=_comment_id)
+	if i < len(comments) and comments[i]['id'] == comment_id:
+		return comments[i]
+	return None
+
+def _collection(data, coll, article_id=None, index=None):
+	"""
+	定位变更记录作用的集合
+	评论按文章保存在 data['comments'] 中，文章不存在时返回None
+	"""
+	if coll == 'comments':
+		if _find_article(data, article_id, index) is None:
+			return None
+		return data.setdefault('comments', {}).setdefault(str(article_id), [])
+	return data.setdefault(coll, [])
+
+def split_comments(data, article):
+	"""
+	把内嵌在文章中的评论（blog.json 的旧格式和导入格式）移到独立的评论集合
+	并在文章上记录评论数（comment_count），在 data['comment_seq'] 中记录评论序号
+	"""
+	key = str(article['id'])
+	comments = article.pop('comments', None)
+	if comments is not None:
+		comments = sorted(comments, key=_comment_id)
+		data.setdefault('comments', {})[key] = comments
+		seqs = data.setdefault('comment_seq', {})
+		seqs[key] = max(seqs.get(key, 0), comments[-1]['id'] if comments else 0)
+	article['comment_count'] = len(data.get('comments', {}).get(key, []))
+
+def normalize_comments(data):
+	"""
+	把评论内嵌在文章中的数据转换为独立的评论集合，已转换的数据保持不变
+	data['comments'] 按文章ID保存评论列表（按评论ID升序）；
+	data['comment_seq'] 按文章ID保存已分配的最大评论ID，删除评论后ID也不会被重复使用
+	"""
+	data.setdefault('comments', {})
+	data.setdefault('comment_seq', {})
+	for article in data.get('articles', []):
+		if 'comments' in article or 'comment_count' not in article:
+			split_comments(data, article)
+	return data
+
+def embed_comments(data):
+	"""
+	生成评论内嵌在文章中的 blog.json 交换格式（导出和迁移使用），不修改原数据
+	评论序号（comment_seq）保留在顶层，最新的评论被删除过的文章导入后也不会重复使用其ID
+	"""
+	comments = data.get('comments', {})
+	exported = {k: v for k, v in data.items() if k != 'comments'}
+	exported['articles'] = [
+		{**{k: v for k, v in article.items() if k != 'comment_count'},
+			'comments': list(comments.get(str(article['id']), article.get('comments', [])))}
+		for article in data.get('articles', [])
+	]
+	return exported
+
+def _update_index(index, record, item):
+	"""文章集合发生变化后增量更新索引"""
+	if index is None:
+		return
+	if record['op'] == 'set':
+		if record['key'] == 'articles':
+			index.rebuild(record['value'])
+	elif record['coll'] == 'articles':
+		if record['op'] == 'insert':
+			index.add(item)
+		elif record['op'] == 'update':
+			index.update(item)
+		elif record['op'] == 'delete':
+			index.remove(item['id'])
+
+def _touched_entities(record):
+	"""变更记录修改的文章和分类，返回 (集合名, 对象ID, 是否被删除)"""
+	coll = record.get('coll')
+	if coll == 'comments':
+		# 评论是文章的一部分，评论变化时文章的版本随之变化
+		return [('articles', record['article'], False)]
+	if coll in ('articles', 'categories'):
+		item_id = record['item']['id'] if record['op'] == 'insert' else record['id']
+		return [(coll, item_id, record['op'] == 'delete')]
+	return []
+
+def stamp_versions(data, records, version, modified=None):
+	"""
+	记录事务提交后的版本
+	data['version'] 为全局版本号，data['modified'] 为最后修改时间（Unix时间戳）；
+	data['versions'] 按集合保存每篇文章和每个分类最后一次被修改时的 [版本号, 修改时间]，
+	没有记录的对象（例如整体替换后的数据）以全局版本为准
+	实时提交和重放日志共用此函数，两者得到相同的版本
+	"""
+	data['version'] = version
+	if modified is not None:
+		data['modified'] = modified
+	versions = data.setdefault('versions', {})
+	for record in records:
+		if record['op'] == 'set':
+			versions.pop(record['key'], None)
+			continue
+		for coll, item_id, deleted in _touched_entities(record):
+			entries = versions.setdefault(coll, {})
+			if deleted:
+				entries.pop(str(item_id), None)
+			else:
+				entries[str(item_id)] = [version, modified]
+
+def entity_version(data, coll, item_id):
+	"""获取对象的 (版本号, 修改时间)，对象没有单独的版本记录时返回全局版本"""
+	entry = data.get('versions', {}).get(coll, {}).get(str(item_id))
+	if entry is not None:
+		return tuple(entry)
+	return data.get('version', 0), data.get('modified')
+
+def article_version(data, article):
+	"""文章的版本，取文章与其所属分类两者中较新的版本"""
+	return max(entity_version(data, 'articles', article['id']),
+		entity_version(data, 'categories', article['categoryId']),
+		key=lambda version: version[0])
+
+def apply_record(data, record, index=None):
+	"""
+	将一条变更记录应用到数据上
+	实时写入和启动时重放日志共用此函数，保证两者得到相同的结果
+	提供文章索引（ArticleIndex）时，文章的查找走索引，并同步更新索引
+
+	记录格式：
+		{'op': 'set', 'key': 'admin', 'value': {...}}
+		{'op': 'insert', 'coll': 'articles', 'item': {...}}
+		{'op': 'update', 'coll': 'articles', 'id': 1, 'fields': {...}}
+		{'op': 'delete', 'coll': 'comments', 'article': 1, 'id': 2}
+
+	Returns:
+		受影响的对象，目标不存在时返回None
+	"""
+	op = record['op']
+	if op == 'set':
+		if record['key'] == 'articles':
+			# 整体替换文章时评论随之替换
+			data['comments'], data['comment_seq'] = {}, {}
+			for article in record['value']:
+				split_comments(data, article)
+		data[record['key']] = record['value']
+		_update_index(index, record, record['value'])
+		return record['value']
+
+	coll = record['coll']
+	items = _collection(data, coll, record.get('article'), index)
+	if items is None:
+		return None
+	if coll == 'comments':
+		return _apply_comment_record(data, record, items, index)
+	if op == 'insert':
+		if coll == 'articles':
+			split_comments(data, record['item'])
+		items.append(record['item'])
+		_update_index(index, record, record['item'])
+		return record['item']
+
+	if coll == 'articles':
+		item = _find_article(data, record['id'], index)
+	else:
+		item = _find(items, record['id'])
+	if item is None:
+		return None
+	if op == 'update':
+		item.update(record['fields'])
+	elif op == 'delete':
+		items.remove(item)
+		if coll == 'articles':
+			data.get('comments', {}).pop(str(item['id']), None)
+			data.get('comment_seq', {}).pop(str(item['id']), None)
+	else:
+		raise ValueError(f'Unknown record op: {op}')
+	_update_index(index, record, item)
+	return item
+
+def _apply_comment_record(data, record, comments, index=None):
+	"""
+	应用评论的变更记录，同时维护文章的评论数和评论序号
+	评论数和序号由评论记录推导，不单独记录，重放旧日志时得到相同的结果
+	"""
+	op = record['op']
+	key = str(record['article'])
+	article = _find_article(data, record['article'], index)
+	if op == 'insert':
+		item = record['item']
+		bisect.insort(comments, item, key=_comment_id)
+		seqs = data.setdefault('comment_seq', {})
+		seqs[key] = max(seqs.get(key, 0), item['id'])
+	else:
+		item = _find_comment(comments, record['id'])
+		if item is None:
+			return None
+		if op == 'update':
+			item.update(record['fields'])
+		elif op == 'delete':
+			comments.remove(item)
+		else:
+			raise ValueError(f'Unknown record op: {op}')
+	article['comment_count'] = len(comments)
+	return item
+
+
+class Transaction:
+	"""
+	写事务
+	每个操作立即作用到内存中的数据并记录为一条变更记录，
+	事务结束后由存储对象负责持久化这些记录
+	index 为存储对象维护的文章索引，事务中的修改会同步更新索引
+	"""
+
+	def __init__(self, data, index=None):
+		self.data = data
+		self.index = index
+		self.records = []
+
+	def _apply(self, record):
+		result = apply_record(self.data, record, self.index)
+		if result is not None or record['op'] == 'set':
+			self.records.append(record)
+		return result
+
+	def _record(self, op, coll, article_id, **fields):
+		record = {'op': op, 'coll': coll, **fields}
+		if article_id is not None:
+			record['article'] = article_id
+		return record
+
+	def find(self, coll, item_id, article_id=None):
+		"""查找对象，不存在时返回None"""
+		if coll == 'articles':
+			return _find_article(self.data, item_id, self.index)
+		items = _collection(self.data, coll, article_id, self.index)
+		if items is None:
+			return None
+		return _find_comment(items, item_id) if coll == 'comments' else _find(items, item_id)
+
+	def set(self, key, value):
+		"""设置顶层字段，例如管理员信息"""
+		return self._apply({'op': 'set', 'key': key, 'value': value})
+
+	def insert(self, coll, item, article_id=None):
+		"""插入新对象，对象中必须已包含id"""
+		return self._apply(self._record('insert', coll, article_id, item=item))
+
+	def update(self, coll, item_id, fields, article_id=None):
+		"""更新对象的部分字段，返回更新后的对象"""
+		return self._apply(self._record('update', coll, article_id, id=item_id, fields=fields))
+
+	def delete(self, coll, item_id, article_id=None):
+		"""删除对象，返回被删除的对象"""
+		return self._apply(self._record('delete', coll, article_id, id=item_id))
+
+	def increment(self, coll, item_id, field, amount=1, article_id=None):
+		"""
+		对数值字段做增量更新
+		日志中记录的是增量后的结果，重放时不依赖当时的数值
+		"""
+		item = self.find(coll, item_id, article_id)
+		if item is None:
+			return None
+		value = item.get(field, 0) + amount
+		self.update(coll, item_id, {field: value}, article_id)
+		return value
+
+
+# 当前线程已持有的文件锁，用于支持同一线程重入
+_held_file_locks = threading.local()
+
+@contextmanager
+def exclusive_file_lock(lock_file):
+	"""
+	跨进程互斥锁
+	基于 fcntl.flock，多个工作进程写同一份数据文件时串行化；
+	同一线程可以重入，不支持 fcntl 的平台上不做任何事
+	"""
+	held = getattr(_held_file_locks, 'paths', None)
+	if held is None:
+		held = _held_file_locks.paths = set()
+	if fcntl is None or lock_file in held:
+		yield
+		return
+	os.makedirs(os.path.dirname(lock_file), exist_ok=True)
+	fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+	try:
+		fcntl.flock(fd, fcntl.LOCK_EX)
+		held.add(lock_file)
+		yield
+	finally:
+		held.discard(lock_file)
+		fcntl.flock(fd, fcntl.LOCK_UN)
+		os.close(fd)
+
+
+def write_temp_file(path, content, fsync=True):
+	"""
+	在目标文件所在目录写入一个唯一命名的临时文件并返回其路径
+	多个进程同时写同一目标时各自使用不同的临时文件
+	"""
+	directory = os.path.dirname(path)
+	os.makedirs(directory, exist_ok=True)
+	fd, tmp_file = tempfile.mkstemp(prefix=f'{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+	try:
+		with os.fdopen(fd, 'wb') as f:
+			f.write(content)
+			f.flush()
+			if fsync:
+				os.fsync(f.fileno())
+		os.chmod(tmp_file, 0o644)
+	except BaseException:
+		os.remove(tmp_file)
+		raise
+	return tmp_file
+
+
+def atomic_write(path, content, fsync=True):
+	"""通过临时文件 + fsync + 重命名原子地替换文件内容"""
+	os.replace(write_temp_file(path, content, fsync), path)
+
+
+class WriteCoordinator:
+	"""
+	单写者协调器
+	请求线程把写事务放入队列并等待结果，由一个后台线程依次执行；
+	时间窗口内到达的事务合并为一批，一次提交（一次写入和一次fsync），
+	提交完成后统一通知所有等待的请求
+	"""
+
+	def __init__(self, store, window=0.002, max_batch=64):
+		self.store = store
+		self.window = window
+		self.max_batch = max_batch
+		self._queue = queue.Queue()
+		self._thread = None
+		self._closed = False
+		self._start_lock = threading.Lock()
+
+	def submit(self, mutator):
+		"""提交写事务并等待提交完成，返回 mutator 的返回值或抛出其异常"""
+		future = Future()
+		with self._start_lock:
+			inline = self._closed or threading.current_thread() is self._thread
+			if not inline:
+				self._ensure_started()
+				self._queue.put((mutator, future))
+		if inline:
+			# 在协调线程内嵌套写入时直接执行，避免等待自身；
+			# 协调器关闭后（例如进程退出时合并计数缓冲）在调用线程中直接提交
+			self.store.commit_batch([(mutator, future)])
+		return future.result()
+
+	def _ensure_started(self):
+		"""调用方需持有 _start_lock"""
+		if self._thread is None or not self._thread.is_alive():
+			app = current_app._get_current_object()
+			self._thread = threading.Thread(target=self._run, args=(app,),
+				name='blog-write-coordinator', daemon=True)
+			self._thread.start()
+
+	def _collect_batch(self, first):
+		"""从第一个事务开始，收集时间窗口内到达的事务"""
+		batch = [first]
+		deadline = time.monotonic() + self.window
+		while len(batch) < self.max_batch:
+			timeout = deadline - time.monotonic()
+			try:
+				item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+			except queue.Empty:
+				break
+			if item is None:
+				# 关闭信号放回队列，处理完当前批次后退出
+				self._queue.put(None)
+				break
+			batch.append(item)
+		return batch
+
+	def _run(self, app):
+		with app.app_context():
+			while True:
+				item = self._queue.get()
+				if item is None:
+					break
+				batch = self._collect_batch(item)
+				try:
+					self.store.commit_batch(batch)
+				except Exception as e:
+					app.logger.error(f'Error committing write batch: {str(e)}')
+					for _, future in batch:
+						if not future.done():
+							future.set_exception(e)
+
+	def after_fork(self):
+		"""在 fork 出的工作进程中调用：协调线程不会被复制，丢弃继承的队列和线程，第一次写入时重新启动"""
+		self._queue = queue.Queue()
+		self._thread = None
+		self._start_lock = threading.Lock()
+
+	def close(self, timeout=5):
+		"""处理完队列中已有的事务后停止协调线程，之后提交的事务在调用线程中直接执行"""
+		with self._start_lock:
+			self._closed = True
+			running = self._thread is not None and self._thread.is_alive()
+			if running:
+				self._queue.put(None)
+		if running:
+			self._thread.join(timeout)
+
+
+class DataStore:
+	"""
+	长生命周期的数据存储对象
+	在内存中保存解析后的数据，只有当数据文件发生变化时才重新解析
+
+	文件是否变化通过 (inode, 大小, 修改时间) 组成的签名判断，
+	其他进程或手工修改数据文件后，下一次读取会自动重新加载
+
+	开启日志模式后，写入不再重写整个数据文件：
+	每个写事务作为一行紧凑的JSON追加到日志文件，数据文件只作为快照；
+	日志超过阈值时由后台线程把日志合并进新的快照。
+	加载时先读取快照，再重放版本号大于快照版本的日志记录。
+
+	存储对象同时维护文章索引（ArticleIndex），整体加载数据时重建，
+	写事务和重放日志时随变更记录增量更新。
+
+	所有写入都经过 WriteCoordinator 的单个写线程，并在跨进程文件锁内完成：
+	先刷新其他进程的修改，再执行一批事务，最后一次性持久化，
+	因此多个工作进程同时写入时不会丢失更新。
+	快照总是通过临时文件加重命名写入，读者不会读到被截断的文件；
+	写盘期间不阻塞读请求，同进程的读请求可能先于fsync完成看到新数据。
+	"""
+
+	def __init__(self, data_file, journal_file=None, compact_bytes=1024 * 1024, fsync=True,
+		lock_file=None, commit_window=0.002, max_batch=64):
+		self.data_file = data_file
+		self.journal_file = journal_file
+		self.compact_bytes = compact_bytes
+		self.fsync = fsync
+		self.lock_file = lock_file or f'{data_file}.lock'
+		self.coordinator = WriteCoordinator(self, window=commit_window, max_batch=max_batch)
+		self._data = None
+		self._index = ArticleIndex()
+		self._signature = None
+		self._journal_offset = 0
+		self._compacting = False
+		self._compaction_thread = None
+		# 为False时不启动后台合并线程（预加载的主进程），日志留给工作进程合并
+		self.background = True
+		self._lock = threading.RLock()
+
+	def _stat_signature(self):
+		"""获取数据文件的签名，文件不存在时返回None"""
+		try:
+			st = os.stat(self.data_file)
+		except FileNotFoundError:
+			return None
+		return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+	def _journal_size(self):
+		"""获取日志文件大小，未开启日志或文件不存在时返回0"""
+		if not self.journal_file:
+			return 0
+		try:
+			return os.path.getsize(self.journal_file)
+		except FileNotFoundError:
+			return 0
+
+	def load(self):
+		"""
+		获取当前数据
+		缓存有效时直接返回内存中的数据；其他进程追加了日志时只重放新增部分；
+		快照发生变化时重新读取快照和日志
+		如果文件不存在，写入并返回默认数据
+		"""
+		with self._lock:
+			signature = self._stat_signature()
+			journal_size = self._journal_size()
+			if self._data is not None and signature == self._signature:
+				if journal_size > self._journal_offset:
+					self._replay_journal()
+				if journal_size >= self._journal_offset:
+					return self._data
+
+			if signature is None:
+				return self._reset_to_default()
+
+			with open(self.data_file, 'r', encoding='utf-8') as f:
+				data = normalize_comments(json.load(f))
+			# 签名在读取前获取，读取期间文件若被修改，下一次读取会再次加载
+			self._data = data
+			self._index.rebuild(data.get('articles', []))
+			self._signature = signature
+			self._journal_offset = 0
+			self._replay_journal()
+			if self._journal_offset >= self.compact_bytes:
+				self._start_compaction()
+			return data
+
+	def load_index(self):
+		"""获取与当前数据一致的文章索引"""
+		with self._lock:
+			self.load()
+			return self._index
+
+	def _reset_to_default(self):
+		"""快照不存在时写入默认数据，旧日志已失去意义，一并清除"""
+		data = normalize_comments(get_default_data())
+		self._write_snapshot(data)
+		if self.journal_file and os.path.exists(self.journal_file):
+			os.remove(self.journal_file)
+		self._data = data
+		self._index.rebuild(data['articles'])
+		self._signature = self._stat_signature()
+		self._journal_offset = 0
+		return data
+
+	def _replay_journal(self):
+		"""从上次读到的位置开始重放日志，跳过快照中已包含的版本"""
+		if not self.journal_file or not os.path.exists(self.journal_file):
+			return
+		data = self._data
+		with open(self.journal_file, 'rb') as f:
+			f.seek(self._journal_offset)
+			for line in f:
+				if not line.endswith(b'\n'):
+					# 尚未写完的记录，等下次读取时再处理
+					break
+				self._journal_offset += len(line)
+				try:
+					entry = json.loads(line)
+				except ValueError:
+					current_app.logger.warning('Skipping corrupt journal entry at offset %d',
+						self._journal_offset - len(line))
+					continue
+				if entry['v'] <= data.get('version', 0):
+					continue
+				for record in entry['ops']:
+					apply_record(data, record, self._index)
+				stamp_versions(data, entry['ops'], entry['v'], entry.get('m'))
+
+	def write(self, mutator):
+		"""
+		在写事务中修改数据
+		mutator 接收 Transaction 对象，通过它读取和修改数据，其返回值作为本方法的返回值；
+		mutator 在写线程中执行，本方法等到事务所在的批次持久化完成后才返回
+		"""
+		return self.coordinator.submit(mutator)
+
+	def commit_batch(self, batch):
+		"""
+		执行并提交一批写事务，batch 为 (mutator, future) 列表
+		由写线程调用：在跨进程文件锁内刷新数据、逐个执行事务、一次性持久化，
+		持久化完成后才通知各个事务的等待者
+		"""
+		with exclusive_file_lock(self.lock_file):
+			entries = []
+			applied = []
+			for mutator, future in batch:
+				with self._lock:
+					data = self.load()
+					txn = Transaction(data, self._index)
+					try:
+						result = mutator(txn)
+					except Exception as e:
+						if txn.records:
+							# 部分修改已经作用到内存：丢弃内存数据从磁盘重新加载，
+							# 再重放本批中之前成功的事务，失败事务的修改不会被持久化
+							self._rollback(entries)
+						future.set_exception(e)
+						continue
+					if txn.records:
+						version, modified = data.get('version', 0) + 1, round(time.time(), 3)
+						stamp_versions(data, txn.records, version, modified)
+						# 记录的对象与内存数据共享，复制一份，之后的事务修改同一对象时不影响本条记录
+						entries.append({'v': version, 'm': modified, 'ops': copy.deepcopy(txn.records)})
+				applied.append((future, result))
+			self._persist(entries, applied)
+
+	def _rollback(self, entries):
+		"""重新加载磁盘上的数据，并重放尚未持久化的变更记录"""
+		self.invalidate()
+		data = self.load()
+		for entry in entries:
+			for record in entry['ops']:
+				apply_record(data, copy.deepcopy(record), self._index)
+			stamp_versions(data, entry['ops'], entry['v'], entry.get('m'))
+
+	def _persist(self, entries, applied):
+		"""
+		持久化一批事务的变更记录并通知等待者
+		只有写线程会修改数据，写盘期间不持有内存锁，读请求不会被fsync阻塞
+		"""
+		try:
+			if entries:
+				if self.journal_file:
+					self._append_journal(entries)
+				else:
+					self._write_snapshot(self._data)
+					with self._lock:
+						self._signature = self._stat_signature()
+		except Exception as e:
+			# 写入失败时磁盘状态未知，丢弃缓存以便下次重新加载
+			self.invalidate()
+			for future, _ in applied:
+				future.set_exception(e)
+			return
+		for future, result in applied:
+			future.set_result(result)
+
+	def _append_journal(self, entries):
+		"""把一批事务追加到日志，整批只做一次写入和一次fsync"""
+		payload = b''.join(
+			(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+			for entry in entries
+		)
+		with open(self.journal_file, 'ab') as f:
+			f.write(payload)
+			metrics.inc('blog_store_bytes_written_total', len(payload), file='journal')
+			f.flush()
+			if self.fsync:
+				os.fsync(f.fileno())
+			end = f.tell()
+		with self._lock:
+			# 读线程可能已经重放过这些记录，直接以文件末尾作为已读位置
+			self._journal_offset = max(self._journal_offset, end)
+		if end >= self.compact_bytes:
+			self._start_compaction()
+
+	def _write_snapshot(self, data):
+		"""通过临时文件加重命名写入快照，写入过程中不会出现被截断的数据文件"""
+		content = json.dumps(data, ensure_ascii=False, indent=4).encode('utf-8')
+		atomic_write(self.data_file, content, fsync=self.fsync)
+		metrics.inc('blog_store_bytes_written_total', len(content), file='snapshot')
+
+	def save(self, data):
+		"""
+		用完整数据覆盖快照，并用保存后的数据刷新缓存
+		快照已包含全部数据，日志随之清空
+		"""
+		normalize_comments(data)
+		with exclusive_file_lock(self.lock_file), self._lock:
+			try:
+				self._write_snapshot(data)
+				if self.journal_file and os.path.exists(self.journal_file):
+					os.remove(self.journal_file)
+			except Exception:
+				self.invalidate()
+				raise
+			self._data = data
+			self._index.rebuild(data.get('articles', []))
+			self._signature = self._stat_signature()
+			self._journal_offset = 0
+
+	def _start_compaction(self):
+		"""在后台线程中合并日志，同一时间只运行一个合并任务"""
+		if self._compacting or not self.background:
+			return
+		self._compacting = True
+		app = current_app._get_current_object()
+		self._compaction_thread = threading.Thread(target=self._compact_in_background, args=(app,),
+			name='blog-journal-compaction', daemon=True)
+		self._compaction_thread.start()
+
+	def _compact_in_background(self, app):
+		with app.app_context():
+			try:
+				self.compact()
+			except Exception as e:
+				app.logger.error(f'Error compacting journal: {str(e)}')
+			finally:
+				self._compacting = False
+
+	def compact(self):
+		"""
+		把日志合并进新的快照
+		序列化在内存锁内完成，写临时文件时不持有任何锁；
+		替换文件时持有跨进程文件锁，并确认期间没有其他进程合并过日志，
+		合并期间新追加的日志会保留在新日志文件中
+		"""
+		with self._lock:
+			data = self.load()
+			text = json.dumps(data, ensure_ascii=False, indent=4)
+			offset = self._journal_offset
+			signature = self._signature
+			journal_inode = os.stat(self.journal_file).st_ino
+
+		tmp_file = write_temp_file(self.data_file, text.encode('utf-8'))
+
+		with exclusive_file_lock(self.lock_file), self._lock:
+			if (self._stat_signature() != signature
+					or os.stat(self.journal_file).st_ino != journal_inode):
+				# 其他进程已经完成了合并
+				os.remove(tmp_file)
+				return
+			with open(self.journal_file, 'rb') as f:
+				f.seek(offset)
+				tail = f.read()
+			os.replace(tmp_file, self.data_file)
+			atomic_write(self.journal_file, tail)
+			# 新快照 + 保留下来的日志即为完整数据，把已读位置对齐到新的日志文件
+			consumed = self._journal_offset - offset
+			if self._data is not None and consumed >= 0:
+				self._signature = self._stat_signature()
+				self._journal_offset = consumed
+			else:
+				self.invalidate()
+
+	def invalidate(self):
+		"""丢弃缓存，下一次读取时重新加载数据文件"""
+		with self._lock:
+			self._data = None
+			self._signature = None
+			self._journal_offset = 0
+
+	def after_fork(self):
+		"""
+		在 fork 出的工作进程中调用：重建内存锁和写线程，允许启动后台合并
+		主进程在 fork 时可能持有的锁和合并状态不会带入工作进程
+		"""
+		self._lock = threading.RLock()
+		self._compacting = False
+		self._compaction_thread = None
+		self.background = True
+		self.coordinator.after_fork()
+
+	def close(self, timeout=5):
+		"""停止写线程并等待正在进行的日志合并，已提交的事务会先处理完"""
+		self.coordinator.close(timeout)
+		if self._compaction_thread is not None:
+			self._compaction_thread.join(timeout)
+
+
+def init_store(app):
+	"""
+	为应用创建数据存储对象
+	存储对象保存在 app.extensions 中，在整个应用生命周期内复用
+	"""
+	journal_file = None
+	if app.config.get('DATA_JOURNAL_ENABLED'):
+		journal_file = app.config['DATA_JOURNAL_FILE']
+	store = DataStore(
+		app.config['DATA_FILE'],
+		journal_file=journal_file,
+		compact_bytes=app.config.get('DATA_JOURNAL_COMPACT_BYTES', 1024 * 1024),
+		fsync=app.config.get('DATA_FSYNC', True),
+		commit_window=app.config.get('DATA_COMMIT_WINDOW', 0.002),
+		max_batch=app.config.get('DATA_COMMIT_MAX_BATCH', 64)
+	)
+	# 预加载的主进程不启动合并线程，工作进程 fork 之后恢复（见 after_fork）
+	store.background = not app.config.get('PRELOAD_APP')
+	app.extensions['data_store'] = store
+	# 进程退出前处理完队列中的写事务
+	atexit.register(store.close)
+	return store
+
+
+def get_store():
+	"""获取当前应用的数据存储对象，未初始化时自动创建"""
+	store = current_app.extensions.get('data_store')
+	if store is None:
+		store = init_store(current_app)
+	return store
+
+
+@timed('store_load', scope='store')
 def load_data():
 	"""
-	加载数据文件
+	加载数据
+	数据由应用级的存储对象缓存，文件未变化时不会重新解析
 	如果文件不存在，返回默认数据结构
+
+	注意：返回的数据在请求之间共享，只用于展示的字段应当写入副本
 	"""
 	try:
-		data_file = current_app.config['DATA_FILE']
-		if os.path.exists(data_file):
-			with open(data_file, 'r', encoding='utf-8') as f:
-				return json.load(f)
-		else:
-			# 如果文件不存在，返回默认数据
-			default_data = get_default_data()
-			save_data(default_data)  # 保存默认数据
-			return default_data
+		return get_store().load()
 	except Exception as e:
 		current_app.logger.error(f'Error loading data: {str(e)}')
 		return get_default_data()
 
+@timed('store_save', scope='store')
 def save_data(data):
 	"""
-	保存数据到文件
+	用完整数据覆盖数据文件
+	日常的增删改应通过 write_data 提交变更记录，只有整体替换数据时才需要调用本函数
 	"""
 	try:
-		data_file = current_app.config['DATA_FILE']
-		os.makedirs(os.path.dirname(data_file), exist_ok=True)
-		with open(data_file, 'w', encoding='utf-8') as f:
-			json.dump(data, f, ensure_ascii=False, indent=4)
+		get_store().save(data)
 	except Exception as e:
 		current_app.logger.error(f'Error saving data: {str(e)}')
 		raise
+
+@timed('store_save', scope='store')
+def write_data(mutator):
+	"""
+	在写事务中修改数据
+	mutator 接收 Transaction 对象，其返回值作为本函数的返回值
+
+	Example:
+		>>> write_data(lambda txn: txn.increment('articles', 1, 'likes'))
+		7
+	"""
+	try:
+		return get_store().write(mutator)
+	except Exception as e:
+		current_app.logger.error(f'Error writing data: {str(e)}')
+		raise
@@ -0,0 +1,159 @@
+"""
+密码哈希模块
+bcrypt 计算一次需要几百毫秒，登录、注册和修改密码时不在请求线程中直接计算：
+
+1. 密码的哈希和校验提交到专用的线程池（PASSWORD_WORKERS 个线程，bcrypt 计算时释放GIL），
+   请求线程等待结果；线程池中执行和排队的任务数不超过 PASSWORD_QUEUE_MAX，
+   已满时立即返回429，大量登录请求不会占满所有工作线程，公开接口的响应时间不受影响
+2. 登录请求按客户端IP和用户名分别限流（令牌桶）：每个IP可以连续尝试 LOGIN_RATE_IP_BURST 次，
+   之后每分钟恢复 LOGIN_RATE_IP_PER_MINUTE 次，用户名同理（LOGIN_RATE_USER_*）；
+   被限流的请求不计算哈希，直接返回429和 Retry-After
+3. 限流状态保存在每个工作进程中，每种桶的数量不超过 LOGIN_RATE_MAX_KEYS，超出时淘汰最久未使用的
+"""
+
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from backend.utils import hash_password, check_password
+
+
+class PasswordHasherBusy(Exception):
+    """密码哈希的线程池已满"""
+
+
+class PasswordHasher:
+    """
+    在专用线程池中计算 bcrypt
+    线程池在第一次提交任务时创建，提交时没有空闲的名额直接抛出 PasswordHasherBusy
+    """
+
+    def __init__(self, workers=2, queue_max=8):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max(queue_max, workers))
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Password hashing queue is full')
+        try:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='blog-bcrypt')
+                future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        """计算密码的哈希"""
+        return self._run(hash_password, password)
+
+    def check(self, password, hashed_password):
+        """验证密码是否与哈希匹配"""
+        return self._run(check_password, password, hashed_password)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RateLimiter:
+    """按键（IP或用户名）区分的令牌桶，线程安全"""
+
+    def __init__(self, burst, per_minute, max_keys=10000):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refill(self, key, now):
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        return min(self.burst, tokens + (now - last) * self.rate)
+
+    def retry_after(self, key):
+        """不消耗令牌，返回还需要等待的秒数，0表示可以通过"""
+        with self._lock:
+            if key not in self._buckets:
+                return 0
+            now = time.monotonic()
+            tokens = self._refill(key, now)
+            self._buckets[key] = (tokens, now)
+        return 0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def acquire(self, key):
+        """消耗一个令牌，返回0表示通过，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._refill(key, now)
+            wait = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class LoginLimiter:
+    """登录尝试的准入控制，同时检查客户端IP和用户名"""
+
+    def __init__(self, ip_limiter, user_limiter):
+        self.ip_limiter = ip_limiter
+        self.user_limiter = user_limiter
+
+    def acquire(self, ip, username):
+        """
+        记录一次登录尝试，返回0表示允许，否则返回需要等待的秒数
+        用户名已被限流时不消耗IP的令牌，IP被限流时不消耗用户名的令牌
+        """
+        wait = self.user_limiter.retry_after(username)
+        if wait:
+            return wait
+        wait = self.ip_limiter.acquire(ip or '-')
+        if wait:
+            return wait
+        return self.user_limiter.acquire(username)
+
+
+def init_passwords(app):
+    """为应用创建密码哈希线程池和登录限流，保存在 app.extensions 中"""
+    config = app.config
+    hasher = PasswordHasher(
+        workers=config.get('PASSWORD_WORKERS', 2),
+        queue_max=config.get('PASSWORD_QUEUE_MAX', 8)
+    )
+    max_keys = config.get('LOGIN_RATE_MAX_KEYS', 10000)
+    limiter = LoginLimiter(
+        RateLimiter(config.get('LOGIN_RATE_IP_BURST', 10), config.get('LOGIN_RATE_IP_PER_MINUTE', 5), max_keys),
+        RateLimiter(config.get('LOGIN_RATE_USER_BURST', 20), config.get('LOGIN_RATE_USER_PER_MINUTE', 10), max_keys)
+    )
+    atexit.register(hasher.close)
+    app.extensions['password_hasher'] = hasher
+    app.extensions['login_limiter'] = limiter
+    return hasher
+
+
+def get_password_hasher():
+    """获取当前应用的密码哈希线程池，未初始化时自动创建"""
+    if 'password_hasher' not in current_app.extensions:
+        init_passwords(current_app._get_current_object())
+    return current_app.extensions['password_hasher']
+
+
+def get_login_limiter():
+    """获取当前应用的登录限流，未初始化时自动创建"""
+    if 'login_limiter' not in current_app.extensions:
+        init_passwords(current_app._get_current_object())
+    return current_app.extensions['login_limiter']
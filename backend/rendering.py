@@ -0,0 +1,134 @@
+"""
+Markdown渲染模块
+在服务端把文章的markdown正文渲染为经过清理的HTML，供移动端和不执行脚本的客户端直接展示
+
+1. 渲染规则与前端 editor.md 保持一致：GFM表格、围栏代码块、单个换行渲染为 <br>
+2. 渲染结果经过白名单清理（nh3），只保留安全的标签、属性和链接协议
+3. 渲染结果按正文内容的哈希保存在磁盘上（RENDER_CACHE_DIR），同一份内容只渲染一次；
+   多个工作进程共享缓存目录，文件通过临时文件加重命名原子地写入
+4. 创建和更新文章时预先渲染，读取时一般直接命中缓存；正文修改和文章删除后移除旧正文的缓存文件
+"""
+
+import os
+import hashlib
+import markdown
+import nh3
+from markdown.extensions.toc import slugify_unicode
+from flask import current_app
+from backend.models import atomic_write
+
+# 渲染规则版本，渲染或清理规则变化时递增，旧的缓存文件不再被使用
+RENDER_VERSION = 1
+
+MARKDOWN_EXTENSIONS = ['extra', 'sane_lists', 'nl2br', 'toc']
+MARKDOWN_EXTENSION_CONFIGS = {
+    # 标题锚点保留中文
+    'toc': {'slugify': slugify_unicode}
+}
+
+# 在 nh3 默认白名单的基础上允许标题锚点和代码块的语言标记（language-xxx）
+ALLOWED_ATTRIBUTES = {
+    **{tag: set(attrs) for tag, attrs in nh3.ALLOWED_ATTRIBUTES.items()},
+    **{f'h{level}': {'id'} for level in range(1, 7)},
+    'code': {'class'},
+    'sup': {'id'},
+    'li': {'id'},
+}
+ALLOWED_URL_SCHEMES = {'http', 'https', 'mailto'}
+
+
+def render_markdown(text):
+    """
+    把markdown渲染为清理后的HTML
+
+    Example:
+        >>> render_markdown('**加粗** [链接](javascript:alert(1))')
+        '<p><strong>加粗</strong> <a rel="noopener noreferrer">链接</a></p>'
+    """
+    html = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS,
+                             extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+    return nh3.clean(html, attributes=ALLOWED_ATTRIBUTES, url_schemes=ALLOWED_URL_SCHEMES)
+
+
+class RenderCache:
+    """
+    渲染结果的磁盘缓存
+    文件名为渲染规则版本和正文内容的SHA-256，按前两位分目录保存：<目录>/ab/abcdef….html
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(f'{RENDER_VERSION}\n{text}'.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.html')
+
+    def get(self, text):
+        """读取已缓存的渲染结果，未缓存时返回None"""
+        try:
+            with open(self._path(self.key(text)), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def render(self, text):
+        """返回渲染结果，未缓存时渲染并写入缓存"""
+        html = self.get(text)
+        if html is None:
+            html = render_markdown(text)
+            path = self._path(self.key(text))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 缓存可以随时重新生成，不需要fsync
+            atomic_write(path, html.encode('utf-8'), fsync=False)
+        return html
+
+    def discard(self, text):
+        """移除正文的渲染结果，未缓存时什么也不做"""
+        try:
+            os.remove(self._path(self.key(text)))
+        except FileNotFoundError:
+            pass
+
+
+def init_renderer(app):
+    """为应用创建渲染缓存，缓存对象保存在 app.extensions 中"""
+    cache = RenderCache(app.config['RENDER_CACHE_DIR'])
+    app.extensions['render_cache'] = cache
+    return cache
+
+
+def get_render_cache():
+    """获取当前应用的渲染缓存，未初始化时自动创建"""
+    if 'render_cache' not in current_app.extensions:
+        return init_renderer(current_app)
+    return current_app.extensions['render_cache']
+
+
+def render_article(article):
+    """获取文章正文渲染后的HTML"""
+    return get_render_cache().render(article.get('content', ''))
+
+
+def prerender_article(article):
+    """
+    写入文章后预先渲染正文
+    文章已经保存成功，渲染失败只记录日志，读取时会再次渲染
+    """
+    try:
+        render_article(article)
+    except Exception as e:
+        current_app.logger.error('Error rendering article: %s', str(e))
+
+
+def discard_rendered(content):
+    """
+    文章正文修改或文章删除后移除旧正文的渲染结果，缓存目录中不会留下不再使用的文件
+    正文相同的其他文章共用同一个缓存文件，被移除后在读取时重新渲染；移除失败只记录日志
+    """
+    try:
+        get_render_cache().discard(content)
+    except Exception as e:
+        current_app.logger.error('Error discarding rendered article: %s', str(e))
@@ -1,5 +1,6 @@
 """
-博客后端启动脚本
+博客后端启动脚本（开发服务器）
+生产环境使用 gunicorn，见 backend/gunicorn.conf.py
 """
 
 import os
@@ -9,7 +10,9 @@ import sys
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-from backend.app import app
+from backend.app import create_app
+
+app = create_app()
 
 if __name__ == '__main__':
     app.run(
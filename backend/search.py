@@ -0,0 +1,369 @@
+"""
+全文搜索模块
+在内存中维护文章标题和正文的倒排索引，使用BM25算法对结果排序
+
+分词规则：
+1. 拉丁字母和数字按单词切分并转为小写
+2. 中日韩文字没有空格分隔，连续的文字切分为单字和相邻两字（bigram）
+   查询时长度大于1的文字串只使用bigram匹配，单个字使用单字匹配
+
+索引以每篇文章的词频表的形式持久化，启动时直接读取，无需重新分词：
+1. 索引文件（SEARCH_INDEX_FILE）是全部文章词频表的快照；每次增删改只向同目录下的变更日志
+   （search_index.journal）追加一行该文章的新词频表，写入的代价与文章大小有关，与文章总数无关
+2. 日志超过快照大小（且不小于 SEARCH_JOURNAL_COMPACT_BYTES）时在写入后合并为新的快照并清空日志，
+   合并的代价分摊到之前的每次写入上
+3. 多个工作进程共享同一组文件：修改索引时在文件锁内先读取其他进程追加的日志再追加；
+   搜索前发现文件被其他进程更新过时，只读取新增的日志，快照被替换时重新读取
+"""
+
+import os
+import re
+import json
+import math
+import threading
+from contextlib import nullcontext
+from flask import current_app
+from backend.models import exclusive_file_lock, atomic_write
+
+# 索引文件格式版本，分词规则变化时递增，旧版本的索引文件会被重建
+INDEX_FORMAT = 1
+
+# 标题中的词按此权重计入词频
+TITLE_WEIGHT = 3
+
+# BM25参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_TOKEN_RE = re.compile(f'([{_CJK}]+)|([^\\W_{_CJK}]+)')
+
+
+def tokenize(text, for_query=False):
+    """
+    把文本切分为索引词
+
+    Args:
+        text (str): 需要分词的文本
+        for_query (bool): 为查询分词时，长度大于1的中文串不生成单字
+
+    Returns:
+        list: 索引词列表（可能包含重复项）
+
+    Example:
+        >>> tokenize('Flask博客系统')
+        ['flask', '博', '客', '系', '统', '博客', '客系', '系统']
+    """
+    tokens = []
+    for cjk, word in _TOKEN_RE.findall(text.lower()):
+        if word:
+            tokens.append(word)
+            continue
+        if len(cjk) == 1 or not for_query:
+            tokens.extend(cjk)
+        tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def _term_frequencies(article):
+    """统计文章的词频，标题中的词按 TITLE_WEIGHT 加权"""
+    frequencies = {}
+    for token in tokenize(article.get('content', '')):
+        frequencies[token] = frequencies.get(token, 0) + 1
+    for token in tokenize(article.get('title', '')):
+        frequencies[token] = frequencies.get(token, 0) + TITLE_WEIGHT
+    return frequencies
+
+
+def _stamp(article):
+    """
+    文章的摘要，启动时用文章列表视图核对，发现索引文件之外发生的修改（包括增量更新失败的文章）
+    正文的修改由写入时生成的 content_hash 反映，尚未回填该字段的旧文章只能发现元数据的修改
+    """
+    return [article.get('title', ''), article['date'], article['categoryId'], article.get('content_hash')]
+
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def journal_path(index_file):
+    """索引变更日志的路径"""
+    return f'{os.path.splitext(index_file)[0]}.journal'
+
+
+def _dump(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class SearchIndex:
+    """
+    倒排索引
+    docs 保存每篇文章的分类、日期、元数据摘要和词频表，是持久化的内容；
+    postings（词 -> {文章ID: 词频}）和文档长度在加载时由 docs 生成，并随增删改增量更新
+
+    变更日志每行一条记录：{"op": "add", "id": 文章ID, "doc": {...}} 或 {"op": "remove", "id": 文章ID}，
+    一条记录整体替换或移除一篇文章，重放已包含在快照中的记录不改变结果
+    """
+
+    def __init__(self, index_file=None, fsync=True, compact_bytes=256 * 1024):
+        self.index_file = index_file
+        self.journal_file = journal_path(index_file) if index_file else None
+        self.lock_file = f'{index_file}.lock' if index_file else None
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self._lock = threading.RLock()
+        self._signature = None
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._reset({})
+
+    def _reset(self, docs):
+        self.docs = {}
+        self.postings = {}
+        self.total_length = 0
+        for article_id, doc in docs.items():
+            self._add_doc(article_id, doc)
+
+    def _add_doc(self, article_id, doc):
+        self.docs[article_id] = doc
+        for term, tf in doc['terms'].items():
+            self.postings.setdefault(term, {})[article_id] = tf
+        self.total_length += doc['length']
+
+    def _remove_doc(self, article_id):
+        doc = self.docs.pop(article_id, None)
+        if doc is None:
+            return
+        for term in doc['terms']:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(article_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= doc['length']
+
+    def __len__(self):
+        return len(self.docs)
+
+    # 持久化
+
+    def _journal_stat(self):
+        """日志文件的 (inode, 大小)，文件不存在时返回 (None, 0)"""
+        try:
+            st = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return None, 0
+        return st.st_ino, st.st_size
+
+    def _refresh(self):
+        """
+        读取其他进程的修改，返回是否读取成功
+        快照未变化时只重放新增的日志；快照被替换或日志被清空过时重新读取快照和全部日志
+        """
+        if not self.index_file:
+            return False
+        signature = _stat_signature(self.index_file)
+        if signature is None:
+            return False
+        journal_inode, journal_size = self._journal_stat()
+        # 读取快照时日志还不存在，之后创建的日志仍属于这份快照（合并会替换快照）
+        same_journal = journal_inode == self._journal_inode or (
+            self._journal_inode is None and self._journal_offset == 0)
+        if signature == self._signature and same_journal:
+            self._journal_inode = journal_inode
+            if journal_size > self._journal_offset:
+                self._replay_journal()
+            return True
+        with open(self.index_file, 'rb') as f:
+            data = json.loads(f.read())
+        if data.get('format') != INDEX_FORMAT:
+            return False
+        self._reset({int(k): v for k, v in data['docs'].items()})
+        self._signature = signature
+        self._journal_inode = journal_inode
+        self._journal_offset = 0
+        self._replay_journal()
+        return True
+
+    def _replay_journal(self):
+        """从上次读到的位置开始重放日志"""
+        try:
+            f = open(self.journal_file, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._journal_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # 尚未写完的记录，等下次读取时再处理
+                    break
+                self._journal_offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(entry)
+
+    def _apply(self, entry):
+        self._remove_doc(entry['id'])
+        if entry['op'] == 'add':
+            self._add_doc(entry['id'], entry['doc'])
+
+    def _save(self):
+        """把全部词频表写成新的快照并清空日志，调用方需持有文件锁"""
+        if not self.index_file:
+            return
+        atomic_write(self.index_file, _dump({'format': INDEX_FORMAT, 'docs': self.docs}), fsync=self.fsync)
+        try:
+            os.remove(self.journal_file)
+        except FileNotFoundError:
+            pass
+        self._signature = _stat_signature(self.index_file)
+        self._journal_inode = None
+        self._journal_offset = 0
+
+    def _append(self, entry):
+        """向日志追加一条记录，调用方需持有文件锁；日志超过阈值时合并为新的快照"""
+        with open(self.journal_file, 'ab') as f:
+            f.write(_dump(entry) + b'\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self._journal_offset = f.tell()
+            self._journal_inode = os.fstat(f.fileno()).st_ino
+        if self._journal_offset >= max(self.compact_bytes, self._signature[1]):
+            self._save()
+
+    def _modify(self, entry):
+        """在文件锁内读取其他进程的修改，应用 entry 后追加到日志"""
+        if not self.index_file:
+            with self._lock:
+                self._apply(entry)
+            return
+        with self._lock, exclusive_file_lock(self.lock_file):
+            if not self._refresh():
+                # 快照不存在或格式不符，把当前内容写成快照后再追加
+                self._save()
+            self._apply(entry)
+            self._append(entry)
+
+    # 增量更新
+
+    def _make_doc(self, article):
+        terms = _term_frequencies(article)
+        return {
+            'category': article['categoryId'],
+            'date': article['date'],
+            'stamp': _stamp(article),
+            'length': sum(terms.values()),
+            'terms': terms
+        }
+
+    def add_article(self, article):
+        """索引新文章或重新索引修改过的文章，article 需包含标题和正文"""
+        self._modify({'op': 'add', 'id': article['id'], 'doc': self._make_doc(article)})
+
+    def remove_article(self, article_id):
+        """从索引中移除文章"""
+        self._modify({'op': 'remove', 'id': article_id})
+
+    def sync(self, repository):
+        """
+        使索引与仓储中的文章一致
+        读取索引文件后用文章列表视图核对：缺少或摘要（见 _stamp）不一致的文章重新索引，
+        已删除的文章从索引中移除，只有这些文章需要读取正文
+
+        Returns:
+            int: 重新索引和移除的文章数量
+        """
+        listings = {a['id']: a for a in repository.list_articles()}
+        changed = 0
+        with self._lock, exclusive_file_lock(self.lock_file) if self.index_file else nullcontext():
+            if not self._refresh():
+                self._reset({})
+            for article_id in list(self.docs):
+                if article_id not in listings:
+                    self._remove_doc(article_id)
+                    changed += 1
+            for article_id, listing in listings.items():
+                doc = self.docs.get(article_id)
+                if doc is not None and doc['stamp'] == _stamp(listing):
+                    continue
+                article = repository.get_article(article_id)
+                if article is None:
+                    continue
+                self._remove_doc(article_id)
+                self._add_doc(article_id, self._make_doc(article))
+                changed += 1
+            if changed or self._signature is None:
+                self._save()
+        return changed
+
+    # 查询
+
+    def search(self, query, category_id=None, limit=10, offset=0):
+        """
+        按BM25得分搜索文章
+
+        Args:
+            query (str): 查询文本
+            category_id (int, optional): 只搜索该分类下的文章
+            limit (int): 返回数量
+            offset (int): 跳过的结果数量
+
+        Returns:
+            tuple: (当前页的 (文章ID, 得分) 列表, 匹配的文章总数)
+        """
+        terms = set(tokenize(query, for_query=True))
+        with self._lock:
+            self._refresh()
+            if not terms or not self.docs:
+                return [], 0
+            total_docs = len(self.docs)
+            average_length = self.total_length / total_docs or 1
+            scores = {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for article_id, tf in postings.items():
+                    doc = self.docs[article_id]
+                    if category_id is not None and doc['category'] != category_id:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc['length'] / average_length)
+                    scores[article_id] = scores.get(article_id, 0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            # 得分相同时较新的文章排在前面
+            ranked = sorted(scores.items(), key=lambda item: (item[1], self.docs[item[0]]['date']), reverse=True)
+        return ranked[offset:offset + limit], len(ranked)
+
+
+def init_search(app, repository):
+    """
+    为应用创建搜索索引
+    索引对象保存在 app.extensions 中，创建时与仓储中的文章同步一次
+    """
+    index = SearchIndex(
+        app.config.get('SEARCH_INDEX_FILE'),
+        fsync=app.config.get('DATA_FSYNC', True),
+        compact_bytes=app.config.get('SEARCH_JOURNAL_COMPACT_BYTES', 256 * 1024)
+    )
+    changed = index.sync(repository)
+    if changed:
+        app.logger.info('Search index updated for %d articles', changed)
+    app.extensions['search_index'] = index
+    return index
+
+
+def get_search_index():
+    """获取当前应用的搜索索引，未初始化时自动创建"""
+    index = current_app.extensions.get('search_index')
+    if index is None:
+        from backend.storage import get_repository
+        index = init_search(current_app, get_repository())
+    return index
@@ -0,0 +1,46 @@
+"""
+存储包
+提供博客数据的仓储接口和各个存储后端
+通过 Config.STORAGE_BACKEND 选择使用的后端
+"""
+
+from flask import current_app
+from backend.storage.base import BlogRepository, StorageError, NotFoundError, ConflictError
+
+
+def create_repository(app):
+    """根据应用配置创建仓储对象"""
+    backend = app.config.get('STORAGE_BACKEND', 'json')
+    if backend == 'json':
+        from backend.models import init_store
+        from backend.storage.json_backend import JsonRepository
+        return JsonRepository(init_store(app))
+    if backend == 'sqlite':
+        from backend.storage.sqlite_backend import SqliteRepository
+        return SqliteRepository(app.config['SQLITE_DATABASE'])
+    if backend == 'sharded':
+        from backend.storage.sharded_backend import ShardedRepository
+        return ShardedRepository(app.config['SHARDED_DATA_DIR'],
+                                 body_cache_size=app.config.get('SHARDED_BODY_CACHE_SIZE', 256),
+                                 fsync=app.config.get('DATA_FSYNC', True),
+                                 journal_compact_bytes=app.config.get('SHARDED_JOURNAL_COMPACT_BYTES',
+                                                                      256 * 1024))
+    raise ValueError(f'Unknown storage backend: {backend}')
+
+
+def init_storage(app):
+    """
+    为应用创建仓储对象
+    仓储对象保存在 app.extensions 中，在整个应用生命周期内复用
+    """
+    repository = create_repository(app)
+    app.extensions['repository'] = repository
+    return repository
+
+
+def get_repository():
+    """获取当前应用的仓储对象，未初始化时自动创建"""
+    repository = current_app.extensions.get('repository')
+    if repository is None:
+        repository = init_storage(current_app)
+    return repository
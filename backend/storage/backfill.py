@@ -0,0 +1,63 @@
+"""
+派生字段回填工具
+为已有的文章和评论生成写入时才会计算的派生字段（摘要、格式化日期、字数、阅读时间、正文哈希），
+只更新缺少派生字段或派生字段已过期的对象，可以重复执行
+
+用法：
+    python -m backend.storage.backfill
+"""
+
+import os
+import sys
+import argparse
+
+# 将项目根目录添加到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.utils import derive_article_fields, derive_comment_fields
+
+
+def _stale(item, derived):
+    return any(item.get(field) != value for field, value in derived.items())
+
+
+def backfill(repository):
+    """
+    回填仓储中所有文章和评论的派生字段
+
+    Returns:
+        dict: 更新的文章和评论数量
+    """
+    counts = {'articles': 0, 'comments': 0}
+    for article in repository.list_articles(include_body=True):
+        derived = derive_article_fields(article)
+        if _stale(article, derived):
+            repository.update_article(article['id'], derived)
+            counts['articles'] += 1
+        for comment in article.get('comments', []):
+            derived = derive_comment_fields(comment)
+            if _stale(comment, derived):
+                repository.update_comment(article['id'], comment['id'], derived)
+                counts['comments'] += 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compute stored derived fields (summary, formatted dates, word count, reading time, content hash) '
+                    'for existing articles and comments of the configured storage backend')
+    parser.parse_args(argv)
+
+    from backend.app import create_app
+    from backend.storage import get_repository
+
+    with create_app().app_context():
+        counts = backfill(get_repository())
+    print(f"Updated {counts['articles']} articles and {counts['comments']} comments")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
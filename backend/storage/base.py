@@ -0,0 +1,207 @@
+"""
+存储接口模块
+定义蓝图访问博客数据所使用的仓储接口，以及存储层的异常类型
+各个存储后端（JSON文件、分片JSON文件、SQLite）实现同一套接口
+"""
+
+from backend.utils import truncate_text, markdown_to_text
+from backend.timing import timed
+
+# 文章正文相关的字段，列表视图中不包含这些字段
+ARTICLE_BODY_FIELDS = ('content', 'comments')
+
+# 只读取数据的接口方法，耗时计入 store_load；其他接口方法的耗时计入 store_save
+READ_METHODS = frozenset({
+    'get_version', 'get_entity_version', 'get_admin', 'list_categories', 'get_category',
+    'count_articles_by_category', 'category_stats', 'list_articles', 'list_articles_by_ids',
+    'get_article', 'list_comments', 'get_comment_seq',
+})
+
+
+def article_listing(article):
+    """
+    由完整文章生成列表视图
+    去掉正文和评论，保留评论数（comment_count）；
+    摘要（summary）在写入文章时生成，尚未回填派生字段的旧数据在这里补上
+    """
+    listing = {k: v for k, v in article.items() if k not in ARTICLE_BODY_FIELDS}
+    if 'summary' not in listing:
+        listing['summary'] = truncate_text(markdown_to_text(article.get('content', '')))
+    if 'comment_count' not in listing:
+        listing['comment_count'] = len(article.get('comments', []))
+    return listing
+
+
+class StorageError(Exception):
+    """存储层业务错误，携带建议返回给客户端的HTTP状态码"""
+    status_code = 400
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        if status_code is not None:
+            self.status_code = status_code
+
+
+class NotFoundError(StorageError):
+    """要修改的对象不存在"""
+    status_code = 404
+
+
+class ConflictError(StorageError):
+    """修改与现有数据冲突，例如分类名称重复"""
+    status_code = 400
+
+
+class BlogRepository:
+    """
+    博客数据仓储接口
+
+    约定：
+    1. get_* 方法在对象不存在时返回None
+    2. 修改类方法在对象不存在时抛出 NotFoundError，与现有数据冲突时抛出 ConflictError
+    3. 返回的对象可能与存储内部共享，调用方需要附加展示字段时应先复制
+    4. 文章对象使用 categoryId 字段表示所属分类，与接口返回的格式一致
+    5. 文章列表默认返回列表视图（见 article_listing），不读取文章正文和评论
+    6. 评论独立于文章保存，文章上只保存评论数（comment_count），评论通过 list_comments 分页读取；
+       评论ID按文章递增分配，删除评论后ID不会被重复使用
+    7. 版本查询（get_version、get_entity_version）不读取对象内容，用于条件请求的快速判断
+    8. 后端实现的接口方法自动计时，请求在存储中花费的时间记录在访问日志中（见 backend.timing）
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, method in list(vars(cls).items()):
+            if name.startswith('_') or not callable(method) or not callable(getattr(BlogRepository, name, None)):
+                continue
+            kind = 'store_load' if name in READ_METHODS else 'store_save'
+            setattr(cls, name, timed(kind, scope='store')(method))
+
+    # 版本
+
+    def get_version(self):
+        """
+        获取全局版本，返回 (版本号, 最后修改时间)
+        版本号在每次写入后递增，修改时间为Unix时间戳，未知时为None
+        """
+        raise NotImplementedError
+
+    def get_entity_version(self, coll, entity_id):
+        """
+        获取单个对象的版本，coll 为 'articles' 或 'categories'，返回 (版本号, 最后修改时间)
+        文章的版本涵盖其评论、阅读量、点赞数和所属分类：取文章与分类两者中较新的版本，
+        版本号全局递增，任何一方变化后结果都会变大；对象不存在时返回None
+        """
+        raise NotImplementedError
+
+    # 管理员
+
+    def get_admin(self):
+        """获取管理员信息，尚未注册时返回None"""
+        raise NotImplementedError
+
+    def create_admin(self, admin):
+        """创建管理员账号，已存在管理员时抛出 ConflictError"""
+        raise NotImplementedError
+
+    def update_admin(self, fields):
+        """更新管理员信息，返回更新后的管理员信息"""
+        raise NotImplementedError
+
+    # 分类
+
+    def list_categories(self):
+        """获取所有分类"""
+        raise NotImplementedError
+
+    def get_category(self, category_id):
+        """获取单个分类"""
+        raise NotImplementedError
+
+    def count_articles_by_category(self):
+        """统计每个分类下的文章数量，返回 {分类ID: 文章数量}"""
+        raise NotImplementedError
+
+    def category_stats(self):
+        """
+        获取各分类的聚合数据，返回 {分类ID: {article_count, total_views, total_likes, latest_date}}
+        聚合数据随文章增删改增量维护，读取为 O(分类数)；没有文章的分类不出现在结果中
+        """
+        raise NotImplementedError
+
+    def create_category(self, name, description=''):
+        """创建分类，名称重复时抛出 ConflictError"""
+        raise NotImplementedError
+
+    def update_category(self, category_id, fields):
+        """更新分类，名称与其他分类重复时抛出 ConflictError"""
+        raise NotImplementedError
+
+    def delete_category(self, category_id):
+        """删除分类，分类下仍有文章时抛出 ConflictError"""
+        raise NotImplementedError
+
+    # 文章
+
+    def list_articles(self, category_id=None, include_body=False, limit=None, before=None):
+        """
+        获取文章列表，按日期和ID降序排列，可按分类过滤
+        默认返回不含正文和评论的列表视图，include_body=True 时返回包含正文和全部评论的完整文章；
+        before 为 (date, id) 时只返回排在该文章之后的文章，limit 限制返回数量
+        """
+        raise NotImplementedError
+
+    def list_articles_by_ids(self, article_ids):
+        """按给定的ID顺序获取文章列表视图，不存在的文章被跳过"""
+        raise NotImplementedError
+
+    def get_article(self, article_id):
+        """获取单篇文章（包含正文和评论数，不包含评论，评论通过 list_comments 读取）"""
+        raise NotImplementedError
+
+    def create_article(self, fields):
+        """创建文章，由存储分配ID，返回创建的文章"""
+        raise NotImplementedError
+
+    def update_article(self, article_id, fields):
+        """更新文章的部分字段，返回更新后的文章"""
+        raise NotImplementedError
+
+    def delete_article(self, article_id):
+        """删除文章及其评论"""
+        raise NotImplementedError
+
+    def increment_article(self, article_id, field, amount=1):
+        """对文章的计数字段（views、likes）做增量更新，返回更新后的数值"""
+        raise NotImplementedError
+
+    def increment_articles(self, increments):
+        """
+        在一个事务中对多篇文章的计数字段做增量更新
+        increments 为 (文章ID, 字段, 增量) 列表，不存在的文章被跳过
+        """
+        raise NotImplementedError
+
+    # 评论
+
+    def add_comment(self, article_id, fields):
+        """为文章添加评论，由存储分配评论ID，返回创建的评论"""
+        raise NotImplementedError
+
+    def list_comments(self, article_id, limit=None, after=None):
+        """
+        按评论ID升序获取文章的评论，after 为评论ID时只返回ID大于它的评论，limit 限制返回数量
+        文章不存在时返回空列表
+        """
+        raise NotImplementedError
+
+    def get_comment_seq(self, article_id):
+        """获取文章已分配过的最大评论ID，新评论的ID总是大于它；文章不存在时返回None"""
+        raise NotImplementedError
+
+    def update_comment(self, article_id, comment_id, fields):
+        """更新评论字段，返回更新后的评论"""
+        raise NotImplementedError
+
+    def delete_comment(self, article_id, comment_id):
+        """删除文章下的评论"""
+        raise NotImplementedError
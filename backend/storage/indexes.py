@@ -0,0 +1,173 @@
+"""
+文章二级索引
+JSON文件后端和分片后端在内存中维护的文章索引：ID到文章、分类到文章、按日期排序的序列，
+以及每个分类的聚合数据（文章数、总阅读量、总点赞数、最新文章日期）
+索引随每次增删改增量更新，只在整体重新加载数据时重建
+"""
+
+from bisect import bisect_left, insort
+
+
+# 按分类累加的计数字段
+TOTAL_FIELDS = ('views', 'likes')
+
+
+def _sort_key(article):
+    return (article['date'], article['id'])
+
+
+def _counts(article):
+    return tuple(article.get(field, 0) for field in TOTAL_FIELDS)
+
+
+class ArticleIndex:
+    """
+    文章索引
+    按ID查找为O(1)；按日期排序的序列以 (date, id) 升序保存在有序列表中，
+    插入和删除用二分查找定位，列表接口按日期降序返回，无需每次请求重新排序
+
+    索引保存的是文章对象本身的引用，文章字段被原地修改后需要调用 update
+    让索引根据新的日期和分类调整位置并更新分类的聚合数据；
+    为此索引另外记录每篇文章上次计入聚合时的计数
+
+    max_id 为索引中出现过的最大文章ID，删除文章后不减小，新文章的ID由 next_id 分配，
+    不需要扫描全部文章
+    """
+
+    def __init__(self, articles=()):
+        self.rebuild(articles)
+
+    def rebuild(self, articles):
+        """根据完整的文章列表重建索引"""
+        by_id = {}
+        keys = {}
+        by_category = {}
+        counted = {}
+        totals = {}
+        max_id = 0
+        for article in articles:
+            by_id[article['id']] = article
+            max_id = max(max_id, article['id'])
+            keys[article['id']] = (_sort_key(article), article['categoryId'])
+            counted[article['id']] = _counts(article)
+            category_totals = totals.setdefault(article['categoryId'], [0] * len(TOTAL_FIELDS))
+            for i, value in enumerate(counted[article['id']]):
+                category_totals[i] += value
+        ordered = sorted(key for key, _ in keys.values())
+        for key, category_id in keys.values():
+            by_category.setdefault(category_id, []).append(key)
+        for category_keys in by_category.values():
+            category_keys.sort()
+        # 新结构构建完成后再整体替换，读线程不会看到构建到一半的索引
+        self._by_id, self._keys, self._by_date, self._by_category = by_id, keys, ordered, by_category
+        self._counted, self._totals = counted, totals
+        self.max_id = max_id
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def next_id(self):
+        """新文章的ID"""
+        return self.max_id + 1
+
+    def get(self, article_id):
+        """按ID获取文章，不存在时返回None"""
+        return self._by_id.get(article_id)
+
+    def _insert_key(self, article_id, key, category_id):
+        self._keys[article_id] = (key, category_id)
+        insort(self._by_date, key)
+        insort(self._by_category.setdefault(category_id, []), key)
+
+    def _remove_key(self, article_id):
+        key, category_id = self._keys.pop(article_id)
+        for keys in (self._by_date, self._by_category.get(category_id, [])):
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+        if not self._by_category.get(category_id):
+            self._by_category.pop(category_id, None)
+
+    def _add_counts(self, article_id, category_id, counts, sign=1):
+        totals = self._totals.setdefault(category_id, [0] * len(TOTAL_FIELDS))
+        for i, value in enumerate(counts):
+            totals[i] += sign * value
+        if sign > 0:
+            self._counted[article_id] = counts
+        else:
+            self._counted.pop(article_id, None)
+
+    def _remove_counts(self, article_id):
+        counts = self._counted.get(article_id)
+        if counts is not None:
+            self._add_counts(article_id, self._keys[article_id][1], counts, sign=-1)
+
+    def add(self, article):
+        """加入新文章"""
+        self._by_id[article['id']] = article
+        self.max_id = max(self.max_id, article['id'])
+        self._insert_key(article['id'], _sort_key(article), article['categoryId'])
+        self._add_counts(article['id'], article['categoryId'], _counts(article))
+
+    def update(self, article):
+        """文章字段修改后调用，日期或分类变化时调整文章在有序序列中的位置，计数变化时更新分类聚合"""
+        article_id = article['id']
+        self._by_id[article_id] = article
+        entry = (_sort_key(article), article['categoryId'])
+        counts = _counts(article)
+        if self._keys.get(article_id) == entry and self._counted.get(article_id) == counts:
+            return
+        if article_id in self._keys:
+            self._remove_counts(article_id)
+            if self._keys[article_id] != entry:
+                self._remove_key(article_id)
+        if article_id not in self._keys:
+            self._insert_key(article_id, *entry)
+        self._add_counts(article_id, article['categoryId'], counts)
+
+    def remove(self, article_id):
+        """移除文章，返回被移除的文章，不存在时返回None"""
+        article = self._by_id.pop(article_id, None)
+        if article is not None:
+            self._remove_counts(article_id)
+            self._remove_key(article_id)
+        return article
+
+    def list(self, category_id=None, before=None, limit=None):
+        """
+        按日期降序返回文章列表，可按分类过滤
+        before 为 (date, id)，只返回排在它之后（更早）的文章；limit 限制返回数量
+        """
+        keys = self._by_date if category_id is None else self._by_category.get(category_id, [])
+        end = len(keys) if before is None else bisect_left(keys, tuple(before))
+        start = 0 if limit is None else max(end - limit, 0)
+        keys = keys[start:end]
+        by_id = self._by_id
+        # 复制出的键与写线程的修改之间可能有先后差异，已删除的文章直接跳过
+        articles = (by_id.get(article_id) for _, article_id in reversed(keys))
+        return [article for article in articles if article is not None]
+
+    def count(self, category_id):
+        """分类下的文章数量"""
+        return len(self._by_category.get(category_id, ()))
+
+    def counts(self):
+        """各分类的文章数量"""
+        return {category_id: len(keys) for category_id, keys in list(self._by_category.items())}
+
+    def category_stats(self):
+        """
+        各分类的聚合数据，只包含有文章的分类
+        最新文章日期取分类有序序列的最后一项，整体为 O(分类数)
+        """
+        stats = {}
+        for category_id, keys in list(self._by_category.items()):
+            if not keys:
+                continue
+            totals = self._totals.get(category_id, [0] * len(TOTAL_FIELDS))
+            stats[category_id] = {
+                'article_count': len(keys),
+                **{f'total_{field}': value for field, value in zip(TOTAL_FIELDS, totals)},
+                'latest_date': keys[-1][0]
+            }
+        return stats
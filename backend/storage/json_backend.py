@@ -0,0 +1,191 @@
+"""
+JSON文件存储后端
+基于 backend.models.DataStore，数据保存在 blog.json 快照和变更日志中
+"""
+
+import bisect
+from backend.utils import generate_id
+from backend.models import entity_version, article_version
+from backend.storage.base import BlogRepository, NotFoundError, ConflictError, article_listing
+
+
+class JsonRepository(BlogRepository):
+    """
+    JSON文件仓储
+    读取直接使用存储对象缓存在内存中的数据和文章索引，修改通过写事务提交
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def _data(self):
+        return self.store.load()
+
+    def _index(self):
+        return self.store.load_index()
+
+    def _comments(self, article_id):
+        return self._data().get('comments', {}).get(str(article_id), [])
+
+    # 版本
+
+    def get_version(self):
+        data = self._data()
+        return data.get('version', 0), data.get('modified')
+
+    def get_entity_version(self, coll, entity_id):
+        if coll == 'articles':
+            article = self._index().get(entity_id)
+            return article_version(self._data(), article) if article is not None else None
+        if self.get_category(entity_id) is None:
+            return None
+        return entity_version(self._data(), coll, entity_id)
+
+    # 管理员
+
+    def get_admin(self):
+        return self._data().get('admin')
+
+    def create_admin(self, admin):
+        def create(txn):
+            if txn.data.get('admin'):
+                raise ConflictError('Administrator already exists')
+            return txn.set('admin', admin)
+        return self.store.write(create)
+
+    def update_admin(self, fields):
+        def update(txn):
+            admin = txn.data.get('admin')
+            if not admin:
+                raise NotFoundError('No administrator account exists')
+            return txn.set('admin', {**admin, **fields})
+        return self.store.write(update)
+
+    # 分类
+
+    def list_categories(self):
+        return self._data().get('categories', [])
+
+    def get_category(self, category_id):
+        return next((c for c in self.list_categories() if c['id'] == category_id), None)
+
+    def count_articles_by_category(self):
+        return self._index().counts()
+
+    def category_stats(self):
+        return self._index().category_stats()
+
+    def create_category(self, name, description=''):
+        def create(txn):
+            categories = txn.data.get('categories', [])
+            if any(c['name'] == name for c in categories):
+                raise ConflictError('Category already exists')
+            return txn.insert('categories', {
+                'id': generate_id(categories),
+                'name': name,
+                'description': description
+            })
+        return self.store.write(create)
+
+    def update_category(self, category_id, fields):
+        def update(txn):
+            if not txn.find('categories', category_id):
+                raise NotFoundError('Category not found')
+            name = fields.get('name')
+            if name is not None and any(c['name'] == name and c['id'] != category_id
+                                        for c in txn.data.get('categories', [])):
+                raise ConflictError('Category name already exists')
+            return txn.update('categories', category_id, fields)
+        return self.store.write(update)
+
+    def delete_category(self, category_id):
+        def delete(txn):
+            if txn.index.count(category_id):
+                raise ConflictError('Cannot delete category that has articles')
+            if not txn.delete('categories', category_id):
+                raise NotFoundError('Category not found')
+        self.store.write(delete)
+
+    # 文章
+
+    def list_articles(self, category_id=None, include_body=False, limit=None, before=None):
+        articles = self._index().list(category_id, before, limit)
+        if include_body:
+            return [{**a, 'comments': list(self._comments(a['id']))} for a in articles]
+        return [article_listing(a) for a in articles]
+
+    def list_articles_by_ids(self, article_ids):
+        index = self._index()
+        articles = (index.get(article_id) for article_id in article_ids)
+        return [article_listing(a) for a in articles if a is not None]
+
+    def get_article(self, article_id):
+        return self._index().get(article_id)
+
+    def create_article(self, fields):
+        def create(txn):
+            article = {'id': txn.index.next_id(), **fields, 'comments': []}
+            return txn.insert('articles', article)
+        return self.store.write(create)
+
+    def update_article(self, article_id, fields):
+        article = self.store.write(lambda txn: txn.update('articles', article_id, fields))
+        if article is None:
+            raise NotFoundError('Article not found')
+        return article
+
+    def delete_article(self, article_id):
+        if self.store.write(lambda txn: txn.delete('articles', article_id)) is None:
+            raise NotFoundError('Article not found')
+
+    def increment_article(self, article_id, field, amount=1):
+        value = self.store.write(lambda txn: txn.increment('articles', article_id, field, amount))
+        if value is None:
+            raise NotFoundError('Article not found')
+        return value
+
+    def increment_articles(self, increments):
+        def increment(txn):
+            for article_id, field, amount in increments:
+                txn.increment('articles', article_id, field, amount)
+        self.store.write(increment)
+
+    # 评论
+
+    def add_comment(self, article_id, fields):
+        def add(txn):
+            if not txn.find('articles', article_id):
+                raise NotFoundError('Article not found')
+            # 评论ID取自文章的评论序号，追加评论只写一条日志记录，不改写文章
+            seq = txn.data.get('comment_seq', {}).get(str(article_id), 0)
+            comment = {**fields, 'id': seq + 1}
+            return txn.insert('comments', comment, article_id=article_id)
+        return self.store.write(add)
+
+    def list_comments(self, article_id, limit=None, after=None):
+        comments = self._comments(article_id)
+        start = bisect.bisect_right(comments, after, key=lambda c: c['id']) if after is not None else 0
+        return comments[start:start + limit] if limit is not None else comments[start:]
+
+    def get_comment_seq(self, article_id):
+        if self._index().get(article_id) is None:
+            return None
+        return self._data().get('comment_seq', {}).get(str(article_id), 0)
+
+    def update_comment(self, article_id, comment_id, fields):
+        def update(txn):
+            if not txn.find('articles', article_id):
+                raise NotFoundError('Article not found')
+            comment = txn.update('comments', comment_id, fields, article_id=article_id)
+            if comment is None:
+                raise NotFoundError('Comment not found')
+            return comment
+        return self.store.write(update)
+
+    def delete_comment(self, article_id, comment_id):
+        def delete(txn):
+            if not txn.find('articles', article_id):
+                raise NotFoundError('Article not found')
+            if not txn.delete('comments', comment_id, article_id=article_id):
+                raise NotFoundError('Comment not found')
+        self.store.write(delete)
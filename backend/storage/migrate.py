@@ -0,0 +1,98 @@
+"""
+blog.json 导入工具
+把JSON数据文件（连同尚未合并的变更日志）一次性导入SQLite数据库或分片存储目录
+
+用法：
+    python -m backend.storage.migrate
+    python -m backend.storage.migrate --source data/blog.json --target data/blog.db --force
+    python -m backend.storage.migrate --to sharded --target data/sharded
+"""
+
+import os
+import sys
+import argparse
+
+# 将项目根目录添加到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.config import Config
+from backend.storage.base import ConflictError
+
+
+def read_json_data(source, journal_file=None):
+    """
+    读取JSON数据文件，并重放变更日志中尚未合并进快照的记录
+    返回评论内嵌在文章中的 blog.json 交换格式
+    """
+    from flask import Flask
+    from backend.models import DataStore, embed_comments
+
+    if not os.path.exists(source):
+        raise FileNotFoundError(source)
+    # DataStore 记录日志需要应用上下文，这里使用一个最小的应用
+    app = Flask(__name__)
+    with app.app_context():
+        # 阈值设为无穷大，导入过程中不触发日志合并
+        store = DataStore(source, journal_file=journal_file, compact_bytes=float('inf'))
+        return embed_comments(store.load())
+
+
+def create_target(backend, target):
+    """创建导入目标的仓储对象，目标为空时不写入默认数据"""
+    if backend == 'sqlite':
+        from backend.storage.sqlite_backend import SqliteRepository
+        return SqliteRepository(target, seed_defaults=False)
+    if backend == 'sharded':
+        from backend.storage.sharded_backend import ShardedRepository
+        return ShardedRepository(target, seed_defaults=False)
+    raise ValueError(f'Unknown storage backend: {backend}')
+
+
+def migrate(source, target, journal_file=None, replace=False, backend='sqlite'):
+    """
+    把 source 指向的 blog.json 导入 target 指向的SQLite数据库或分片存储目录
+
+    Returns:
+        dict: 导入的分类、文章和评论数量
+    """
+    data = read_json_data(source, journal_file)
+    create_target(backend, target).import_data(data, replace=replace)
+    return {
+        'categories': len(data.get('categories', [])),
+        'articles': len(data.get('articles', [])),
+        'comments': sum(len(a.get('comments', [])) for a in data.get('articles', []))
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import blog.json into a SQLite database or a sharded data directory')
+    parser.add_argument('--source', default=Config.DATA_FILE, help='JSON data file to import')
+    parser.add_argument('--journal', default=Config.DATA_JOURNAL_FILE,
+                        help='change journal to replay on top of the JSON data file')
+    parser.add_argument('--to', choices=('sqlite', 'sharded'), default='sqlite', help='target storage backend')
+    parser.add_argument('--target', help='SQLite database or sharded data directory to create '
+                                         '(defaults to SQLITE_DATABASE / SHARDED_DATA_DIR)')
+    parser.add_argument('--force', action='store_true', help='replace existing data in the target')
+    args = parser.parse_args(argv)
+    if args.target is None:
+        args.target = Config.SQLITE_DATABASE if args.to == 'sqlite' else Config.SHARDED_DATA_DIR
+
+    try:
+        counts = migrate(args.source, args.target, journal_file=args.journal, replace=args.force,
+                         backend=args.to)
+    except FileNotFoundError as e:
+        print(f'Data file not found: {e}', file=sys.stderr)
+        return 1
+    except ConflictError:
+        print(f'{args.target} already contains data, use --force to replace it', file=sys.stderr)
+        return 1
+
+    print(f"Imported {counts['categories']} categories, {counts['articles']} articles "
+          f"and {counts['comments']} comments into {args.target}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,671 @@
+"""
+分片JSON文件存储后端
+文章元数据集中保存在索引文件中，每篇文章的正文和评论分别保存为单独的文件：
+
+    <目录>/index.json            管理员、分类、文章元数据（含摘要和评论数）、文章序号和评论序号
+    <目录>/index.journal         索引的变更日志，每行一条
+    <目录>/articles/<id>.json    文章正文
+    <目录>/comments/<id>.jsonl   文章的评论，每行一条
+
+文章列表和分类页只读取索引文件，正文文件在打开单篇文章时才按需加载；
+添加评论只在评论文件末尾追加一行，不改写正文文件。
+评论的增删改和阅读量、点赞数的合并只修改个别文章的计数字段，这些修改连同新的版本号追加到变更日志中，
+不改写整个索引文件；读取时在索引文件之上重放变更日志，其他写操作改写索引文件时顺带合并变更日志，
+变更日志超过 journal_compact_bytes 且超过索引文件大小时也会合并
+旧版本的正文文件中包含评论，第一次修改该文章或其评论时拆分为单独的评论文件
+"""
+
+import os
+import json
+import bisect
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from backend.models import get_default_data, exclusive_file_lock, atomic_write, entity_version, article_version
+from backend.utils import generate_id, truncate_text, markdown_to_text
+from backend.storage.base import BlogRepository, StorageError, NotFoundError, ConflictError, ARTICLE_BODY_FIELDS
+from backend.storage.indexes import ArticleIndex
+
+def _dump(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _read_comments(path):
+    """读取评论文件，跳过末尾没有写完的行"""
+    comments = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                comments.append(json.loads(line))
+            except ValueError:
+                continue
+    return comments
+
+
+def _split_article(article):
+    """
+    把完整文章拆分为索引中的元数据和正文文件内容
+    返回 (元数据, 正文, 评论)，文章不包含评论列表（不是导入的数据）时评论为None
+    """
+    meta = {k: v for k, v in article.items() if k not in ARTICLE_BODY_FIELDS}
+    body = {'content': article.get('content', '')}
+    if 'summary' not in meta:
+        # 尚未回填派生字段的旧数据
+        meta['summary'] = truncate_text(markdown_to_text(body['content']))
+    comments = article.get('comments')
+    if comments is not None:
+        comments = sorted(comments, key=lambda c: c['id'])
+        meta['comment_count'] = len(comments)
+    else:
+        meta.setdefault('comment_count', 0)
+    return meta, body, comments
+
+
+def _cache_put(cache, key, value, max_size):
+    """写入LRU缓存，超出上限时淘汰最久未使用的项"""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+class ShardedRepository(BlogRepository):
+    """
+    分片JSON文件仓储
+    索引文件常驻内存，通过文件状态判断是否被其他进程修改过，
+    文章元数据另外维护一份增量更新的 ArticleIndex；
+    正文文件和评论文件使用有上限的LRU缓存。写操作在跨进程文件锁内完成，
+    新建和修改时先写正文和评论再写索引，删除时先写索引再删正文和评论，
+    中途崩溃最多留下没有被索引引用的文件，或者评论数尚未更新的评论
+
+    变更日志中的每条记录带有写入时分配的全局版本号，字段保存修改后的值而不是增量；
+    版本号不大于索引文件版本的记录已经包含在索引文件中，重放时跳过，
+    因此合并时先写索引文件再删除变更日志，中途崩溃不会重复应用修改
+    """
+
+    def __init__(self, directory, body_cache_size=256, fsync=True, seed_defaults=True,
+                 journal_compact_bytes=256 * 1024):
+        self.directory = directory
+        self.index_file = os.path.join(directory, 'index.json')
+        self.journal_file = os.path.join(directory, 'index.journal')
+        self.articles_dir = os.path.join(directory, 'articles')
+        self.comments_dir = os.path.join(directory, 'comments')
+        self.lock_file = os.path.join(directory, 'index.lock')
+        self.body_cache_size = body_cache_size
+        self.fsync = fsync
+        self.seed_defaults = seed_defaults
+        self.journal_compact_bytes = journal_compact_bytes
+        self._lock = threading.RLock()
+        self._index = None
+        self._index_signature = None
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._articles = ArticleIndex()
+        self._bodies = OrderedDict()
+        self._comments = OrderedDict()
+        self._stamp = None
+
+    def _body_file(self, article_id):
+        return os.path.join(self.articles_dir, f'{article_id}.json')
+
+    def _comments_file(self, article_id):
+        return os.path.join(self.comments_dir, f'{article_id}.jsonl')
+
+    # 索引
+
+    def _load_index(self):
+        """
+        获取索引数据，索引文件和变更日志都未变化时直接返回内存中的副本
+        索引文件未变化时只重放变更日志中新追加的记录
+        """
+        signature = _stat_signature(self.index_file)
+        if signature is not None and signature == self._index_signature and \
+                self._journal_stat() == self._journal_position():
+            return self._index
+        with self._lock:
+            signature = _stat_signature(self.index_file)
+            if signature is None:
+                if not self.seed_defaults:
+                    return {'version': 0, 'admin': None, 'categories': [], 'articles': []}
+                # 首次启动时写入默认数据，与JSON后端的行为一致
+                with exclusive_file_lock(self.lock_file):
+                    if _stat_signature(self.index_file) is None:
+                        self._import(get_default_data())
+                return self._load_index()
+            if signature != self._index_signature or not self._journal_continues():
+                with open(self.index_file, 'rb') as f:
+                    index = json.loads(f.read())
+                self._articles.rebuild(index['articles'])
+                self._index = index
+                self._index_signature = signature
+                self._journal_inode = None
+                self._journal_offset = 0
+            self._replay_journal(self._index)
+            return self._index
+
+    def _load_articles(self):
+        """获取与当前索引文件一致的文章索引"""
+        with self._lock:
+            self._load_index()
+            return self._articles
+
+    def _save_index(self, index, rebuild=False):
+        """写回索引文件，变更日志中的修改已经包含在索引数据中，随后删除变更日志"""
+        atomic_write(self.index_file, _dump(index), self.fsync)
+        if rebuild:
+            self._articles.rebuild(index['articles'])
+        self._index = index
+        self._index_signature = _stat_signature(self.index_file)
+        try:
+            os.remove(self.journal_file)
+        except FileNotFoundError:
+            pass
+        self._journal_inode = None
+        self._journal_offset = 0
+
+    @contextmanager
+    def _write(self):
+        """
+        写事务
+        在文件锁内刷新其他进程的修改，调用方原地修改索引数据并同步更新文章索引，
+        正常结束后写回索引文件。业务错误（StorageError）总是在修改数据之前抛出，
+        其他错误发生时内存中的数据可能已被改动，丢弃后由下次读取重新加载
+        索引中的版本记录与JSON后端的格式相同（见 backend.models.stamp_versions）
+        """
+        with self._lock, exclusive_file_lock(self.lock_file):
+            index = self._load_index()
+            self._stamp = [index.get('version', 0) + 1, round(time.time(), 3)]
+            try:
+                yield index
+                index['version'], index['modified'] = self._stamp
+                self._save_index(index)
+            except StorageError:
+                raise
+            except BaseException:
+                self._index = None
+                self._index_signature = None
+                raise
+
+    @contextmanager
+    def _journal_write(self):
+        """
+        只修改个别文章计数字段的写事务，不改写索引文件
+        调用方通过 _journal_article 把修改记录在日志记录中，正常结束后追加到变更日志并应用到内存中的索引；
+        变更日志超过 journal_compact_bytes 且超过索引文件大小时合并到索引文件，改写的开销分摊到多次修改上
+        """
+        with self._lock, exclusive_file_lock(self.lock_file):
+            index = self._load_index()
+            self._stamp = [index.get('version', 0) + 1, round(time.time(), 3)]
+            entry = {'v': list(self._stamp), 'articles': {}, 'comment_seq': {}}
+            try:
+                yield entry
+                self._append_journal(entry)
+                self._apply_entry(index, entry)
+                if self._journal_offset >= max(self.journal_compact_bytes, self._index_signature[1]):
+                    self._save_index(index)
+            except StorageError:
+                raise
+            except BaseException:
+                self._index = None
+                self._index_signature = None
+                raise
+
+    def _journal_article(self, entry, meta, **fields):
+        """在日志记录中记录文章字段修改后的值（没有字段时只更新文章的版本），返回记录中该文章的修改"""
+        changes = entry['articles'].setdefault(str(meta['id']), {})
+        changes.update(fields)
+        return changes
+
+    def _apply_entry(self, index, entry):
+        """把一条变更日志记录应用到索引数据和文章索引上，索引文件中已经包含的记录直接跳过"""
+        if entry['v'][0] <= index.get('version', 0):
+            return
+        versions = index.setdefault('versions', {}).setdefault('articles', {})
+        for key, fields in entry.get('articles', {}).items():
+            meta = self._articles.get(int(key))
+            if meta is not None:
+                meta.update(fields)
+                self._articles.update(meta)
+                versions[key] = list(entry['v'])
+        for key, seq in entry.get('comment_seq', {}).items():
+            if self._articles.get(int(key)) is not None:
+                index.setdefault('comment_seq', {})[key] = seq
+        index['version'], index['modified'] = entry['v']
+
+    def _journal_stat(self):
+        try:
+            st = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size)
+
+    def _journal_position(self):
+        """已经重放到的变更日志位置，与 _journal_stat 的结果相同时说明没有新的记录"""
+        return (self._journal_inode, self._journal_offset) if self._journal_inode is not None else None
+
+    def _journal_continues(self):
+        """当前的变更日志是否是已经重放过的那一份（或者之前还没有变更日志），只需要接着读取新的记录"""
+        current = self._journal_stat()
+        if current is None:
+            return self._journal_inode is None
+        if self._journal_inode is None:
+            return self._journal_offset == 0
+        return current[0] == self._journal_inode and current[1] >= self._journal_offset
+
+    def _replay_journal(self, index):
+        """重放变更日志中尚未读取的完整记录，末尾没有写完的行留到写完后再读"""
+        try:
+            f = open(self.journal_file, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            self._journal_inode = os.fstat(f.fileno()).st_ino
+            f.seek(self._journal_offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self._apply_entry(index, entry)
+        self._journal_offset += end
+
+    def _append_journal(self, entry):
+        """在变更日志末尾追加一条记录，调用方需持有文件锁并已重放全部记录"""
+        with open(self.journal_file, 'ab') as f:
+            # 上次追加中途崩溃留下的半行不能与新的记录连在一起
+            prefix = b'\n' if f.tell() > self._journal_offset else b''
+            f.write(prefix + _dump(entry) + b'\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self._journal_inode = os.fstat(f.fileno()).st_ino
+            self._journal_offset = f.tell()
+
+    def _touch(self, index, coll, entity_id, deleted=False):
+        """在写事务中记录对象的新版本，对象被删除时去掉其版本记录"""
+        entries = index.setdefault('versions', {}).setdefault(coll, {})
+        if deleted:
+            entries.pop(str(entity_id), None)
+        else:
+            entries[str(entity_id)] = list(self._stamp)
+
+    # 正文
+
+    def _load_body(self, article_id):
+        """读取文章正文，缓存的内容在文件被替换后失效"""
+        path = self._body_file(article_id)
+        signature = _stat_signature(path)
+        if signature is None:
+            return {'content': ''}
+        with self._lock:
+            cached = self._bodies.get(article_id)
+            if cached is not None and cached[0] == signature:
+                self._bodies.move_to_end(article_id)
+                return cached[1]
+            with open(path, 'rb') as f:
+                body = json.loads(f.read())
+            self._cache_body(article_id, signature, body)
+            return body
+
+    def _cache_body(self, article_id, signature, body):
+        _cache_put(self._bodies, article_id, (signature, body), self.body_cache_size)
+
+    def _save_body(self, article_id, body):
+        path = self._body_file(article_id)
+        atomic_write(path, _dump(body), self.fsync)
+        with self._lock:
+            self._cache_body(article_id, _stat_signature(path), body)
+
+    def _remove_body(self, article_id):
+        with self._lock:
+            self._bodies.pop(article_id, None)
+            self._comments.pop(article_id, None)
+        for path in (self._body_file(article_id), self._comments_file(article_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _full_article(self, meta, body):
+        return {**meta, 'content': body['content']}
+
+    # 评论
+
+    def _load_comments(self, article_id):
+        """读取文章的全部评论（按ID升序），缓存的内容在文件变化后失效"""
+        path = self._comments_file(article_id)
+        signature = _stat_signature(path)
+        if signature is None:
+            # 没有评论，或者评论仍保存在旧版本的正文文件中
+            return self._load_body(article_id).get('comments', [])
+        with self._lock:
+            cached = self._comments.get(article_id)
+            if cached is not None and cached[0] == signature:
+                self._comments.move_to_end(article_id)
+                return cached[1]
+            comments = _read_comments(path)
+            _cache_put(self._comments, article_id, (signature, comments), self.body_cache_size)
+            return comments
+
+    def _save_comments(self, article_id, comments):
+        """整体改写评论文件，用于修改和删除评论"""
+        path = self._comments_file(article_id)
+        payload = b''.join(_dump(comment) + b'\n' for comment in comments)
+        atomic_write(path, payload, self.fsync)
+        with self._lock:
+            _cache_put(self._comments, article_id, (_stat_signature(path), comments), self.body_cache_size)
+
+    def _append_comment(self, article_id, comment):
+        """在评论文件末尾追加一条评论，缓存的评论列表与文件一致时同步追加"""
+        path = self._comments_file(article_id)
+        before = _stat_signature(path)
+        os.makedirs(self.comments_dir, exist_ok=True)
+        with open(path, 'ab') as f:
+            # 上次追加中途崩溃留下的半行不能与新的评论连在一起
+            prefix = b''
+            if f.tell() > 0:
+                with open(path, 'rb') as r:
+                    r.seek(-1, os.SEEK_END)
+                    if r.read(1) != b'\n':
+                        prefix = b'\n'
+            f.write(prefix + _dump(comment) + b'\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        with self._lock:
+            cached = self._comments.pop(article_id, None)
+            if cached is not None and cached[0] == before:
+                _cache_put(self._comments, article_id, (_stat_signature(path), cached[1] + [comment]),
+                           self.body_cache_size)
+
+    def _split_legacy_comments(self, article_id):
+        """旧版本的正文文件中包含评论，修改前拆分为单独的评论文件"""
+        body = self._load_body(article_id)
+        if 'comments' not in body:
+            return
+        self._save_comments(article_id, sorted(body['comments'], key=lambda c: c['id']))
+        self._save_body(article_id, {'content': body['content']})
+
+    def _comment_seq(self, index, article_id):
+        """
+        文章已分配过的最大评论ID，记录在索引的 comment_seq 中，删除评论后ID不会被重复使用
+        旧数据没有序号记录时以现有评论的最大ID为准，由调用方记录到变更日志中
+        """
+        seq = index.get('comment_seq', {}).get(str(article_id))
+        if seq is None:
+            seq = max((c['id'] for c in self._load_comments(article_id)), default=0)
+        return seq
+
+    # 版本
+
+    def get_version(self):
+        index = self._load_index()
+        return index.get('version', 0), index.get('modified')
+
+    def get_entity_version(self, coll, entity_id):
+        if coll == 'articles':
+            article = self._load_articles().get(entity_id)
+            return article_version(self._load_index(), article) if article is not None else None
+        if self.get_category(entity_id) is None:
+            return None
+        return entity_version(self._load_index(), coll, entity_id)
+
+    # 管理员
+
+    def get_admin(self):
+        return self._load_index().get('admin')
+
+    def create_admin(self, admin):
+        with self._write() as index:
+            if index.get('admin'):
+                raise ConflictError('Administrator already exists')
+            index['admin'] = admin
+        return admin
+
+    def update_admin(self, fields):
+        with self._write() as index:
+            if not index.get('admin'):
+                raise NotFoundError('No administrator account exists')
+            index['admin'] = {**index['admin'], **fields}
+        return index['admin']
+
+    # 分类
+
+    def list_categories(self):
+        return self._load_index().get('categories', [])
+
+    def get_category(self, category_id):
+        return next((c for c in self.list_categories() if c['id'] == category_id), None)
+
+    def count_articles_by_category(self):
+        return self._load_articles().counts()
+
+    def category_stats(self):
+        return self._load_articles().category_stats()
+
+    def create_category(self, name, description=''):
+        with self._write() as index:
+            categories = index.setdefault('categories', [])
+            if any(c['name'] == name for c in categories):
+                raise ConflictError('Category already exists')
+            category = {'id': generate_id(categories), 'name': name, 'description': description}
+            categories.append(category)
+            self._touch(index, 'categories', category['id'])
+        return category
+
+    def update_category(self, category_id, fields):
+        with self._write() as index:
+            category = next((c for c in index.get('categories', []) if c['id'] == category_id), None)
+            if not category:
+                raise NotFoundError('Category not found')
+            name = fields.get('name')
+            if name is not None and any(c['name'] == name and c['id'] != category_id
+                                        for c in index['categories']):
+                raise ConflictError('Category name already exists')
+            category.update(fields)
+            self._touch(index, 'categories', category_id)
+        return category
+
+    def delete_category(self, category_id):
+        with self._write() as index:
+            if self._articles.count(category_id):
+                raise ConflictError('Cannot delete category that has articles')
+            categories = index.get('categories', [])
+            if not any(c['id'] == category_id for c in categories):
+                raise NotFoundError('Category not found')
+            index['categories'] = [c for c in categories if c['id'] != category_id]
+            self._touch(index, 'categories', category_id, deleted=True)
+
+    # 文章
+
+    def list_articles(self, category_id=None, include_body=False, limit=None, before=None):
+        articles = self._load_articles().list(category_id, before, limit)
+        if include_body:
+            return [{**self._full_article(a, self._load_body(a['id'])),
+                     'comments': list(self._load_comments(a['id']))} for a in articles]
+        return articles
+
+    def list_articles_by_ids(self, article_ids):
+        index = self._load_articles()
+        articles = (index.get(article_id) for article_id in article_ids)
+        return [a for a in articles if a is not None]
+
+    def get_article(self, article_id):
+        meta = self._load_articles().get(article_id)
+        if meta is None:
+            return None
+        return self._full_article(meta, self._load_body(article_id))
+
+    def create_article(self, fields):
+        with self._write() as index:
+            # 索引文件记录已分配过的最大文章ID（article_seq），删除最新的文章后ID也不会被重复使用
+            article_id = max(index.get('article_seq', 0), self._articles.max_id) + 1
+            index['article_seq'] = article_id
+            article = {'id': article_id, **fields, 'comment_count': 0}
+            meta, body, _ = _split_article(article)
+            self._save_body(article['id'], body)
+            index['articles'].append(meta)
+            self._articles.add(meta)
+            self._touch(index, 'articles', meta['id'])
+        return self._full_article(meta, body)
+
+    def update_article(self, article_id, fields):
+        with self._write() as index:
+            meta = self._articles.get(article_id)
+            if meta is None:
+                raise NotFoundError('Article not found')
+            self._split_legacy_comments(article_id)
+            body = self._load_body(article_id)
+            article = {**self._full_article(meta, body), **fields}
+            new_meta, new_body, _ = _split_article(article)
+            if new_body != body:
+                self._save_body(article_id, new_body)
+            meta.update(new_meta)
+            self._articles.update(meta)
+            self._touch(index, 'articles', article_id)
+        return article
+
+    def delete_article(self, article_id):
+        with self._write() as index:
+            meta = self._articles.remove(article_id)
+            if meta is None:
+                raise NotFoundError('Article not found')
+            index['articles'].remove(meta)
+            index.get('comment_seq', {}).pop(str(article_id), None)
+            self._touch(index, 'articles', article_id, deleted=True)
+        self._remove_body(article_id)
+
+    def _increment(self, entry, meta, field, amount):
+        """在日志记录中累加文章的计数字段，同一条记录中多次累加同一字段时以记录中的值为准"""
+        changes = self._journal_article(entry, meta)
+        changes[field] = changes.get(field, meta.get(field, 0)) + amount
+        return changes[field]
+
+    def increment_article(self, article_id, field, amount=1):
+        with self._journal_write() as entry:
+            meta = self._articles.get(article_id)
+            if meta is None:
+                raise NotFoundError('Article not found')
+            value = self._increment(entry, meta, field, amount)
+        return value
+
+    def increment_articles(self, increments):
+        with self._journal_write() as entry:
+            for article_id, field, amount in increments:
+                meta = self._articles.get(article_id)
+                if meta is not None:
+                    self._increment(entry, meta, field, amount)
+
+    # 评论
+
+    def add_comment(self, article_id, fields):
+        with self._journal_write() as entry:
+            meta = self._articles.get(article_id)
+            if meta is None:
+                raise NotFoundError('Article not found')
+            self._split_legacy_comments(article_id)
+            comment = {**fields, 'id': self._comment_seq(self._index, article_id) + 1}
+            self._append_comment(article_id, comment)
+            entry['comment_seq'][str(article_id)] = comment['id']
+            self._journal_article(entry, meta, comment_count=meta.get('comment_count', 0) + 1)
+        return comment
+
+    def list_comments(self, article_id, limit=None, after=None):
+        if self._load_articles().get(article_id) is None:
+            return []
+        comments = self._load_comments(article_id)
+        start = bisect.bisect_right(comments, after, key=lambda c: c['id']) if after is not None else 0
+        return comments[start:start + limit] if limit is not None else comments[start:]
+
+    def get_comment_seq(self, article_id):
+        if self._load_articles().get(article_id) is None:
+            return None
+        seq = self._load_index().get('comment_seq', {}).get(str(article_id))
+        if seq is None:
+            seq = max((c['id'] for c in self._load_comments(article_id)), default=0)
+        return seq
+
+    def update_comment(self, article_id, comment_id, fields):
+        with self._journal_write() as entry:
+            meta = self._articles.get(article_id)
+            if meta is None:
+                raise NotFoundError('Article not found')
+            self._split_legacy_comments(article_id)
+            comments = self._load_comments(article_id)
+            comment = next((c for c in comments if c['id'] == comment_id), None)
+            if comment is None:
+                raise NotFoundError('Comment not found')
+            comment = {**comment, **fields}
+            self._save_comments(article_id, [comment if c['id'] == comment_id else c for c in comments])
+            self._journal_article(entry, meta)
+        return comment
+
+    def delete_comment(self, article_id, comment_id):
+        with self._journal_write() as entry:
+            meta = self._articles.get(article_id)
+            if meta is None:
+                raise NotFoundError('Article not found')
+            self._split_legacy_comments(article_id)
+            comments = self._load_comments(article_id)
+            remaining = [c for c in comments if c['id'] != comment_id]
+            if len(remaining) == len(comments):
+                raise NotFoundError('Comment not found')
+            # 删除前记录序号，被删除的评论ID不会再次分配
+            entry['comment_seq'][str(article_id)] = self._comment_seq(self._index, article_id)
+            self._save_comments(article_id, remaining)
+            self._journal_article(entry, meta, comment_count=len(remaining))
+
+    # 导入
+
+    def _import(self, data):
+        """把 blog.json 格式的完整数据写成索引和正文文件，调用方需持有文件锁"""
+        index = {
+            'version': data.get('version', 0),
+            'modified': data.get('modified'),
+            'admin': data.get('admin'),
+            'categories': [
+                {k: v for k, v in c.items() if k != 'article_count'}
+                for c in data.get('categories', [])
+            ],
+            'articles': [],
+            'article_seq': max((article['id'] for article in data.get('articles', [])), default=0),
+            'comment_seq': {}
+        }
+        seqs = data.get('comment_seq', {})
+        for article in data.get('articles', []):
+            meta, body, comments = _split_article(article)
+            self._save_body(article['id'], body)
+            if comments:
+                self._save_comments(article['id'], comments)
+            # 最新的评论已被删除时以导入数据中记录的序号为准，评论ID不会被重复使用
+            seq = max(comments[-1]['id'] if comments else 0, seqs.get(str(article['id']), 0))
+            if seq:
+                index['comment_seq'][str(article['id'])] = seq
+            index['articles'].append(meta)
+        self._save_index(index, rebuild=True)
+
+    def import_data(self, data, replace=False):
+        """
+        导入 blog.json 格式的完整数据
+        目录中已有数据时需要 replace=True 才会清空后重新导入，否则抛出 ConflictError
+        """
+        with self._lock, exclusive_file_lock(self.lock_file):
+            if _stat_signature(self.index_file) is not None:
+                if not replace:
+                    raise ConflictError('Data directory already contains data')
+                for article in self._load_index()['articles']:
+                    self._remove_body(article['id'])
+            self._import(data)
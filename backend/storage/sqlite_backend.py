@@ -0,0 +1,635 @@
+"""
+SQLite存储后端
+使用标准库 sqlite3 并开启WAL模式：读操作不会被写操作阻塞，
+单行查询和更新取代整份数据的加载与保存
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from backend.models import get_default_data
+from backend.utils import truncate_text, markdown_to_text
+from backend.storage.base import BlogRepository, NotFoundError, ConflictError
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    extra TEXT
+);
+
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    category_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    likes INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_articles_category_date ON articles (category_id, date);
+CREATE INDEX IF NOT EXISTS idx_articles_date ON articles (date);
+
+CREATE TABLE IF NOT EXISTS comments (
+    article_id INTEGER NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+    id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    date TEXT NOT NULL,
+    extra TEXT,
+    PRIMARY KEY (article_id, id)
+);
+
+-- 各分类的聚合数据，由触发器随文章的增删改增量维护
+CREATE TABLE IF NOT EXISTS category_stats (
+    category_id INTEGER PRIMARY KEY,
+    article_count INTEGER NOT NULL DEFAULT 0,
+    total_views INTEGER NOT NULL DEFAULT 0,
+    total_likes INTEGER NOT NULL DEFAULT 0,
+    latest_date TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS category_stats_insert AFTER INSERT ON articles BEGIN
+    INSERT OR IGNORE INTO category_stats (category_id) VALUES (NEW.category_id);
+    UPDATE category_stats SET
+        article_count = article_count + 1,
+        total_views = total_views + NEW.views,
+        total_likes = total_likes + NEW.likes,
+        latest_date = CASE WHEN latest_date IS NULL OR NEW.date > latest_date THEN NEW.date ELSE latest_date END
+    WHERE category_id = NEW.category_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS category_stats_delete AFTER DELETE ON articles BEGIN
+    UPDATE category_stats SET
+        article_count = article_count - 1,
+        total_views = total_views - OLD.views,
+        total_likes = total_likes - OLD.likes,
+        latest_date = (SELECT MAX(date) FROM articles WHERE category_id = OLD.category_id)
+    WHERE category_id = OLD.category_id;
+END;
+
+-- 最新日期通过 (category_id, date) 索引重新查询，只读取一行
+CREATE TRIGGER IF NOT EXISTS category_stats_update AFTER UPDATE OF category_id, date, views, likes ON articles BEGIN
+    UPDATE category_stats SET
+        article_count = article_count - 1,
+        total_views = total_views - OLD.views,
+        total_likes = total_likes - OLD.likes
+    WHERE category_id = OLD.category_id;
+    INSERT OR IGNORE INTO category_stats (category_id) VALUES (NEW.category_id);
+    UPDATE category_stats SET
+        article_count = article_count + 1,
+        total_views = total_views + NEW.views,
+        total_likes = total_likes + NEW.likes
+    WHERE category_id = NEW.category_id;
+    UPDATE category_stats SET
+        latest_date = (SELECT MAX(date) FROM articles WHERE articles.category_id = category_stats.category_id)
+    WHERE category_id IN (OLD.category_id, NEW.category_id);
+END;
+
+-- 每篇文章的评论数和评论序号（已分配过的最大评论ID），由触发器随评论的增删增量维护；
+-- 删除评论时序号不变，评论ID不会被重复使用
+CREATE TABLE IF NOT EXISTS comment_counters (
+    article_id INTEGER PRIMARY KEY REFERENCES articles (id) ON DELETE CASCADE,
+    count INTEGER NOT NULL DEFAULT 0,
+    seq INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS comment_counters_insert AFTER INSERT ON comments BEGIN
+    INSERT OR IGNORE INTO comment_counters (article_id) VALUES (NEW.article_id);
+    UPDATE comment_counters SET count = count + 1, seq = MAX(seq, NEW.id)
+    WHERE article_id = NEW.article_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS comment_counters_delete AFTER DELETE ON comments BEGIN
+    UPDATE comment_counters SET count = count - 1 WHERE article_id = OLD.article_id;
+END;
+
+CREATE TABLE IF NOT EXISTS versions (
+    coll TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    modified REAL,
+    PRIMARY KEY (coll, id)
+);
+'''
+
+# 对象字段与数据表列的对应关系，其余字段以JSON形式保存在 extra 列中
+CATEGORY_COLUMNS = {'id': 'id', 'name': 'name', 'description': 'description'}
+ARTICLE_COLUMNS = {
+    'id': 'id',
+    'title': 'title',
+    'content': 'content',
+    'categoryId': 'category_id',
+    'date': 'date',
+    'views': 'views',
+    'likes': 'likes'
+}
+COMMENT_COLUMNS = {'id': 'id', 'content': 'content', 'date': 'date'}
+
+# 可以做增量更新的文章计数字段
+COUNTER_FIELDS = ('views', 'likes')
+
+# 导入时丢弃的派生字段，这些字段由数据表和触发器维护
+DERIVED_FIELDS = ('article_count', 'comments', 'comment_count')
+
+# 尚未回填摘要的旧数据只读取正文开头用于生成摘要，
+# 去掉markdown标记后文字会变少，因此读取摘要长度数倍的内容
+SUMMARY_LENGTH = 100
+SUMMARY_SOURCE_LENGTH = SUMMARY_LENGTH * 4
+COMMENT_COUNT_COLUMN = ('COALESCE((SELECT count FROM comment_counters '
+                        'WHERE comment_counters.article_id = articles.id), 0) AS comment_count')
+LISTING_QUERY = f'''
+SELECT id, title, category_id, date, views, likes, extra,
+       substr(content, 1, {SUMMARY_SOURCE_LENGTH}) AS content_head,
+       {COMMENT_COUNT_COLUMN}
+FROM articles
+'''
+ARTICLE_QUERY = f'SELECT *, {COMMENT_COUNT_COLUMN} FROM articles'
+
+
+def _from_row(row, columns):
+    """把数据表的一行转换为接口使用的字典"""
+    item = {field: row[column] for field, column in columns.items()}
+    if row['extra']:
+        item.update(json.loads(row['extra']))
+    return item
+
+
+def _article_from_row(row):
+    """把文章查询（ARTICLE_QUERY）的一行转换为完整文章，附带评论数"""
+    article = _from_row(row, ARTICLE_COLUMNS)
+    article['comment_count'] = row['comment_count']
+    return article
+
+
+def _listing_from_row(row):
+    """把列表查询的一行转换为文章列表视图"""
+    columns = {k: v for k, v in ARTICLE_COLUMNS.items() if k != 'content'}
+    listing = _from_row(row, columns)
+    if 'summary' not in listing:
+        listing['summary'] = truncate_text(markdown_to_text(row['content_head']), SUMMARY_LENGTH)
+    listing['comment_count'] = row['comment_count']
+    return listing
+
+
+def _split_fields(fields, columns):
+    """把对象字段拆分为数据表列和额外字段"""
+    values = {columns[k]: v for k, v in fields.items() if k in columns}
+    extra = {k: v for k, v in fields.items() if k not in columns and k not in DERIVED_FIELDS}
+    return values, extra
+
+
+def _dump_extra(extra):
+    return json.dumps(extra, ensure_ascii=False) if extra else None
+
+
+class SqliteRepository(BlogRepository):
+    """
+    SQLite仓储
+    每个线程使用独立的数据库连接；写操作使用 BEGIN IMMEDIATE 事务，
+    多个进程同时写入时由SQLite的文件锁串行化
+    """
+
+    def __init__(self, database, timeout=5.0, seed_defaults=True):
+        self.database = database
+        self.timeout = timeout
+        self.seed_defaults = seed_defaults
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def after_fork(self):
+        """在 fork 出的工作进程中调用，丢弃从主进程继承的连接，SQLite 连接不能跨进程使用"""
+        self._local = threading.local()
+
+    def _connect(self):
+        """获取当前线程的数据库连接，首次连接时创建表结构"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.database)), exist_ok=True)
+            conn = sqlite3.connect(self.database, timeout=self.timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn.executescript(SCHEMA)
+            self._build_aggregates(conn)
+            if self.seed_defaults and not self._is_initialized(conn):
+                # 空数据库写入默认数据，与JSON后端首次启动时的行为一致；
+                # 已初始化时不开启写事务，避免每次启动都递增版本
+                with self._write() as conn:
+                    if not self._is_initialized(conn):
+                        self._insert_data(conn, get_default_data())
+            self._schema_ready = True
+
+    def _build_aggregates(self, conn):
+        """
+        升级前创建的数据库没有分类聚合数据和评论计数，根据现有数据生成一次，之后由触发器维护
+        """
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if (not conn.execute('SELECT 1 FROM category_stats LIMIT 1').fetchone()
+                    and conn.execute('SELECT 1 FROM articles LIMIT 1').fetchone()):
+                conn.execute(
+                    'INSERT INTO category_stats (category_id, article_count, total_views, total_likes, latest_date) '
+                    'SELECT category_id, COUNT(*), SUM(views), SUM(likes), MAX(date) FROM articles '
+                    'GROUP BY category_id')
+            if (not conn.execute('SELECT 1 FROM comment_counters LIMIT 1').fetchone()
+                    and conn.execute('SELECT 1 FROM comments LIMIT 1').fetchone()):
+                conn.execute(
+                    'INSERT INTO comment_counters (article_id, count, seq) '
+                    'SELECT article_id, COUNT(*), MAX(id) FROM comments GROUP BY article_id')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @contextmanager
+    def _read(self):
+        """读事务，保证多条查询看到同一个数据快照"""
+        conn = self._connect()
+        conn.execute('BEGIN')
+        try:
+            yield conn
+        finally:
+            conn.execute('COMMIT')
+
+    @contextmanager
+    def _write(self):
+        """
+        写事务，BEGIN IMMEDIATE 在事务开始时就获取写锁，避免读后写升级失败
+        提交前递增 meta 表中的全局版本，事务中修改的对象通过 _touch 记录同一个版本
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        self._local.stamp = None
+        try:
+            yield conn
+            self._set_meta(conn, 'version', self._stamp(conn))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _stamp(self, conn):
+        """当前写事务提交后的 [版本号, 修改时间]"""
+        if self._local.stamp is None:
+            version, _ = self._get_meta(conn, 'version') or (0, None)
+            self._local.stamp = [version + 1, round(time.time(), 3)]
+        return self._local.stamp
+
+    def _touch(self, conn, coll, entity_id, deleted=False):
+        """在写事务中记录对象的新版本，对象被删除时去掉其版本记录"""
+        if deleted:
+            conn.execute('DELETE FROM versions WHERE coll = ? AND id = ?', (coll, entity_id))
+        else:
+            conn.execute('INSERT OR REPLACE INTO versions (coll, id, version, modified) VALUES (?, ?, ?, ?)',
+                         (coll, entity_id, *self._stamp(conn)))
+
+    def _update_row(self, conn, table, columns, where, params, fields):
+        """更新一行数据，列字段直接更新，额外字段合并进 extra 列"""
+        values, extra = _split_fields(fields, columns)
+        if extra:
+            row = conn.execute(f'SELECT extra FROM {table} WHERE {where}', params).fetchone()
+            merged = json.loads(row['extra']) if row and row['extra'] else {}
+            merged.update(extra)
+            values['extra'] = _dump_extra(merged)
+        if not values:
+            return
+        assignments = ', '.join(f'{column} = ?' for column in values)
+        conn.execute(f'UPDATE {table} SET {assignments} WHERE {where}',
+                     (*values.values(), *params))
+
+    # 版本
+
+    def get_version(self):
+        version, modified = self._get_meta(self._connect(), 'version') or (0, None)
+        return version, modified
+
+    def get_entity_version(self, coll, entity_id):
+        with self._read() as conn:
+            if coll == 'articles':
+                row = conn.execute('SELECT category_id FROM articles WHERE id = ?', (entity_id,)).fetchone()
+                entities = [('articles', entity_id), ('categories', row['category_id'])] if row else []
+            else:
+                row = conn.execute('SELECT 1 FROM categories WHERE id = ?', (entity_id,)).fetchone()
+                entities = [('categories', entity_id)] if row else []
+            if not entities:
+                return None
+            # 没有单独版本记录的对象（例如导入的数据）以全局版本为准，文章取其与所属分类中较新的版本
+            fallback = tuple(self._get_meta(conn, 'version') or (0, None))
+            versions = []
+            for entity in entities:
+                row = conn.execute('SELECT version, modified FROM versions WHERE coll = ? AND id = ?',
+                                   entity).fetchone()
+                versions.append((row['version'], row['modified']) if row else fallback)
+            return max(versions, key=lambda version: version[0])
+
+    # 管理员
+
+    def _get_meta(self, conn, key):
+        row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row['value']) if row else None
+
+    def _set_meta(self, conn, key, value):
+        conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                     (key, json.dumps(value, ensure_ascii=False)))
+
+    def get_admin(self):
+        return self._get_meta(self._connect(), 'admin')
+
+    def create_admin(self, admin):
+        with self._write() as conn:
+            if self._get_meta(conn, 'admin'):
+                raise ConflictError('Administrator already exists')
+            self._set_meta(conn, 'admin', admin)
+        return admin
+
+    def update_admin(self, fields):
+        with self._write() as conn:
+            admin = self._get_meta(conn, 'admin')
+            if not admin:
+                raise NotFoundError('No administrator account exists')
+            admin = {**admin, **fields}
+            self._set_meta(conn, 'admin', admin)
+        return admin
+
+    # 分类
+
+    def list_categories(self):
+        rows = self._connect().execute('SELECT * FROM categories ORDER BY id')
+        return [_from_row(row, CATEGORY_COLUMNS) for row in rows]
+
+    def get_category(self, category_id):
+        row = self._connect().execute('SELECT * FROM categories WHERE id = ?', (category_id,)).fetchone()
+        return _from_row(row, CATEGORY_COLUMNS) if row else None
+
+    def count_articles_by_category(self):
+        rows = self._connect().execute('SELECT category_id, article_count FROM category_stats WHERE article_count > 0')
+        return {row['category_id']: row['article_count'] for row in rows}
+
+    def category_stats(self):
+        rows = self._connect().execute('SELECT * FROM category_stats WHERE article_count > 0')
+        return {
+            row['category_id']: {
+                'article_count': row['article_count'],
+                'total_views': row['total_views'],
+                'total_likes': row['total_likes'],
+                'latest_date': row['latest_date']
+            }
+            for row in rows
+        }
+
+    def create_category(self, name, description=''):
+        with self._write() as conn:
+            if conn.execute('SELECT 1 FROM categories WHERE name = ?', (name,)).fetchone():
+                raise ConflictError('Category already exists')
+            cursor = conn.execute('INSERT INTO categories (name, description) VALUES (?, ?)',
+                                  (name, description))
+            self._touch(conn, 'categories', cursor.lastrowid)
+            row = conn.execute('SELECT * FROM categories WHERE id = ?', (cursor.lastrowid,)).fetchone()
+        return _from_row(row, CATEGORY_COLUMNS)
+
+    def update_category(self, category_id, fields):
+        with self._write() as conn:
+            if not conn.execute('SELECT 1 FROM categories WHERE id = ?', (category_id,)).fetchone():
+                raise NotFoundError('Category not found')
+            name = fields.get('name')
+            if name is not None and conn.execute(
+                    'SELECT 1 FROM categories WHERE name = ? AND id != ?', (name, category_id)).fetchone():
+                raise ConflictError('Category name already exists')
+            self._update_row(conn, 'categories', CATEGORY_COLUMNS, 'id = ?', (category_id,), fields)
+            self._touch(conn, 'categories', category_id)
+            row = conn.execute('SELECT * FROM categories WHERE id = ?', (category_id,)).fetchone()
+        return _from_row(row, CATEGORY_COLUMNS)
+
+    def delete_category(self, category_id):
+        with self._write() as conn:
+            if conn.execute('SELECT 1 FROM category_stats WHERE category_id = ? AND article_count > 0',
+                            (category_id,)).fetchone():
+                raise ConflictError('Cannot delete category that has articles')
+            if conn.execute('DELETE FROM categories WHERE id = ?', (category_id,)).rowcount == 0:
+                raise NotFoundError('Category not found')
+            conn.execute('DELETE FROM category_stats WHERE category_id = ?', (category_id,))
+            self._touch(conn, 'categories', category_id, deleted=True)
+
+    # 文章
+
+    def _attach_comments(self, conn, articles, where='', params=()):
+        """一次查询取出这些文章的评论并挂到文章上"""
+        by_id = {article['id']: article for article in articles}
+        for article in articles:
+            article['comments'] = []
+        rows = conn.execute(f'SELECT * FROM comments {where} ORDER BY article_id, id', params)
+        for row in rows:
+            article = by_id.get(row['article_id'])
+            if article is not None:
+                article['comments'].append(_from_row(row, COMMENT_COLUMNS))
+        return articles
+
+    def list_articles(self, category_id=None, include_body=False, limit=None, before=None):
+        conditions, params = [], []
+        if category_id is not None:
+            conditions.append('category_id = ?')
+            params.append(category_id)
+        if before is not None:
+            conditions.append('(date < ? OR (date = ? AND id < ?))')
+            params.extend((before[0], before[0], before[1]))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        page = 'LIMIT ?' if limit is not None else ''
+        if limit is not None:
+            params.append(limit)
+        order = f'{where} ORDER BY date DESC, id DESC {page}'
+
+        if not include_body:
+            rows = self._connect().execute(f'{LISTING_QUERY} {order}', params)
+            return [_listing_from_row(row) for row in rows]
+
+        with self._read() as conn:
+            rows = conn.execute(f'{ARTICLE_QUERY} {order}', params)
+            articles = [_article_from_row(row) for row in rows]
+            if not articles:
+                return articles
+            placeholders = ', '.join('?' for _ in articles)
+            return self._attach_comments(conn, articles, f'WHERE article_id IN ({placeholders})',
+                                         [a['id'] for a in articles])
+
+    def list_articles_by_ids(self, article_ids):
+        if not article_ids:
+            return []
+        placeholders = ', '.join('?' for _ in article_ids)
+        rows = self._connect().execute(f'{LISTING_QUERY} WHERE id IN ({placeholders})', list(article_ids))
+        by_id = {row['id']: _listing_from_row(row) for row in rows}
+        return [by_id[article_id] for article_id in article_ids if article_id in by_id]
+
+    def _get_article(self, conn, article_id):
+        row = conn.execute(f'{ARTICLE_QUERY} WHERE id = ?', (article_id,)).fetchone()
+        return _article_from_row(row) if row else None
+
+    def get_article(self, article_id):
+        with self._read() as conn:
+            return self._get_article(conn, article_id)
+
+    def create_article(self, fields):
+        values, extra = _split_fields(fields, ARTICLE_COLUMNS)
+        values['extra'] = _dump_extra(extra)
+        columns = ', '.join(values)
+        placeholders = ', '.join('?' for _ in values)
+        with self._write() as conn:
+            cursor = conn.execute(f'INSERT INTO articles ({columns}) VALUES ({placeholders})',
+                                  tuple(values.values()))
+            self._touch(conn, 'articles', cursor.lastrowid)
+            return self._get_article(conn, cursor.lastrowid)
+
+    def update_article(self, article_id, fields):
+        with self._write() as conn:
+            if not conn.execute('SELECT 1 FROM articles WHERE id = ?', (article_id,)).fetchone():
+                raise NotFoundError('Article not found')
+            self._update_row(conn, 'articles', ARTICLE_COLUMNS, 'id = ?', (article_id,), fields)
+            self._touch(conn, 'articles', article_id)
+            return self._get_article(conn, article_id)
+
+    def delete_article(self, article_id):
+        with self._write() as conn:
+            if conn.execute('DELETE FROM articles WHERE id = ?', (article_id,)).rowcount == 0:
+                raise NotFoundError('Article not found')
+            self._touch(conn, 'articles', article_id, deleted=True)
+
+    def increment_article(self, article_id, field, amount=1):
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f'Unsupported counter field: {field}')
+        with self._write() as conn:
+            conn.execute(f'UPDATE articles SET {field} = {field} + ? WHERE id = ?', (amount, article_id))
+            row = conn.execute(f'SELECT {field} FROM articles WHERE id = ?', (article_id,)).fetchone()
+            if row is None:
+                raise NotFoundError('Article not found')
+            self._touch(conn, 'articles', article_id)
+        return row[field]
+
+    def increment_articles(self, increments):
+        if any(field not in COUNTER_FIELDS for _, field, _ in increments):
+            raise ValueError('Unsupported counter field')
+        with self._write() as conn:
+            for article_id, field, amount in increments:
+                if conn.execute(f'UPDATE articles SET {field} = {field} + ? WHERE id = ?',
+                                (amount, article_id)).rowcount:
+                    self._touch(conn, 'articles', article_id)
+
+    # 评论
+
+    def add_comment(self, article_id, fields):
+        with self._write() as conn:
+            if not conn.execute('SELECT 1 FROM articles WHERE id = ?', (article_id,)).fetchone():
+                raise NotFoundError('Article not found')
+            row = conn.execute('SELECT seq FROM comment_counters WHERE article_id = ?', (article_id,)).fetchone()
+            comment_id = (row['seq'] if row else 0) + 1
+            values, extra = _split_fields(fields, COMMENT_COLUMNS)
+            conn.execute('INSERT INTO comments (article_id, id, content, date, extra) VALUES (?, ?, ?, ?, ?)',
+                         (article_id, comment_id, values['content'], values['date'], _dump_extra(extra)))
+            self._touch(conn, 'articles', article_id)
+        return {**fields, 'id': comment_id}
+
+    def list_comments(self, article_id, limit=None, after=None):
+        params = [article_id, after if after is not None else 0]
+        page = ''
+        if limit is not None:
+            page = 'LIMIT ?'
+            params.append(limit)
+        rows = self._connect().execute(
+            f'SELECT * FROM comments WHERE article_id = ? AND id > ? ORDER BY id {page}', params)
+        return [_from_row(row, COMMENT_COLUMNS) for row in rows]
+
+    def get_comment_seq(self, article_id):
+        row = self._connect().execute(
+            'SELECT COALESCE((SELECT seq FROM comment_counters WHERE article_id = articles.id), 0) AS seq '
+            'FROM articles WHERE id = ?', (article_id,)).fetchone()
+        return row['seq'] if row else None
+
+    def update_comment(self, article_id, comment_id, fields):
+        with self._write() as conn:
+            if not conn.execute('SELECT 1 FROM articles WHERE id = ?', (article_id,)).fetchone():
+                raise NotFoundError('Article not found')
+            where, params = 'article_id = ? AND id = ?', (article_id, comment_id)
+            if not conn.execute(f'SELECT 1 FROM comments WHERE {where}', params).fetchone():
+                raise NotFoundError('Comment not found')
+            self._update_row(conn, 'comments', COMMENT_COLUMNS, where, params, fields)
+            self._touch(conn, 'articles', article_id)
+            row = conn.execute(f'SELECT * FROM comments WHERE {where}', params).fetchone()
+        return _from_row(row, COMMENT_COLUMNS)
+
+    def delete_comment(self, article_id, comment_id):
+        with self._write() as conn:
+            if not conn.execute('SELECT 1 FROM articles WHERE id = ?', (article_id,)).fetchone():
+                raise NotFoundError('Article not found')
+            if conn.execute('DELETE FROM comments WHERE article_id = ? AND id = ?',
+                            (article_id, comment_id)).rowcount == 0:
+                raise NotFoundError('Comment not found')
+            self._touch(conn, 'articles', article_id)
+
+    # 导入
+
+    def _is_initialized(self, conn):
+        return self._get_meta(conn, 'initialized') is not None
+
+    def _insert_data(self, conn, data):
+        """把 blog.json 格式的完整数据写入数据库"""
+        if data.get('admin'):
+            self._set_meta(conn, 'admin', data['admin'])
+        # 沿用导入数据的全局版本，版本号不会因为更换存储后端而回退
+        self._set_meta(conn, 'version', [data.get('version', 0), data.get('modified')])
+        self._local.stamp = None
+        for category in data.get('categories', []):
+            values, extra = _split_fields(category, CATEGORY_COLUMNS)
+            conn.execute('INSERT INTO categories (id, name, description, extra) VALUES (?, ?, ?, ?)',
+                         (values['id'], values['name'], values.get('description', ''), _dump_extra(extra)))
+        for article in data.get('articles', []):
+            values, extra = _split_fields(article, ARTICLE_COLUMNS)
+            conn.execute(
+                'INSERT INTO articles (id, title, content, category_id, date, views, likes, extra) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (values['id'], values['title'], values['content'], values['category_id'], values['date'],
+                 values.get('views', 0), values.get('likes', 0), _dump_extra(extra)))
+            conn.executemany(
+                'INSERT INTO comments (article_id, id, content, date, extra) VALUES (?, ?, ?, ?, ?)',
+                [(article['id'], comment['id'], comment['content'], comment['date'],
+                  _dump_extra(_split_fields(comment, COMMENT_COLUMNS)[1]))
+                 for comment in article.get('comments', [])])
+        # 触发器按导入的评论计算序号，最新的评论已被删除时以导入数据中记录的序号为准
+        conn.executemany(
+            'INSERT INTO comment_counters (article_id, seq) VALUES (?, ?) '
+            'ON CONFLICT (article_id) DO UPDATE SET seq = MAX(seq, excluded.seq)',
+            [(int(article_id), seq) for article_id, seq in data.get('comment_seq', {}).items()
+             if conn.execute('SELECT 1 FROM articles WHERE id = ?', (int(article_id),)).fetchone()])
+        self._set_meta(conn, 'initialized', True)
+
+    def import_data(self, data, replace=False):
+        """
+        导入 blog.json 格式的完整数据
+        数据库中已有数据时需要 replace=True 才会清空后重新导入，否则抛出 ConflictError
+        """
+        with self._write() as conn:
+            if self._is_initialized(conn):
+                if not replace:
+                    raise ConflictError('Database already contains data')
+                for table in ('comments', 'comment_counters', 'articles', 'categories', 'category_stats',
+                              'versions', 'meta'):
+                    conn.execute(f'DELETE FROM {table}')
+            self._insert_data(conn, data)
@@ -0,0 +1,302 @@
+"""
+评论推送模块
+文章页通过 GET /api/articles/<id>/comments/stream 接收新增和删除的评论，不再整篇重新获取：
+
+1. 客户端接受 text/event-stream 时以 Server-Sent Events 推送：
+   comment（新评论）、delete（评论被删除）、resync（需要重新读取评论列表）、gone（文章被删除）事件，
+   事件的 id 为已推送的最大评论ID，断线重连时浏览器通过 Last-Event-ID 从断点继续；
+   没有事件时每隔 COMMENT_STREAM_HEARTBEAT 秒发送一行注释作为心跳，
+   连接保持 COMMENT_STREAM_MAX_AGE 秒后由服务端关闭，浏览器自动重连
+2. 其他客户端使用 since 参数长轮询：有新事件或等待 COMMENT_STREAM_LONGPOLL_TIMEOUT 秒后返回，
+   响应中的 next_since 作为下一次请求的 since
+3. 添加和删除评论的接口把事件发布到进程内的 CommentBroker，同一进程的订阅者立即收到；
+   每个订阅者有一个有上限的缓冲区（COMMENT_STREAM_BUFFER），客户端读取太慢导致缓冲区满时
+   丢弃积压的事件，改为发送 resync
+4. 其他工作进程中发生的修改每隔 COMMENT_STREAM_SYNC_INTERVAL 秒从存储同步一次：
+   评论ID按文章递增且不重复使用，读取 ID 大于已推送评论的评论即为新评论；
+   评论数与推算的结果不一致时（其他进程删除了评论）发送 resync
+
+每个推送连接和长轮询请求在等待期间占用一个工作线程，
+同时订阅的连接数超过 COMMENT_STREAM_MAX_SUBSCRIBERS 时返回503
+"""
+
+import json
+import time
+import atexit
+import threading
+from collections import deque
+from flask import current_app
+from backend.utils import derive_comment_fields
+
+
+class Subscription:
+    """
+    一篇文章的订阅
+    事件保存在有上限的缓冲区中，由订阅者所在的请求线程取出
+    """
+
+    def __init__(self, broker, article_id, max_events):
+        self.broker = broker
+        self.article_id = article_id
+        self.max_events = max_events
+        self.closed = False
+        self._events = deque()
+        self._overflowed = False
+        self._cond = threading.Condition()
+
+    def push(self, event):
+        """放入一个事件，缓冲区已满时丢弃积压的事件，订阅者改为重新同步"""
+        with self._cond:
+            if self._overflowed:
+                return
+            if len(self._events) >= self.max_events:
+                self._events.clear()
+                self._overflowed = True
+            else:
+                self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """
+        取出缓冲区中的所有事件，没有事件时最多等待 timeout 秒
+        缓冲区溢出过时返回一个 overflow 事件
+        """
+        with self._cond:
+            if not self._events and not self._overflowed and not self.closed:
+                self._cond.wait(max(timeout, 0))
+            if self._overflowed:
+                self._overflowed = False
+                return [{'type': 'overflow'}]
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class CommentBroker:
+    """进程内的评论事件发布/订阅，按文章ID分发"""
+
+    def __init__(self, buffer_size=64, max_subscribers=256):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, article_id):
+        """订阅文章的评论事件，订阅数已达上限时返回None"""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = Subscription(self, article_id, self.buffer_size)
+            self._subscribers.setdefault(article_id, set()).add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.article_id)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.article_id]
+            self._count -= 1
+
+    def publish(self, article_id, event):
+        """向文章的所有订阅者发布事件，不等待订阅者处理"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(article_id, ()))
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': self._count, 'articles': len(self._subscribers)}
+
+    def close(self):
+        """唤醒所有订阅者，进程退出时正在等待的连接尽快结束"""
+        with self._lock:
+            subscribers = [s for group in self._subscribers.values() for s in group]
+        for subscription in subscribers:
+            subscription.closed = True
+            subscription.wake()
+
+
+def _with_fields(comment):
+    return comment if 'formatted_date' in comment else {**comment, **derive_comment_fields(comment)}
+
+
+def _comment_count(repository, article_id):
+    """文章的评论数，从列表视图读取，文章不存在时返回None"""
+    listing = repository.list_articles_by_ids([article_id])
+    return listing[0]['comment_count'] if listing else None
+
+
+class CommentFeed:
+    """
+    一个订阅者看到的评论变化
+    合并本进程推送的事件和定期从存储同步的变化；last_id 为已推送的最大评论ID，
+    count 为推算的评论数，用于发现其他进程删除的评论
+    """
+
+    def __init__(self, repository, subscription, since, max_backlog=100):
+        self.repository = repository
+        self.subscription = subscription
+        self.article_id = subscription.article_id
+        self.last_id = since
+        self.max_backlog = max_backlog
+        self.count = None
+        self.gone = False
+
+    def sync(self):
+        """从存储读取 last_id 之后的评论，包括其他工作进程添加的评论"""
+        comments = self.repository.list_comments(self.article_id, limit=self.max_backlog + 1,
+                                                 after=self.last_id)
+        count = _comment_count(self.repository, self.article_id)
+        if count is None:
+            self.gone = True
+            return [{'type': 'gone'}]
+        if len(comments) > self.max_backlog:
+            # 积压太多，不逐条推送，客户端重新读取评论列表
+            return self._resync(count)
+        events = [{'type': 'comment', 'comment': _with_fields(c)} for c in comments]
+        if comments:
+            self.last_id = comments[-1]['id']
+        expected = self.count + len(comments) if self.count is not None else count
+        self.count = count
+        if count != expected:
+            events.append({'type': 'resync'})
+        return events
+
+    def _resync(self, count=None):
+        seq = self.repository.get_comment_seq(self.article_id)
+        if seq is None:
+            self.gone = True
+            return [{'type': 'gone'}]
+        self.last_id = seq
+        self.count = count if count is not None else _comment_count(self.repository, self.article_id)
+        return [{'type': 'resync'}]
+
+    def wait(self, timeout):
+        """等待本进程发布的事件，跳过客户端已经收到的评论"""
+        events = []
+        for event in self.subscription.get(timeout):
+            if event['type'] == 'overflow':
+                return self._resync()
+            if event['type'] == 'comment':
+                if event['comment']['id'] <= self.last_id:
+                    continue
+                self.last_id = event['comment']['id']
+                self.count += 1
+            elif event['type'] == 'delete':
+                if event['id'] > self.last_id:
+                    # 客户端还没有收到这条评论，之后同步时也不会再读到
+                    continue
+                self.count -= 1
+            events.append(event)
+        return events
+
+    def payload(self, event):
+        """事件的数据部分，附带当前的评论数"""
+        data = {k: v for k, v in event.items() if k != 'type'}
+        if self.count is not None:
+            data['comment_count'] = self.count
+        return data
+
+
+def format_sse(event, data, event_id=None):
+    """格式化一条 Server-Sent Events 消息，数据为单行JSON"""
+    lines = [] if event_id is None else [f'id: {event_id}']
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+def event_stream(feed, heartbeat=15, sync_interval=5, max_age=300):
+    """
+    生成推送连接的消息，连接结束（包括客户端断开）时取消订阅
+    先推送 since 之后已有的评论，之后等待本进程的事件，定期从存储同步
+    """
+    try:
+        yield f'retry: {int(sync_interval * 1000)}\n\n'
+        now = time.monotonic()
+        deadline = now + max_age
+        next_sync = now
+        last_sent = now
+        while not feed.gone and not feed.subscription.closed:
+            events = []
+            if now >= next_sync:
+                events = feed.sync()
+                next_sync = now + sync_interval
+            if not events:
+                events = feed.wait(min(next_sync, last_sent + heartbeat, deadline) - now)
+            now = time.monotonic()
+            if events:
+                for event in events:
+                    event_id = event['comment']['id'] if event['type'] == 'comment' else feed.last_id
+                    yield format_sse(event['type'], feed.payload(event), event_id)
+                last_sent = now
+            elif now - last_sent >= heartbeat:
+                yield ': ping\n\n'
+                last_sent = now
+            if now >= deadline:
+                break
+    finally:
+        feed.subscription.close()
+
+
+def long_poll(feed, timeout=25, sync_interval=5):
+    """
+    长轮询：返回 since 之后的变化，没有变化时最多等待 timeout 秒
+    返回 (事件列表, 下一次请求的 since)
+    """
+    try:
+        now = time.monotonic()
+        deadline = now + timeout
+        events = feed.sync()
+        next_sync = now + sync_interval
+        while not events and not feed.subscription.closed and now < deadline:
+            events = feed.wait(min(next_sync, deadline) - now)
+            now = time.monotonic()
+            if not events and now >= next_sync:
+                events = feed.sync()
+                next_sync = now + sync_interval
+        return [{'type': event['type'], **feed.payload(event)} for event in events], feed.last_id
+    finally:
+        feed.subscription.close()
+
+
+def init_streams(app):
+    """为应用创建评论事件的发布/订阅对象，保存在 app.extensions 中"""
+    broker = CommentBroker(
+        buffer_size=app.config.get('COMMENT_STREAM_BUFFER', 64),
+        max_subscribers=app.config.get('COMMENT_STREAM_MAX_SUBSCRIBERS', 256)
+    )
+    app.extensions['comment_broker'] = broker
+    atexit.register(broker.close)
+    return broker
+
+
+def get_comment_broker():
+    """获取当前应用的评论事件发布/订阅对象，未初始化时自动创建"""
+    if 'comment_broker' not in current_app.extensions:
+        return init_streams(current_app._get_current_object())
+    return current_app.extensions['comment_broker']
+
+
+def publish_comment_event(article_id, event):
+    """
+    发布评论事件，event 为 {'type': 'comment', 'comment': {...}} 或 {'type': 'delete', 'id': 评论ID}
+    评论已经保存成功，发布失败只记录日志，订阅者会在下次同步时从存储读到变化
+    """
+    try:
+        get_comment_broker().publish(article_id, event)
+    except Exception as e:
+        current_app.logger.error('Error publishing comment event: %s', str(e))
@@ -0,0 +1,67 @@
+"""
+请求计时模块
+记录存储读写、JSON序列化、密码哈希等环节花费的时间：
+
+1. timed 装饰的函数每次调用的耗时按名称累加在当前请求的 flask.g 中，记录 (总秒数, 次数)，
+   供访问日志使用（见 backend.log_pipeline）；不在请求中调用时（后台线程、命令行工具）不累加
+2. 每次计时还会通知 add_observer 注册的观察者，不论是否在请求中，用于统计耗时分布（见 backend.metrics）
+3. 同一线程中嵌套的计时只记录最外层，例如存储的写入方法内部调用读取方法时只计入写入
+"""
+
+import time
+import threading
+from functools import wraps
+from flask import g, has_request_context
+
+_local = threading.local()
+_observers = []
+
+
+def add_observer(observer):
+    """注册计时的观察者，observer(名称, 秒数) 在每次计时结束时调用"""
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def record_time(name, seconds):
+    """记录一次耗时：通知观察者，并累加到当前请求的计时中"""
+    for observer in _observers:
+        observer(name, seconds)
+    if not has_request_context():
+        return
+    timings = g.setdefault('timings', {})
+    total, count = timings.get(name, (0.0, 0))
+    timings[name] = (total + seconds, count + 1)
+
+
+def request_timings():
+    """当前请求的计时，{名称: (总秒数, 次数)}"""
+    if not has_request_context():
+        return {}
+    return g.get('timings', {})
+
+
+def timed(name, scope=None):
+    """
+    装饰器：累计函数的执行时间
+    scope 相同的计时互相嵌套时只记录最外层，默认与 name 相同
+    """
+    scope = scope or name
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            active = getattr(_local, 'active', None)
+            if active is None:
+                active = _local.active = set()
+            if scope in active:
+                return fn(*args, **kwargs)
+            active.add(scope)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                active.discard(scope)
+                record_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
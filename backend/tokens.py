@@ -0,0 +1,92 @@
+"""
+令牌缓存模块
+管理接口每个请求都要验证 Authorization 中的JWT，验证结果缓存在进程内，同一个令牌只解码和验签一次：
+
+1. 缓存键为令牌的SHA-256摘要，不在内存中保存令牌原文
+2. 缓存项在令牌的 exp 到期时失效，最长保留 JWT_CACHE_TTL 秒，过期的令牌不会因为缓存而继续有效
+3. 缓存最多保存 JWT_CACHE_SIZE 个令牌，超出时淘汰最久未使用的项
+
+令牌分为访问令牌（type=access，有效期 JWT_ACCESS_TOKEN_EXPIRES）和刷新令牌
+（type=refresh，有效期 JWT_REFRESH_TOKEN_EXPIRES）；刷新令牌只能用于 /api/auth/refresh，
+其中的 pwd 为签发时密码哈希的指纹，修改密码后已签发的刷新令牌失效（见 blueprints.auth），
+刷新时只比较指纹，不需要计算密码哈希
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import current_app
+
+
+class TokenCache:
+    """已验证令牌的 payload 缓存，按令牌摘要索引，线程安全"""
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, token):
+        """读取已验证的 payload，未缓存或已过期时返回None"""
+        key = self.key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if now >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, token, payload):
+        """缓存验证通过的 payload，在 exp 和 TTL 中较早的时间失效"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if 'exp' in payload:
+            expires_at = min(expires_at, payload['exp'])
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_size': self.max_size}
+
+
+def password_fingerprint(password_hash):
+    """密码哈希的指纹，写入刷新令牌，修改密码后指纹变化"""
+    return hashlib.sha256(password_hash.encode('utf-8')).hexdigest()[:16]
+
+
+def init_tokens(app):
+    """为应用创建令牌缓存，保存在 app.extensions 中"""
+    cache = TokenCache(
+        max_size=app.config.get('JWT_CACHE_SIZE', 1024),
+        ttl=app.config.get('JWT_CACHE_TTL', 300)
+    )
+    app.extensions['token_cache'] = cache
+    return cache
+
+
+def get_token_cache():
+    """获取当前应用的令牌缓存，未初始化时自动创建"""
+    if 'token_cache' not in current_app.extensions:
+        return init_tokens(current_app._get_current_object())
+    return current_app.extensions['token_cache']
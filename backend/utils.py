@@ -6,10 +6,16 @@
 
 from datetime import datetime
 import re
+import math
+import hashlib
+import json
+import base64
 import jwt
 import bcrypt
 from functools import wraps
 from flask import request, jsonify, current_app
+from backend.tokens import get_token_cache, password_fingerprint
+from backend.timing import timed
 
 def sanitize_html(text):
     """
@@ -93,6 +99,196 @@ def truncate_text(text, length=100):
         return text
     return text[:length].rsplit(' ', 1)[0] + '...'
 
+# 每分钟阅读的字数（中文按字、英文按单词计），用于估算阅读时间
+READING_SPEED = 300
+
+# 把markdown转换为纯文本时依次应用的替换规则
+_MARKDOWN_RULES = [
+    (re.compile(r'```.*?```', re.S), ' '),                    # 代码块
+    (re.compile(r'\$\$.*?\$\$', re.S), ' '),                  # 公式块
+    (re.compile(r'!\[([^\]]*)\]\([^)]*\)'), r'\1'),            # 图片保留替代文字
+    (re.compile(r'\[([^\]]*)\]\([^)]*\)'), r'\1'),             # 链接保留文字
+    (re.compile(r'<[^>]*?>'), ''),                           # HTML标签
+    (re.compile(r'^\s{0,3}(#{1,6}|>+|[-*+]|\d+\.)\s+', re.M), ''),  # 标题、引用和列表标记
+    (re.compile(r'^\s*([-*_]\s*){3,}$', re.M), ' '),           # 分隔线
+    (re.compile(r'(\*\*|\*|~~|`)(?=\S)(.+?)(?<=\S)\1'), r'\2'),  # 强调和行内代码
+    (re.compile(r'(?<!\w)(__|_)(?=\S)(.+?)(?<=\S)\1(?!\w)'), r'\2'),  # 下划线强调，不影响 snake_case
+    (re.compile(r'&nbsp;'), ' '),
+    (re.compile(r'\s+'), ' '),
+]
+
+_WORD_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]|[A-Za-z0-9]+')
+
+def markdown_to_text(text):
+    """
+    去掉markdown标记，得到用于摘要的纯文本
+    
+    Args:
+        text (str): markdown文本
+        
+    Returns:
+        str: 纯文本，连续空白合并为一个空格
+        
+    Example:
+        >>> markdown_to_text('## 标题\n\n**加粗** 和 [链接](http://a.com)')
+        '标题 加粗 和 链接'
+    """
+    for pattern, replacement in _MARKDOWN_RULES:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+def count_words(text):
+    """
+    统计字数，中日韩文字每个字计一个，拉丁字母和数字按单词计
+    
+    Example:
+        >>> count_words('Hello world 你好')
+        4
+    """
+    return len(_WORD_RE.findall(text))
+
+def derive_article_fields(article):
+    """
+    计算文章的派生字段，在写入文章时调用并与文章一起保存
+    只计算 article 中已有的源字段对应的派生字段：
+    content -> summary（去掉markdown的摘要）、word_count、reading_time（分钟）、
+    content_hash（正文的摘要哈希，搜索索引用它发现正文的修改）；
+    date -> formatted_date
+    
+    Args:
+        article (dict): 文章字段，可以只包含部分字段
+        
+    Returns:
+        dict: 派生字段
+    """
+    fields = {}
+    if 'content' in article:
+        text = markdown_to_text(article['content'])
+        words = count_words(text)
+        fields['summary'] = truncate_text(text)
+        fields['word_count'] = words
+        fields['reading_time'] = max(1, math.ceil(words / READING_SPEED))
+        fields['content_hash'] = hashlib.sha256(article['content'].encode('utf-8')).hexdigest()[:16]
+    if 'date' in article:
+        fields['formatted_date'] = format_datetime(article['date'])
+    return fields
+
+def derive_comment_fields(comment):
+    """计算评论的派生字段（formatted_date），在写入评论时调用并与评论一起保存"""
+    return {'formatted_date': format_datetime(comment['date'])}
+
+def encode_cursor(article):
+    """
+    生成分页游标
+    游标记录当前页最后一篇文章的日期和ID，对客户端来说是不透明的字符串
+    
+    Args:
+        article (dict): 当前页的最后一篇文章
+        
+    Returns:
+        str: URL安全的游标字符串
+    """
+    raw = json.dumps([article['date'], article['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    解析分页游标
+    
+    Args:
+        cursor (str): encode_cursor 生成的游标字符串
+        
+    Returns:
+        tuple: (日期, ID)，下一页从排在这篇文章之后的文章开始
+        
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        date, article_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(date, str) or not isinstance(article_id, int):
+        raise ValueError('Invalid cursor')
+    return date, article_id
+
+def get_page_args(max_limit=100):
+    """
+    读取请求中的分页参数 limit 和 cursor
+    
+    Args:
+        max_limit (int, optional): 每页数量上限
+        
+    Returns:
+        tuple: (limit, before)，未指定时分别为 None，表示不分页、从第一篇开始
+        
+    Raises:
+        ValueError: 参数格式无效
+    """
+    limit = request.args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('Invalid limit')
+        if limit < 1:
+            raise ValueError('Invalid limit')
+        limit = min(limit, max_limit)
+    cursor = request.args.get('cursor')
+    before = decode_cursor(cursor) if cursor else None
+    return limit, before
+
+def get_comment_page_args(default_limit=20, max_limit=100):
+    """
+    读取评论分页参数 limit 和 cursor
+    评论按ID升序排列，游标为上一页最后一条评论的ID
+    
+    Args:
+        default_limit (int, optional): 未指定 limit 时的每页数量
+        max_limit (int, optional): 每页数量上限
+        
+    Returns:
+        tuple: (limit, after)，after 为 None 表示从第一条评论开始
+        
+    Raises:
+        ValueError: 参数格式无效
+    """
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError('Invalid limit')
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    cursor = request.args.get('cursor')
+    after = None
+    if cursor:
+        try:
+            after = int(cursor)
+        except ValueError:
+            raise ValueError('Invalid cursor')
+        if after < 0:
+            raise ValueError('Invalid cursor')
+    return min(limit, max_limit), after
+
+def paginate(items, limit):
+    """
+    截取一页数据并生成下一页的游标
+    调用方应多取一条数据（limit + 1），用于判断是否还有下一页
+    
+    Args:
+        items (list): 按日期降序排列的文章
+        limit (int): 每页数量，None 表示不分页
+        
+    Returns:
+        tuple: (当前页的文章, 下一页游标)，没有下一页时游标为 None
+    """
+    if limit is None or len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(items[-1])
+
+@timed('bcrypt_hash')
 def hash_password(password):
     """
     对密码进行哈希处理
@@ -113,6 +309,7 @@ def hash_password(password):
         print(f"Password hash error: {str(e)}")
         raise
 
+@timed('bcrypt_check')
 def check_password(password, hashed_password):
     """
     验证密码
@@ -134,38 +331,56 @@ def check_password(password, hashed_password):
         print(f"Password check error: {str(e)}")
         return False
 
-def generate_token(username):
+def generate_token(username, token_type='access', password_hash=None):
     """
     生成JWT token
     
     Args:
         username: 用户名
+        token_type: 'access'（访问令牌）或 'refresh'（刷新令牌）
+        password_hash: 签发刷新令牌时管理员当前的密码哈希，修改密码后令牌失效
         
     Returns:
         str: JWT token
     """
+    config = current_app.config
+    expires = config['JWT_REFRESH_TOKEN_EXPIRES' if token_type == 'refresh' else 'JWT_ACCESS_TOKEN_EXPIRES']
+    now = datetime.utcnow()
     payload = {
         'username': username,
-        'exp': datetime.utcnow() + current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+        'type': token_type,
+        'iat': now,
+        'exp': now + expires
     }
-    return jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+    if password_hash is not None:
+        payload['pwd'] = password_fingerprint(password_hash)
+    return jwt.encode(payload, config['JWT_SECRET_KEY'], algorithm='HS256')
 
-def verify_token(token):
+def verify_token(token, token_type='access'):
     """
     验证JWT token
+    验证结果缓存在进程内（见 backend.tokens），同一个token只解码一次
     
     Args:
         token: JWT token
+        token_type: 期望的token类型，没有 type 的旧token视为访问令牌
         
     Returns:
-        dict: token的payload部分
+        dict: token的payload部分，无效、过期或类型不符时返回None
     """
-    try:
-        return jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-    except jwt.ExpiredSignatureError:
-        return None
-    except jwt.InvalidTokenError:
+    cache = get_token_cache()
+    payload = cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            return None
+        except jwt.InvalidTokenError:
+            return None
+        cache.put(token, payload)
+    if payload.get('type', 'access') != token_type:
         return None
+    return payload
 
 def login_required(f):
     """
@@ -178,8 +393,12 @@ def login_required(f):
         if not auth_header:
             return jsonify({'error': 'No token provided'}), 401
             
+        scheme, _, token = auth_header.partition(' ')
+        token = token.strip()
+        if scheme.lower() != 'bearer' or not token:
+            return jsonify({'error': 'Invalid token format'}), 401
+            
         try:
-            token = auth_header.split(' ')[1]  # Bearer token
             payload = verify_token(token)
             
             if payload is None:
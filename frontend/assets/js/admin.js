@@ -20,7 +20,7 @@ async function updateStats() {
         // 计算统计数据
         const totalArticles = articles.length;
         const totalComments = articles.reduce((sum, article) =>
-            sum + (article.comments?.length || 0), 0);
+            sum + (article.comment_count || 0), 0);
         const totalLikes = articles.reduce((sum, article) =>
             sum + (article.likes || 0), 0);
 
@@ -61,7 +61,7 @@ async function renderArticles() {
                     <div class="article-date">${article.formatted_date || new Date(article.date).toLocaleDateString()}</div>
                     <div class="article-stats">
                         <span>👍 ${article.likes || 0}</span>
-                        <span>💬 ${article.comments?.length || 0}</span>
+                        <span>💬 ${article.comment_count || 0}</span>
                     </div>
                     <div class="article-actions">
                         <button class="action-btn btn-edit" onclick="location.href='editor.html?id=${article.id}'">编辑</button>
@@ -85,7 +85,8 @@ async function renderComments() {
     const loadingKey = 'comments';
     try {
         actions.setLoading(loadingKey, true);
-        const response = await dataManager.getArticles();
+        // 评论管理需要完整的评论内容
+        const response = await dataManager.getArticles({ includeBody: true });
         const articles = response.articles;
         const commentsList = document.getElementById('commentsList');
 
@@ -28,6 +28,7 @@ class DataManager {
         this.initPromise = null;
         this.baseURL = config.API_BASE_URL;
         this.categoriesCache = null;
+        this.refreshPromise = null;
     }
 
     /**
@@ -36,10 +37,11 @@ class DataManager {
      * 
      * @param {string} endpoint - API端点路径
      * @param {object} options - 请求配置选项
+     * @param {boolean} retried - 是否已经刷新过令牌后重试
      * @returns {Promise<any>} 请求响应数据
      * @throws {APIError} 当API请求失败时抛出错误
      */
-    async request(endpoint, options = {}) {
+    async request(endpoint, options = {}, retried = false) {
         try {
             const token = this.getAuthToken();
             if (token) {
@@ -61,7 +63,11 @@ class DataManager {
 
             // 处理认证失败
             if (response.status === 401) {
-                localStorage.removeItem('auth_token');
+                // 访问令牌过期时用刷新令牌换取新令牌，重试一次
+                if (token && !retried && await this.refreshAuthToken()) {
+                    return this.request(endpoint, options, true);
+                }
+                this.clearAuthTokens();
                 if (window.location.pathname !== '/admin-login.html') {
                     window.location.href = 'admin-login.html';
                 }
@@ -100,9 +106,10 @@ class DataManager {
      * 上传文件
      * @param {string} endpoint - API端点路径
      * @param {FormData} formData - 包含文件的FormData对象
+     * @param {boolean} retried - 是否已经刷新过令牌后重试
      * @returns {Promise<any>} 上传响应数据
      */
-    async uploadFile(endpoint, formData) {
+    async uploadFile(endpoint, formData, retried = false) {
         try {
             const token = this.getAuthToken();
             const headers = {};
@@ -119,7 +126,10 @@ class DataManager {
             });
 
             if (response.status === 401) {
-                localStorage.removeItem('auth_token');
+                if (token && !retried && await this.refreshAuthToken()) {
+                    return this.uploadFile(endpoint, formData, true);
+                }
+                this.clearAuthTokens();
                 if (window.location.pathname !== '/admin-login.html') {
                     window.location.href = 'admin-login.html';
                 }
@@ -157,16 +167,105 @@ class DataManager {
         return localStorage.getItem('auth_token');
     }
 
+    /**
+     * 保存登录、注册或修改密码返回的访问令牌和刷新令牌
+     * @param {Object} response - 认证接口的响应
+     */
+    setAuthTokens(response) {
+        if (response && response.token) {
+            localStorage.setItem('auth_token', response.token);
+        }
+        if (response && response.refresh_token) {
+            localStorage.setItem('refresh_token', response.refresh_token);
+        }
+    }
+
+    /**
+     * 删除保存的令牌
+     */
+    clearAuthTokens() {
+        localStorage.removeItem('auth_token');
+        localStorage.removeItem('refresh_token');
+    }
+
+    /**
+     * 用刷新令牌换取新的访问令牌
+     * 同时失败的多个请求共用一次刷新
+     * @returns {Promise<boolean>} 是否刷新成功
+     */
+    refreshAuthToken() {
+        const refreshToken = localStorage.getItem('refresh_token');
+        if (!refreshToken) {
+            return Promise.resolve(false);
+        }
+        if (!this.refreshPromise) {
+            this.refreshPromise = fetch(`${this.baseURL}/auth/refresh`, {
+                method: 'POST',
+                credentials: 'include',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ refresh_token: refreshToken }),
+                mode: 'cors'
+            })
+                .then(async response => {
+                    if (!response.ok) {
+                        return false;
+                    }
+                    this.setAuthTokens(await response.json());
+                    return true;
+                })
+                .catch(() => false)
+                .finally(() => {
+                    this.refreshPromise = null;
+                });
+        }
+        return this.refreshPromise;
+    }
+
     /**
      * 文章相关API方法
      */
 
     /**
-     * 获取所有文章列表
-     * @returns {Promise<{articles: Array, categories: Array}>} 文章列表和分类列表
+     * 生成分页查询参数
+     * @param {Object} params - 查询参数，值为空的参数会被忽略
+     * @returns {string} 以 ? 开头的查询字符串，没有参数时为空字符串
      */
-    async getArticles() {
-        return this.request('/articles');
+    buildQuery(params) {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== false) {
+                query.append(key, value);
+            }
+        });
+        const text = query.toString();
+        return text ? `?${text}` : '';
+    }
+
+    /**
+     * 获取文章列表
+     * 默认只包含摘要（summary）和评论数（comment_count），不包含正文和评论
+     * @param {Object} options - 查询选项
+     * @param {boolean} options.includeBody - 是否同时获取文章正文和评论
+     * @param {number} options.limit - 每页数量，不指定时返回全部文章
+     * @param {string} options.cursor - 上一页返回的 next_cursor
+     * @returns {Promise<{articles: Array, categories: Array, next_cursor: string|null}>} 文章列表和分类列表
+     */
+    async getArticles({ includeBody = false, limit, cursor } = {}) {
+        const query = this.buildQuery({ include_body: includeBody && 'true', limit, cursor });
+        return this.request(`/articles${query}`);
+    }
+
+    /**
+     * 搜索文章
+     * @param {string} query - 查询文本
+     * @param {Object} options - 查询选项
+     * @param {number} options.category - 只搜索该分类下的文章
+     * @param {number} options.limit - 每页数量
+     * @param {number} options.offset - 跳过的结果数量
+     * @returns {Promise<{results: Array, total: number, next_offset: number|null}>} 按相关度排序的搜索结果
+     */
+    async searchArticles(query, { category, limit, offset } = {}) {
+        return this.request(`/search${this.buildQuery({ q: query, category, limit, offset })}`);
     }
 
     /**
@@ -222,6 +321,41 @@ class DataManager {
      * 评论相关API方法
      */
 
+    /**
+     * 分页获取文章的评论，按发表顺序排列
+     * 文章详情已附带第一页评论，后续页面使用详情中的 comments_cursor 开始读取
+     * @param {number} articleId - 文章ID
+     * @param {Object} options - 查询选项
+     * @param {number} options.limit - 每页数量
+     * @param {string} options.cursor - 上一页返回的 next_cursor
+     * @returns {Promise<{comments: Array, comment_count: number, next_cursor: string|null}>} 一页评论和评论总数
+     */
+    async getComments(articleId, { limit, cursor } = {}) {
+        return this.request(`/articles/${articleId}/comments${this.buildQuery({ limit, cursor })}`);
+    }
+
+    /**
+     * 评论推送（Server-Sent Events）的地址
+     * 推送 comment、delete、resync、gone 事件，断线后浏览器自动重连并从上次的事件继续
+     * @param {number} articleId - 文章ID
+     * @param {number} since - 已有的最大评论ID，从之后的评论开始推送
+     * @returns {string} 用于 EventSource 的地址
+     */
+    commentStreamURL(articleId, since) {
+        return `${this.baseURL}/articles/${articleId}/comments/stream${this.buildQuery({ since })}`;
+    }
+
+    /**
+     * 长轮询评论变化，不支持 EventSource 时使用
+     * 有新评论或删除评论时立即返回，否则等待一段时间后返回空的事件列表
+     * @param {number} articleId - 文章ID
+     * @param {number} since - 上一次返回的 next_since
+     * @returns {Promise<{events: Array, comment_count: number, next_since: number}>} 评论事件
+     */
+    async pollComments(articleId, since) {
+        return this.request(`/articles/${articleId}/comments/stream${this.buildQuery({ since })}`);
+    }
+
     /**
      * 添加评论
      * @param {number} articleId - 文章ID
@@ -268,8 +402,19 @@ class DataManager {
      * @returns {Promise<Array>} 分类列表
      */
     async getCategories() {
-        const response = await this.request('/articles');
-        return response.categories;
+        return this.request('/categories');
+    }
+
+    /**
+     * 获取分类详情及其文章列表
+     * @param {number} id - 分类ID
+     * @param {Object} options - 分页选项
+     * @param {number} options.limit - 每页数量
+     * @param {string} options.cursor - 上一页返回的 next_cursor
+     * @returns {Promise<Object>} 分类信息，articles 为文章列表，next_cursor 为下一页游标
+     */
+    async getCategory(id, { limit, cursor } = {}) {
+        return this.request(`/categories/${id}${this.buildQuery({ limit, cursor })}`);
     }
 
     /**
@@ -312,9 +457,7 @@ class DataManager {
             method: 'POST',
             body: JSON.stringify({ username, password })
         });
-        if (response.token) {
-            localStorage.setItem('auth_token', response.token);
-        }
+        this.setAuthTokens(response);
         return response;
     }
 
@@ -333,7 +476,7 @@ class DataManager {
             return true;
         } catch (error) {
             if (error.status === 401) {
-                localStorage.removeItem('auth_token');
+                this.clearAuthTokens();
             }
             return false;
         }
@@ -350,9 +493,7 @@ class DataManager {
             method: 'POST',
             body: JSON.stringify({ username, password })
         });
-        if (response.token) {
-            localStorage.setItem('auth_token', response.token);
-        }
+        this.setAuthTokens(response);
         return response;
     }
 
@@ -361,7 +502,7 @@ class DataManager {
      * @returns {Promise<null>}
      */
     async logout() {
-        localStorage.removeItem('auth_token');
+        this.clearAuthTokens();
         return this.request('/auth/logout', {
             method: 'POST'
         });
@@ -374,10 +515,13 @@ class DataManager {
      * @returns {Promise<Object>} 修改结果
      */
     async changePassword(oldPassword, newPassword) {
-        return this.request('/auth/change-password', {
+        const response = await this.request('/auth/change-password', {
             method: 'POST',
             body: JSON.stringify({ oldPassword, newPassword })
         });
+        // 修改密码后旧的刷新令牌失效，保存新签发的令牌
+        this.setAuthTokens(response);
+        return response;
     }
 
     /**
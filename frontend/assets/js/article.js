@@ -14,6 +14,12 @@ import { parseArticle, parseContent } from './markdown-config.js';
 const VIEWED_ARTICLES_KEY = 'viewed_articles';
 // 当前文章数据
 let currentArticle = null;
+// 已加载的评论和下一页评论的游标（没有下一页时为 null）
+let comments = [];
+let commentsCursor = null;
+// 评论推送连接（EventSource），不支持时使用长轮询
+let commentStream = null;
+let commentStreamStopped = false;
 
 /**
  * 检查文章是否已被访问过
@@ -79,19 +85,19 @@ function renderArticle(article) {
     document.getElementById('publishDate').textContent = formatDate(article.date);
     document.getElementById('viewCount').textContent = article.views || 0;
     document.getElementById('likeCount').textContent = article.likes || 0;
-    document.getElementById('commentCount').textContent = article.comments?.length || 0;
+    document.getElementById('commentCount').textContent = article.comment_count || 0;
 
-    // 渲染评论列表
-    renderComments(article.comments || []);
+    // 渲染评论列表（文章详情附带第一页评论）
+    comments = article.comments || [];
+    commentsCursor = article.comments_cursor || null;
+    renderComments();
 }
 
 /**
  * 渲染评论列表
- * 将评论数据转换为HTML并插入页面
- * 
- * @param {Array} comments - 评论数据数组
+ * 将已加载的评论转换为HTML并插入页面，还有下一页时显示"加载更多"按钮
  */
-function renderComments(comments) {
+function renderComments() {
     const commentList = document.getElementById('commentList');
     commentList.innerHTML = comments.map(comment => `
         <div class="comment-item">
@@ -101,6 +107,130 @@ function renderComments(comments) {
             </div>
         </div>
     `).join('');
+
+    if (commentsCursor) {
+        const button = document.createElement('button');
+        button.className = 'btn-load-more';
+        button.textContent = '加载更多评论';
+        button.addEventListener('click', loadMoreComments);
+        commentList.appendChild(button);
+    }
+}
+
+/**
+ * 加载下一页评论
+ * @param {Event} event - 按钮点击事件
+ */
+async function loadMoreComments(event) {
+    const button = event.target;
+    button.disabled = true;
+    button.textContent = '加载中...';
+    try {
+        const data = await dataManager.getComments(currentArticle.id, { cursor: commentsCursor });
+        comments = comments.concat(data.comments);
+        commentsCursor = data.next_cursor;
+        document.getElementById('commentCount').textContent = data.comment_count;
+        renderComments();
+    } catch (error) {
+        console.error('Failed to load comments:', error);
+        button.disabled = false;
+        button.textContent = '加载失败，点击重试';
+    }
+}
+
+/**
+ * 把新评论加到列表末尾
+ * 还有未加载的评论时不加入，新评论会在加载更多时出现
+ *
+ * @param {Object} comment - 评论
+ * @returns {boolean} 是否加入了列表
+ */
+function appendComment(comment) {
+    if (commentsCursor || comments.some(c => c.id === comment.id)) return false;
+    comments.push(comment);
+    return true;
+}
+
+/**
+ * 重新读取第一页评论
+ * 推送连接无法逐条同步（例如其他服务进程删除了评论）时调用
+ */
+async function reloadComments() {
+    try {
+        const data = await dataManager.getComments(currentArticle.id);
+        comments = data.comments;
+        commentsCursor = data.next_cursor;
+        document.getElementById('commentCount').textContent = data.comment_count;
+        renderComments();
+    } catch (error) {
+        console.error('Failed to reload comments:', error);
+    }
+}
+
+/**
+ * 处理一条评论事件
+ * @param {string} type - 事件类型：comment、delete、resync 或 gone
+ * @param {Object} data - 事件数据，附带当前的评论数（comment_count）
+ */
+function applyCommentEvent(type, data) {
+    if (type === 'resync') {
+        reloadComments();
+        return;
+    }
+    if (type === 'gone') {
+        stopCommentStream();
+        return;
+    }
+    if (type === 'comment') {
+        appendComment(data.comment);
+    } else if (type === 'delete') {
+        comments = comments.filter(c => c.id !== data.id);
+    }
+    if (data.comment_count !== undefined) {
+        document.getElementById('commentCount').textContent = data.comment_count;
+    }
+    renderComments();
+}
+
+/**
+ * 订阅当前文章的评论变化
+ * 优先使用 EventSource（Server-Sent Events），浏览器不支持时改用长轮询
+ */
+function startCommentStream() {
+    const since = comments.length ? comments[comments.length - 1].id : 0;
+    if (window.EventSource) {
+        commentStream = new EventSource(dataManager.commentStreamURL(currentArticle.id, since));
+        ['comment', 'delete', 'resync', 'gone'].forEach(type => {
+            commentStream.addEventListener(type, event => applyCommentEvent(type, JSON.parse(event.data)));
+        });
+        return;
+    }
+    pollComments(since);
+}
+
+/**
+ * 长轮询评论变化，请求失败时稍后重试
+ * @param {number} since - 已收到的最大评论ID
+ */
+async function pollComments(since) {
+    while (!commentStreamStopped) {
+        try {
+            const data = await dataManager.pollComments(currentArticle.id, since);
+            data.events.forEach(event => applyCommentEvent(event.type, event));
+            since = data.next_since;
+        } catch (error) {
+            console.error('Failed to poll comments:', error);
+            await new Promise(resolve => setTimeout(resolve, 5000));
+        }
+    }
+}
+
+function stopCommentStream() {
+    commentStreamStopped = true;
+    if (commentStream) {
+        commentStream.close();
+        commentStream = null;
+    }
 }
 
 /**
@@ -143,8 +273,9 @@ async function init() {
             markArticleAsViewed(articleId);
         }
 
-        // 渲染文章内容
+        // 渲染文章内容，并订阅之后的评论变化
         renderArticle(currentArticle);
+        startCommentStream();
     } catch (error) {
         console.error('Failed to load article:', error);
         // 显示错误信息
@@ -199,13 +330,13 @@ function initCommentForm() {
             };
 
             // 提交评论
-            await dataManager.addComment(currentArticle.id, comment);
+            const created = await dataManager.addComment(currentArticle.id, comment);
             textarea.value = '';
 
-            // 重新获取文章数据并更新显示（不增加阅读量）
-            currentArticle = await dataManager.getArticleById(currentArticle.id, false);
-            renderComments(currentArticle.comments || []);
-            document.getElementById('commentCount').textContent = currentArticle.comments.length;
+            // 自己的评论立即显示，其他读者的评论由推送连接送达
+            if (appendComment(created)) {
+                renderComments();
+            }
         } catch (error) {
             console.error('Failed to add comment:', error);
             alert('评论发布失败，请重试！');
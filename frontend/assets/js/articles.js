@@ -1,10 +1,14 @@
 import dataManager from './api.js';
 
+// 每次加载的文章数量
+const PAGE_SIZE = 12;
+
 let currentCategory = 'all';
 let searchTerm = '';
 let isLoading = false;
 let articles = [];
 let categories = [];
+let nextCursor = null;
 
 // 显示/隐藏加载状态
 function setLoading(loading) {
@@ -35,8 +39,8 @@ function renderCategories() {
     });
 }
 
-// 渲染文章列表
-function renderArticles(filteredArticles) {
+// 渲染文章列表，showMore 为 true 且还有下一页时显示"加载更多"按钮
+function renderArticles(filteredArticles, showMore = false) {
     const grid = document.getElementById('articlesGrid');
 
     if (filteredArticles.length === 0) {
@@ -59,7 +63,7 @@ function renderArticles(filteredArticles) {
             <div class="article-meta">
                 <div class="meta-stats">
                     <span title="点赞数">👍 ${article.likes || 0}</span>
-                    <span title="评论数">💬 ${article.comments?.length || 0}</span>
+                    <span title="评论数">💬 ${article.comment_count || 0}</span>
                     <span title="阅读数">👀 ${article.views || 0}</span>
                 </div>
                 <div class="meta-date">
@@ -74,10 +78,49 @@ function renderArticles(filteredArticles) {
     cards.forEach((card, index) => {
         card.style.animationDelay = `${index * 0.1}s`;
     });
+
+    if (showMore && nextCursor) {
+        const button = document.createElement('button');
+        button.className = 'btn-load-more';
+        button.textContent = '加载更多';
+        button.addEventListener('click', loadMoreArticles);
+        grid.appendChild(button);
+    }
+}
+
+// 加载当前分类的一页文章，cursor 为空时从第一页开始
+async function fetchArticles(cursor = null) {
+    if (currentCategory === 'all') {
+        return dataManager.getArticles({ limit: PAGE_SIZE, cursor });
+    }
+    const data = await dataManager.getCategory(currentCategory, { limit: PAGE_SIZE, cursor });
+    // 分类接口返回的文章不带分类信息，在这里补上
+    const category = categories.find(c => c.id === data.id);
+    data.articles.forEach(article => {
+        article.category = category;
+    });
+    return data;
+}
+
+// 加载下一页文章
+async function loadMoreArticles(event) {
+    const button = event.target;
+    button.disabled = true;
+    button.textContent = '加载中...';
+    try {
+        const data = await fetchArticles(nextCursor);
+        articles = articles.concat(data.articles);
+        nextCursor = data.next_cursor;
+        applyFilters();
+    } catch (error) {
+        console.error('Failed to load more articles:', error);
+        button.disabled = false;
+        button.textContent = '加载失败，点击重试';
+    }
 }
 
 // 过滤文章
-function filterArticles(categoryId) {
+async function filterArticles(categoryId) {
     try {
         setLoading(true);
         currentCategory = categoryId;
@@ -91,8 +134,13 @@ function filterArticles(categoryId) {
             }
         });
 
-        // 应用过滤和搜索
-        applyFilters();
+        // 重新加载该分类的第一页文章
+        const data = await fetchArticles();
+        articles = data.articles;
+        nextCursor = data.next_cursor;
+
+        // 应用搜索
+        await applyFilters();
     } catch (error) {
         console.error('Failed to filter articles:', error);
         showError('过滤文章失败，请重试');
@@ -113,28 +161,27 @@ function initSearchHandler() {
     });
 }
 
-// 应用过滤和搜索
-function applyFilters() {
+// 应用搜索（分类过滤和搜索都由服务端完成，articles 中是当前分类已加载的文章）
+async function applyFilters() {
     try {
         setLoading(true);
-        let filteredArticles = [...articles];
 
-        // 应用分类过滤
-        if (currentCategory !== 'all') {
-            filteredArticles = filteredArticles.filter(
-                article => article.categoryId === parseInt(currentCategory)
-            );
+        if (!searchTerm.trim()) {
+            renderArticles(articles, true);
+            return;
         }
 
-        // 应用搜索过滤
-        if (searchTerm) {
-            filteredArticles = filteredArticles.filter(article =>
-                article.title.toLowerCase().includes(searchTerm) ||
-                article.content.toLowerCase().includes(searchTerm)
-            );
+        // 在当前分类中全文搜索，结果按相关度排序
+        const term = searchTerm;
+        const category = currentCategory;
+        const data = await dataManager.searchArticles(term, {
+            category: currentCategory === 'all' ? undefined : currentCategory,
+            limit: 50
+        });
+        // 等待期间搜索词或分类已经变化时丢弃过期的结果
+        if (term === searchTerm && category === currentCategory) {
+            renderArticles(data.results);
         }
-
-        renderArticles(filteredArticles);
     } catch (error) {
         console.error('Failed to apply filters:', error);
         showError('加载文章失败，请重试');
@@ -159,9 +206,10 @@ function showError(message) {
 async function init() {
     try {
         setLoading(true);
-        const data = await dataManager.getArticles();
+        const data = await dataManager.getArticles({ limit: PAGE_SIZE });
         articles = data.articles;
         categories = data.categories;
+        nextCursor = data.next_cursor;
         renderCategories();
         applyFilters();
         initSearchHandler();
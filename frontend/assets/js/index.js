@@ -6,9 +6,13 @@
 import dataManager from './api.js';
 import { parseSummary } from './markdown-config.js';
 
+// 每次加载的文章数量
+const PAGE_SIZE = 12;
+
 // 存储文章和分类数据
 let articles = [];
 let categories = [];
+let nextCursor = null;
 
 /**
  * 格式化日期
@@ -29,8 +33,9 @@ function formatDate(dateString) {
 /**
  * 渲染文章列表
  * @param {Array} articles - 文章数据数组
+ * @param {boolean} showMore - 还有下一页时是否显示"加载更多"按钮
  */
-function renderArticles(articles) {
+function renderArticles(articles, showMore = false) {
     const articlesList = document.getElementById('articlesList');
 
     if (!articles || articles.length === 0) {
@@ -43,12 +48,12 @@ function renderArticles(articles) {
             <div class="article-content">
                 <span class="category-tag">${article.category?.name || '未分类'}</span>
                 <h2>${article.title}</h2>
-                <div class="article-summary">${parseSummary(article.content)}</div>
+                <div class="article-summary">${parseSummary(article.summary)}</div>
             </div>
             <div class="article-meta">
                 <div class="meta-stats">
                     <span title="点赞数">👍 ${article.likes || 0}</span>
-                    <span title="评论数">💬 ${article.comments?.length || 0}</span>
+                    <span title="评论数">💬 ${article.comment_count || 0}</span>
                     <span title="阅读数">👀 ${article.views || 0}</span>
                 </div>
                 <div class="meta-date">
@@ -63,6 +68,39 @@ function renderArticles(articles) {
     cards.forEach((card, index) => {
         card.style.animation = `fadeInUp 0.8s ease ${index * 0.1}s forwards`;
     });
+
+    if (showMore && nextCursor) {
+        const button = document.createElement('button');
+        button.className = 'btn-load-more';
+        button.textContent = '加载更多';
+        button.addEventListener('click', loadMoreArticles);
+        articlesList.appendChild(button);
+    }
+}
+
+/**
+ * 加载下一页文章
+ * 使用上一页返回的游标，追加到已加载的文章之后
+ */
+async function loadMoreArticles(event) {
+    const button = event?.target;
+    if (button) {
+        button.disabled = true;
+        button.textContent = '加载中...';
+    }
+    try {
+        const data = await dataManager.getArticles({ limit: PAGE_SIZE, cursor: nextCursor });
+        articles = articles.concat(data.articles);
+        nextCursor = data.next_cursor;
+        renderArticles(articles, true);
+        handleScroll();
+    } catch (error) {
+        console.error('Failed to load more articles:', error);
+        if (button) {
+            button.disabled = false;
+            button.textContent = '加载失败，点击重试';
+        }
+    }
 }
 
 /**
@@ -77,13 +115,21 @@ function initSearchHandler() {
 
         // 防抖处理：清除之前的定时器
         clearTimeout(searchTimeout);
-        searchTimeout = setTimeout(() => {
-            // 在本地过滤文章
-            const filteredArticles = articles.filter(article =>
-                article.title.toLowerCase().includes(searchTerm) ||
-                article.content.toLowerCase().includes(searchTerm)
-            );
-            renderArticles(filteredArticles);
+        searchTimeout = setTimeout(async () => {
+            // 清空搜索词时恢复分页列表
+            if (!searchTerm.trim()) {
+                renderArticles(articles, true);
+                return;
+            }
+            try {
+                // 由服务端全文搜索，按相关度排序
+                const data = await dataManager.searchArticles(searchTerm, { limit: 50 });
+                if (e.target.value.toLowerCase() === searchTerm) {
+                    renderArticles(data.results);
+                }
+            } catch (error) {
+                console.error('Failed to search articles:', error);
+            }
         }, 300);
     });
 }
@@ -162,13 +208,14 @@ function renderCategoryStats() {
  */
 async function init() {
     try {
-        // 加载文章和分类数据
-        const data = await dataManager.getArticles();
+        // 加载第一页文章和分类数据
+        const data = await dataManager.getArticles({ limit: PAGE_SIZE });
         articles = data.articles;
         categories = data.categories;
+        nextCursor = data.next_cursor;
 
         // 渲染文章列表和分类统计
-        renderArticles(articles);
+        renderArticles(articles, true);
         renderCategoryStats();
 
         // 初始化各项功能